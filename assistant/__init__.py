@@ -1,5 +1,15 @@
 from .llm_factory import LLMFactory
-from .research_agent import ResearchAgent
+from .llm_router import LLMRouter
+from .research_agent import ResearchAgent, SynthesizingAgent
 from .search_tools import SearchTools
+from .planner import PlanExecuteAgent
+from .answer_cache import SemanticAnswerCache
+from .registry import ResourceRegistry
+from .query_classifier import QueryClassifier
+from .scheduler import RequestScheduler, AdmissionTimeout
+from .pipeline import ResearchPipeline
+from .client import ResearchClient
 
-__all__ = ['LLMFactory', 'ResearchAgent', 'SearchTools']
\ No newline at end of file
+__all__ = ['LLMFactory', 'LLMRouter', 'ResearchAgent', 'SynthesizingAgent', 'SearchTools', 'PlanExecuteAgent', 'SemanticAnswerCache',
+           'ResourceRegistry', 'QueryClassifier', 'RequestScheduler',
+           'AdmissionTimeout', 'ResearchPipeline', 'ResearchClient']
\ No newline at end of file
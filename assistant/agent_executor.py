@@ -0,0 +1,52 @@
+from typing import Any, Optional
+from langchain.agents import AgentExecutor
+from .budget import QueryBudget
+from .synthesis import synthesis_messages, split_steps
+
+class BudgetedAgentExecutor(AgentExecutor):
+    """AgentExecutor that stops when the current QueryBudget runs out
+
+    Instead of LangChain's "Agent stopped due to iteration limit or time limit."
+    the question is then answered by fallback_llm from the observations gathered
+    so far. Without a fallback_llm (e.g. under a SynthesizingAgent, which writes
+    the answer from the steps anyway) the executor just stops.
+
+    While a budget is active it replaces the executor's own max_iterations and
+    max_execution_time, so a limit disabled in the budget is really off and every
+    stop goes through the fallback.
+    """
+
+    fallback_llm: Optional[Any] = None
+
+    def _should_continue(self, iterations, time_elapsed):
+        budget = QueryBudget.current()
+        if budget is None:
+            return super()._should_continue(iterations, time_elapsed)
+        return budget.allows(iterations)
+
+    def _return(self, output, intermediate_steps, run_manager=None):
+        final_output = super()._return(output, intermediate_steps, run_manager)
+        # Kept until _call has decided whether to synthesize from them
+        final_output.setdefault("intermediate_steps", intermediate_steps)
+        return final_output
+
+    def _call(self, inputs, run_manager=None):
+        outputs = super()._call(inputs, run_manager)
+        messages = self._fallback_messages(inputs, outputs)
+        if messages is not None:
+            callbacks = run_manager.get_child() if run_manager else None
+            outputs["output"] = self.fallback_llm.invoke(messages, config={"callbacks": callbacks}).content
+        return self._strip_steps(outputs)
+
+    def _fallback_messages(self, inputs, outputs):
+        """Build the best-answer-so-far messages, or None if the agent finished on its own"""
+        budget = QueryBudget.current()
+        if self.fallback_llm is None or budget is None or budget.exceeded is None:
+            return None
+        queries, results = split_steps(outputs.get("intermediate_steps", []))
+        return synthesis_messages(inputs["input"], queries, results, inputs.get("chat_history"))
+
+    def _strip_steps(self, outputs):
+        if not self.return_intermediate_steps:
+            outputs.pop("intermediate_steps", None)
+        return outputs
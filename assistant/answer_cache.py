@@ -0,0 +1,192 @@
+import os
+import re
+import time
+import threading
+import numpy as np
+from .knowledge_index import HashingEmbedder, VectorIndex
+from .query_match import QueryMatch
+
+class SemanticAnswerCache:
+    """Cache of final answers looked up by query similarity
+
+    Each configuration (provider, model, search enabled) has its own partition, so an
+    answer is only reused for the same kind of pipeline that produced it. Within a
+    partition the incoming query is compared to every cached query with one
+    matrix-vector product; a similar query is only a hit if it also mentions the
+    same numbers and names and agrees on negation (see QueryMatch).
+
+    Word-overlap similarity scores "GDP in 2023" and "GDP in 2024" higher than real
+    paraphrases, so the cache needs an embedding model: with the default hashing
+    embedder it stays off.
+    """
+
+    DEFAULT_THRESHOLD = 0.92
+    DEFAULT_TTL = 60 * 60
+    DEFAULT_MAX_ENTRIES = 1000
+
+    FOLLOW_UP_WORDS = {"it", "its", "that", "this", "they", "them", "their", "those", "these", "he", "she", "his", "her"}
+
+    def __init__(self, embedder, threshold=None, ttl=None, max_entries=None):
+        """Create a cache
+
+        Args:
+            embedder: Object with an embed(texts) method returning unit-length rows
+            threshold: Minimum cosine similarity for a hit
+            ttl: Seconds an answer stays valid
+            max_entries: Maximum number of cached answers across all partitions
+        """
+        self.embedder = embedder
+        self.threshold = self.DEFAULT_THRESHOLD if threshold is None else threshold
+        self.ttl = self.DEFAULT_TTL if ttl is None else ttl
+        self.max_entries = self.DEFAULT_MAX_ENTRIES if max_entries is None else max_entries
+        self._partitions = {}
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    @classmethod
+    def from_env(cls):
+        """Create a cache configured from environment variables
+
+        Environment:
+            ANSWER_CACHE_THRESHOLD: Minimum query similarity for a hit
+            ANSWER_CACHE_TTL: Seconds an answer stays valid (0 disables the cache)
+            ANSWER_CACHE_SIZE: Maximum number of cached answers
+            EMBEDDING_PROVIDER: Should name an embedding model ("openai" or "ollama");
+                with the default hashing embedder the cache is off unless
+                ANSWER_CACHE_TTL is set explicitly
+        """
+        embedder = VectorIndex.create_embedder()
+        enabled = not isinstance(embedder, HashingEmbedder) or bool(os.getenv("ANSWER_CACHE_TTL"))
+        return cls(
+            embedder,
+            threshold=float(os.getenv("ANSWER_CACHE_THRESHOLD", cls.DEFAULT_THRESHOLD)),
+            ttl=int(os.getenv("ANSWER_CACHE_TTL", cls.DEFAULT_TTL)) if enabled else 0,
+            max_entries=int(os.getenv("ANSWER_CACHE_SIZE", cls.DEFAULT_MAX_ENTRIES))
+        )
+
+    @staticmethod
+    def make_key(provider, model, search_enabled):
+        """Build the partition key for a pipeline configuration"""
+        return (provider, model, bool(search_enabled))
+
+    @staticmethod
+    def extract_sources(text):
+        """Return the distinct URLs mentioned in a text, in order of appearance"""
+        sources = []
+        for url in re.findall(r"https?://[^\s)\]>\"']+", text):
+            url = url.rstrip(".,;:")
+            if url not in sources:
+                sources.append(url)
+        return sources
+
+    @classmethod
+    def is_follow_up(cls, query, has_history):
+        """Whether a query probably refers back to the conversation and must not be served from cache"""
+        if not has_history:
+            return False
+        words = re.findall(r"[a-z']+", query.lower())
+        return len(words) < 3 or bool(cls.FOLLOW_UP_WORDS.intersection(words))
+
+    def lookup(self, query, key):
+        """Find a cached answer for a similar query
+
+        Args:
+            query: The user's query
+            key: Partition key from make_key
+
+        Returns:
+            Dictionary with answer, sources, query, created_at and score, or None
+        """
+        if not self.ttl:
+            return None
+
+        vector = self.embedder.embed([query])[0]
+        now = time.time()
+
+        with self._lock:
+            partition = self._partitions.get(key)
+            if partition:
+                self._expire(partition, now)
+
+            if not partition or not partition["entries"]:
+                self.stats["misses"] += 1
+                return None
+
+            scores = partition["vectors"] @ vector
+            best = None
+            for index in np.argsort(-scores):
+                if scores[index] < self.threshold:
+                    break
+                # Similar wording is not enough: "GDP in 2024" must not get the 2023 answer
+                if QueryMatch.compatible(query, partition["entries"][index]["query"]):
+                    best = int(index)
+                    break
+            if best is None:
+                self.stats["misses"] += 1
+                return None
+
+            entry = partition["entries"][best]
+            entry["last_used"] = now
+            self.stats["hits"] += 1
+            return {
+                "answer": entry["answer"],
+                "sources": entry["sources"],
+                "query": entry["query"],
+                "created_at": entry["created_at"],
+                "score": float(scores[best])
+            }
+
+    def store(self, query, answer, key, sources=None):
+        """Cache an answer
+
+        Args:
+            query: The user's query
+            answer: The final answer text
+            key: Partition key from make_key
+            sources: Source URLs; extracted from the answer when not given
+        """
+        if not self.ttl:
+            return
+
+        vector = self.embedder.embed([query])
+        now = time.time()
+        entry = {
+            "query": query,
+            "answer": answer,
+            "sources": sources if sources is not None else self.extract_sources(answer),
+            "created_at": now,
+            "last_used": now
+        }
+
+        with self._lock:
+            partition = self._partitions.setdefault(key, {"vectors": np.zeros((0, vector.shape[1]), dtype=np.float32),
+                                                          "entries": []})
+            partition["vectors"] = np.vstack([partition["vectors"], vector])
+            partition["entries"].append(entry)
+            self._evict()
+
+    def clear(self):
+        """Remove every cached answer"""
+        with self._lock:
+            self._partitions.clear()
+
+    def _expire(self, partition, now):
+        keep = [i for i, entry in enumerate(partition["entries"]) if entry["created_at"] + self.ttl > now]
+        if len(keep) != len(partition["entries"]):
+            partition["vectors"] = partition["vectors"][keep]
+            partition["entries"] = [partition["entries"][i] for i in keep]
+
+    def _evict(self):
+        total = sum(len(partition["entries"]) for partition in self._partitions.values())
+        while total > self.max_entries:
+            # Drop the least recently used answer across all partitions
+            key, index = min(
+                ((key, i) for key, partition in self._partitions.items()
+                 for i in range(len(partition["entries"]))),
+                key=lambda item: self._partitions[item[0]]["entries"][item[1]]["last_used"]
+            )
+            partition = self._partitions[key]
+            partition["vectors"] = np.delete(partition["vectors"], index, axis=0)
+            del partition["entries"][index]
+            self.stats["evictions"] += 1
+            total -= 1
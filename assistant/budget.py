@@ -0,0 +1,112 @@
+import os
+import time
+import threading
+import contextvars
+from contextlib import contextmanager
+from langchain_core.callbacks import BaseCallbackHandler
+from utils.tracing import QueryTrace, TracingCallbackHandler
+
+class QueryBudget:
+    """Limits on the agent loop of one query
+
+    The ReAct agent stops taking steps once it has used AGENT_MAX_ITERATIONS
+    iterations (parse-error retries included), made AGENT_MAX_TOOL_CALLS tool calls,
+    used AGENT_MAX_TOKENS LLM tokens or run for AGENT_DEADLINE seconds, and then
+    answers with what it has gathered so far. A limit of 0 disables it. Every stop
+    is counted in the current trace as budget_stops and budget_stop_<reason>.
+    """
+
+    DEFAULT_MAX_ITERATIONS = 6
+    DEFAULT_MAX_TOOL_CALLS = 8
+    DEFAULT_MAX_TOKENS = 0
+    DEFAULT_DEADLINE = 60.0
+
+    _current = contextvars.ContextVar("query_budget", default=None)
+
+    def __init__(self, max_iterations=None, max_tool_calls=None, max_tokens=None, deadline=None):
+        """Create a budget; limits left as None are read from the environment"""
+        self.max_iterations = self._limit(max_iterations, "AGENT_MAX_ITERATIONS", self.DEFAULT_MAX_ITERATIONS, int)
+        self.max_tool_calls = self._limit(max_tool_calls, "AGENT_MAX_TOOL_CALLS", self.DEFAULT_MAX_TOOL_CALLS, int)
+        self.max_tokens = self._limit(max_tokens, "AGENT_MAX_TOKENS", self.DEFAULT_MAX_TOKENS, int)
+        self.deadline = self._limit(deadline, "AGENT_DEADLINE", self.DEFAULT_DEADLINE, float)
+        self.started = time.monotonic()
+        self.tool_calls = 0
+        self.tokens = 0
+        self.exceeded = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _limit(value, variable, default, cast):
+        return cast(os.getenv(variable, default)) if value is None else value
+
+    @classmethod
+    def current(cls):
+        """Return the budget of the query being answered, or None"""
+        return cls._current.get()
+
+    @contextmanager
+    def activated(self):
+        """Make this budget current for the duration of the block"""
+        token = self._current.set(self)
+        try:
+            yield self
+        finally:
+            self._current.reset(token)
+
+    def callbacks(self):
+        """Return the callback handlers counting tool calls and tokens against the budget"""
+        return [BudgetCallbackHandler(self)]
+
+    def elapsed(self):
+        """Seconds since the budget was created"""
+        return time.monotonic() - self.started
+
+    def allows(self, iterations):
+        """Whether the agent may take another step after the given number of iterations
+
+        The first limit reached is recorded as the stop reason.
+        """
+        if self.exceeded is None:
+            reason = None
+            if self.max_iterations and iterations >= self.max_iterations:
+                reason = "iterations"
+            elif self.max_tool_calls and self.tool_calls >= self.max_tool_calls:
+                reason = "tool_calls"
+            elif self.max_tokens and self.tokens >= self.max_tokens:
+                reason = "tokens"
+            elif self.deadline and self.elapsed() >= self.deadline:
+                reason = "deadline"
+            if reason is not None:
+                self.stop(reason)
+        return self.exceeded is None
+
+    def stop(self, reason):
+        """Record that the budget ran out"""
+        with self._lock:
+            if self.exceeded is not None:
+                return
+            self.exceeded = reason
+        trace = QueryTrace.current()
+        if trace is not None:
+            trace.increment("budget_stops")
+            trace.increment(f"budget_stop_{reason}")
+            trace.attributes["budget_stop"] = reason
+
+class BudgetCallbackHandler(BaseCallbackHandler):
+    """Counts tool calls and LLM tokens into a QueryBudget"""
+
+    def __init__(self, budget):
+        self.budget = budget
+
+    def on_tool_start(self, serialized, input_str, **kwargs):
+        with self.budget._lock:
+            self.budget.tool_calls += 1
+
+    def on_llm_end(self, response, **kwargs):
+        prompt_tokens, completion_tokens = TracingCallbackHandler.token_usage(response)
+        if not prompt_tokens and not completion_tokens:
+            # Backends that do not report usage: estimate from the generated text
+            completion_tokens = sum(len(generation.text) // 4 + 1
+                                    for generations in response.generations for generation in generations)
+        with self.budget._lock:
+            self.budget.tokens += prompt_tokens + completion_tokens
@@ -0,0 +1,78 @@
+import os
+import json
+import requests
+from .registry import ResourceRegistry
+
+class ResearchClient:
+    """Client for the headless HTTP API (server.py)
+
+    Lets the Streamlit app act as a thin client: answers are generated by the API
+    workers and streamed back as the same events ResearchAgent.stream_query yields.
+    """
+
+    DEFAULT_TIMEOUT = 300
+
+    def __init__(self, base_url, timeout=None):
+        """Create a client
+
+        Args:
+            base_url: URL of the API, e.g. "http://localhost:8000"
+            timeout: Seconds to wait for the next event before giving up
+        """
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout or self.DEFAULT_TIMEOUT
+        self.session = requests.Session()
+
+    @classmethod
+    def from_env(cls):
+        """Return the client for RESEARCH_API_URL, or None when the app answers in-process
+
+        The client and its connection pool are created once per process and shared.
+        """
+        base_url = os.getenv("RESEARCH_API_URL")
+        if not base_url:
+            return None
+        return ResourceRegistry.get_or_create(("research_client", base_url), lambda: cls(base_url))
+
+    def stream(self, query, session_id, provider, model_name=None, search_enabled=True, agent_mode="ReAct"):
+        """Ask a question and yield the answer's events as they arrive
+
+        Yields:
+            Event dictionaries (token, action, observation, queued and a last final event)
+        """
+        payload = {
+            "query": query,
+            "session_id": session_id,
+            "provider": provider,
+            "model": model_name,
+            "search": search_enabled,
+            "agent_mode": agent_mode,
+            "stream": True
+        }
+        try:
+            with self.session.post(f"{self.base_url}/v1/chat", json=payload, stream=True, timeout=self.timeout,
+                                   headers={"Accept": "text/event-stream"}) as response:
+                if response.status_code != 200:
+                    yield {"type": "final", "content": f"An error occurred: {self.error_message(response)}"}
+                    return
+
+                for line in response.iter_lines(decode_unicode=True):
+                    # Events are single "data:" lines; the "event:" line repeats the type
+                    if line and line.startswith("data:"):
+                        event = json.loads(line[len("data:"):])
+                        yield event
+                        if event["type"] == "final":
+                            return
+        except requests.RequestException as e:
+            yield {"type": "final", "content": f"An error occurred: {str(e)}"}
+            return
+
+        yield {"type": "final", "content": "An error occurred: the connection closed before the answer was complete"}
+
+    @staticmethod
+    def error_message(response):
+        """Extract the error message from an API error response"""
+        try:
+            return response.json().get("error", response.reason)
+        except ValueError:
+            return f"{response.status_code} {response.reason}"
@@ -0,0 +1,401 @@
+import os
+import re
+import json
+import time
+import zlib
+import hashlib
+import threading
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+class HashingEmbedder:
+    """Deterministic local text embedder based on feature hashing
+
+    Needs no model or network access: unigrams and bigrams are hashed into a fixed
+    number of signed buckets and the vector is L2-normalized, so cosine similarity
+    reflects weighted word overlap.
+    """
+
+    def __init__(self, dim=512):
+        self.dim = dim
+        self.name = f"hashing-{dim}"
+
+    def embed(self, texts):
+        """Embed a list of texts
+
+        Args:
+            texts: List of strings
+
+        Returns:
+            float32 array of shape (len(texts), dim) with unit-length rows
+        """
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            tokens = re.findall(r"[a-z0-9]+", text.lower())
+            features = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+            for feature in features:
+                digest = zlib.crc32(feature.encode())
+                sign = 1.0 if digest & 1 else -1.0
+                vectors[row, (digest >> 1) % self.dim] += sign
+        # Sublinear term frequency, then unit length
+        vectors = np.sign(vectors) * np.log1p(np.abs(vectors))
+        return VectorIndex.normalize(vectors)
+
+class LangChainEmbedder:
+    """Adapter for LangChain embedding models (OpenAIEmbeddings, OllamaEmbeddings, ...)"""
+
+    def __init__(self, embeddings, name):
+        self.embeddings = embeddings
+        self.name = name
+
+    def embed(self, texts):
+        """Embed a list of texts with the wrapped model"""
+        return VectorIndex.normalize(np.asarray(self.embeddings.embed_documents(texts), dtype=np.float32))
+
+class VectorIndex:
+    """NumPy-backed vector store with vectorized cosine similarity search
+
+    Vectors are kept in a float32 matrix with unit-length rows, so a search is one
+    matrix-vector product. When a path is given, rows are appended to a raw .f32 file
+    that is memory-mapped on load, and entries are appended to a JSON lines file, so
+    adding to a large index never rewrites it.
+
+    Every entry records when it was added (created_at in its metadata). Entries older
+    than max_age are not returned, and once the index holds more than max_entries
+    it is compacted to the newest 90% of them, so it never grows without bound.
+    """
+
+    DEFAULT_MAX_ENTRIES = 20000
+
+    def __init__(self, embedder, path=None, max_age=None, max_entries=None):
+        """Create or load an index
+
+        Args:
+            embedder: Object with a name and an embed(texts) method
+            path: Path prefix for the persistent files, or None for an in-memory index
+            max_age: Seconds an entry stays searchable, or None to keep entries until evicted
+            max_entries: Maximum number of entries before the oldest are evicted
+        """
+        self.embedder = embedder
+        self.path = path
+        self.max_age = max_age
+        self.max_entries = max_entries or self.DEFAULT_MAX_ENTRIES
+        self._lock = threading.Lock()
+        self._entries = []
+        self._seen = {}
+        self._created = np.zeros(0, dtype=np.float64)
+        self._disk = None
+        self._memory = None
+        self._memory_rows = 0
+
+        if path:
+            self._load()
+
+    @classmethod
+    def from_env(cls):
+        """Create the shared index configured from environment variables
+
+        Environment:
+            KNOWLEDGE_INDEX_PATH: Path prefix of the index files ("" keeps it in memory)
+            KNOWLEDGE_INDEX_SIZE: Maximum number of entries
+            SEARCH_CACHE_TTL: Seconds an entry stays searchable, as for cached search results
+            EMBEDDING_PROVIDER: "hashing" (default), "openai" or "ollama"
+            EMBEDDING_MODEL: Model name for the openai or ollama providers
+        """
+        from utils.cache_utils import SearchCache
+
+        return cls(
+            cls.create_embedder(),
+            os.getenv("KNOWLEDGE_INDEX_PATH", os.path.join(".cache", "knowledge_index")),
+            max_age=int(os.getenv("SEARCH_CACHE_TTL", SearchCache.DEFAULT_TTL)) or None,
+            max_entries=int(os.getenv("KNOWLEDGE_INDEX_SIZE", cls.DEFAULT_MAX_ENTRIES))
+        )
+
+    @staticmethod
+    def create_embedder():
+        """Create the embedder selected by EMBEDDING_PROVIDER"""
+        provider = os.getenv("EMBEDDING_PROVIDER", "hashing").lower()
+        if provider == "openai":
+            from langchain_openai import OpenAIEmbeddings
+            model = os.getenv("EMBEDDING_MODEL", "text-embedding-3-small")
+            return LangChainEmbedder(OpenAIEmbeddings(model=model), f"openai-{model}")
+        if provider == "ollama":
+            from langchain_ollama import OllamaEmbeddings
+            model = os.getenv("EMBEDDING_MODEL", "nomic-embed-text")
+            return LangChainEmbedder(OllamaEmbeddings(model=model), f"ollama-{model}")
+        return HashingEmbedder()
+
+    @staticmethod
+    def normalize(vectors):
+        """Scale rows to unit length (zero rows stay zero)"""
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def add(self, texts, metadatas=None, keys=None):
+        """Add entries to the index
+
+        Args:
+            texts: Entry texts returned by search
+            metadatas: Optional list of JSON-serializable dictionaries
+            keys: Optional list of texts to embed instead of the entry texts
+
+        Returns:
+            Number of entries added (duplicates of entries that have not expired are skipped)
+        """
+        metadatas = metadatas or [{} for _ in texts]
+        keys = keys or texts
+        now = time.time()
+
+        new = []
+        with self._lock:
+            for text, metadata, key in zip(texts, metadatas, keys):
+                entry = {"text": text, "metadata": dict(metadata, created_at=now)}
+                if key != text:
+                    entry["key"] = key
+                digest = self._digest(entry)
+                if text and not self._is_fresh(self._seen.get(digest), now):
+                    self._seen[digest] = now
+                    new.append(entry)
+
+        if not new:
+            return 0
+
+        vectors = self.embedder.embed([entry.get("key", entry["text"]) for entry in new])
+
+        with self._lock:
+            self._append_rows(vectors)
+            self._entries.extend(new)
+            self._created = np.append(self._created, [now] * len(new))
+            if self.path:
+                self._persist(vectors, new)
+            if len(self._entries) > self.max_entries:
+                self._compact()
+        return len(new)
+
+    def search(self, query, k=4, min_score=0.0, where=None):
+        """Return the entries most similar to the query
+
+        Args:
+            query: Query text
+            k: Maximum number of results
+            min_score: Minimum cosine similarity
+            where: Optional metadata dictionary entries must match
+
+        Returns:
+            List of (score, text, metadata) tuples, best first; expired entries are left out
+        """
+        if not len(self):
+            return []
+
+        query_vector = self.embedder.embed([query])[0]
+        with self._lock:
+            scores = self._scores(query_vector)
+            entries = self._entries[:len(scores)]
+            created = self._created[:len(scores)]
+
+        if self.max_age:
+            scores = np.where(created > time.time() - self.max_age, scores, -np.inf)
+
+        if where:
+            # Only candidates above min_score are checked against the metadata, best first
+            hits = []
+            for i in np.argsort(-scores):
+                if scores[i] < min_score or len(hits) == k:
+                    break
+                if all(entries[i]["metadata"].get(name) == value for name, value in where.items()):
+                    hits.append(i)
+            return [(float(scores[i]), entries[i]["text"], entries[i]["metadata"]) for i in hits]
+
+        k = min(k, len(scores))
+        # argpartition avoids sorting the whole score vector
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(float(scores[i]), entries[i]["text"], entries[i]["metadata"]) for i in top if scores[i] >= min_score]
+
+    def rank(self, query, texts):
+        """Score texts against a query without indexing them
+
+        Args:
+            query: Query text
+            texts: List of candidate texts
+
+        Returns:
+            float32 array of cosine similarities in the order of texts
+        """
+        if not texts:
+            return np.zeros(0, dtype=np.float32)
+        vectors = self.embedder.embed([query] + list(texts))
+        return vectors[1:] @ vectors[0]
+
+    def _is_fresh(self, created_at, now):
+        if created_at is None:
+            return False
+        return not self.max_age or created_at > now - self.max_age
+
+    @staticmethod
+    def _created_at(entry):
+        # Entries written before created_at was recorded count as expired
+        return float(entry["metadata"].get("created_at", 0.0))
+
+    @staticmethod
+    def _digest(entry):
+        return hashlib.sha1(f"{entry.get('key', entry['text'])}\0{entry['text']}".encode()).hexdigest()
+
+    def _scores(self, query_vector):
+        parts = []
+        if self._disk is not None:
+            parts.append(self._disk @ query_vector)
+        if self._memory_rows:
+            parts.append(self._memory[:self._memory_rows] @ query_vector)
+        return np.concatenate(parts) if parts else np.zeros(0, dtype=np.float32)
+
+    def _append_rows(self, vectors):
+        needed = self._memory_rows + len(vectors)
+        if self._memory is None or needed > len(self._memory):
+            # Grow geometrically so repeated appends stay amortized O(1)
+            capacity = max(needed, 2 * (0 if self._memory is None else len(self._memory)), 64)
+            grown = np.zeros((capacity, vectors.shape[1]), dtype=np.float32)
+            if self._memory_rows:
+                grown[:self._memory_rows] = self._memory[:self._memory_rows]
+            self._memory = grown
+        self._memory[self._memory_rows:needed] = vectors
+        self._memory_rows = needed
+
+    def _files(self):
+        return self.path + ".f32", self.path + ".jsonl", self.path + ".meta.json"
+
+    def _load(self):
+        vectors_file, entries_file, meta_file = self._files()
+        if not os.path.exists(meta_file):
+            # Without the meta file (e.g. a compaction was interrupted) the rows cannot be trusted
+            for file in (vectors_file, entries_file):
+                if os.path.exists(file):
+                    os.remove(file)
+            return
+        if not (os.path.exists(vectors_file) and os.path.exists(entries_file)):
+            return
+
+        with open(meta_file) as f:
+            meta = json.load(f)
+        if meta.get("embedder") != self.embedder.name:
+            # Vectors from another embedder are not comparable; start a fresh index
+            for file in (vectors_file, entries_file, meta_file):
+                os.remove(file)
+            return
+
+        with open(entries_file) as f:
+            entries = []
+            for line in f:
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    break
+        dim = meta["dim"]
+        file_rows = os.path.getsize(vectors_file) // (4 * dim)
+        rows = min(len(entries), file_rows)
+
+        if rows != len(entries) or rows * 4 * dim != os.path.getsize(vectors_file):
+            # An interrupted write left the files out of step; trim both to the common rows
+            with open(vectors_file, "r+b") as f:
+                f.truncate(rows * 4 * dim)
+            with open(entries_file, "w") as f:
+                f.writelines(json.dumps(entry) + "\n" for entry in entries[:rows])
+
+        if rows:
+            self._disk = np.memmap(vectors_file, dtype=np.float32, mode="r", shape=(rows, dim))
+        self._entries = entries[:rows]
+        self._created = np.array([self._created_at(entry) for entry in self._entries], dtype=np.float64)
+        self._seen = {self._digest(entry): self._created_at(entry) for entry in self._entries}
+
+        if rows > self.max_entries or (self.max_age and rows and self._created.min() <= time.time() - self.max_age):
+            self._compact()
+
+    def _persist(self, vectors, entries):
+        vectors_file, entries_file, meta_file = self._files()
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if not os.path.exists(meta_file):
+            with open(meta_file, "w") as f:
+                json.dump({"embedder": self.embedder.name, "dim": int(vectors.shape[1])}, f)
+        # Hold an exclusive lock so rows and entries of concurrent processes stay aligned;
+        # a partial write is trimmed on the next load
+        with open(vectors_file, "ab") as vectors_out, open(entries_file, "a") as entries_out:
+            if fcntl:
+                fcntl.flock(vectors_out, fcntl.LOCK_EX)
+            try:
+                vectors_out.write(np.ascontiguousarray(vectors, dtype=np.float32).tobytes())
+                vectors_out.flush()
+                entries_out.writelines(json.dumps(entry) + "\n" for entry in entries)
+                entries_out.flush()
+            finally:
+                if fcntl:
+                    fcntl.flock(vectors_out, fcntl.LOCK_UN)
+
+    def _compact(self):
+        """Drop expired entries and the oldest ones beyond 90% of max_entries
+
+        Called with the lock held. The kept rows move to memory and the files are
+        rewritten, replacing the old ones atomically.
+        """
+        now = time.time()
+        rows = len(self._entries)
+        keep = np.arange(rows)
+        if self.max_age:
+            keep = keep[self._created[:rows] > now - self.max_age]
+        limit = int(self.max_entries * 0.9)
+        if len(keep) > limit:
+            # Entries are appended in time order, so the newest are at the end
+            keep = keep[len(keep) - limit:]
+
+        parts = []
+        if self._disk is not None:
+            parts.append(np.asarray(self._disk))
+        if self._memory_rows:
+            parts.append(self._memory[:self._memory_rows])
+        vectors = np.concatenate(parts)[keep] if parts and len(keep) else None
+
+        self._entries = [self._entries[i] for i in keep]
+        self._created = self._created[keep]
+        self._seen = {self._digest(entry): self._created_at(entry) for entry in self._entries}
+        self._disk = None
+        self._memory = None
+        self._memory_rows = 0
+        if vectors is not None:
+            self._append_rows(vectors)
+
+        if self.path:
+            self._rewrite(vectors)
+
+    def _rewrite(self, vectors):
+        vectors_file, entries_file, meta_file = self._files()
+        if not os.path.exists(meta_file):
+            return
+        with open(vectors_file, "ab") as lock_file:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                with open(vectors_file + ".tmp", "wb") as f:
+                    if vectors is not None:
+                        f.write(np.ascontiguousarray(vectors, dtype=np.float32).tobytes())
+                with open(entries_file + ".tmp", "w") as f:
+                    f.writelines(json.dumps(entry) + "\n" for entry in self._entries)
+                # The meta file is missing while the pair is swapped, so a crash in
+                # between makes the next load start a fresh index instead of misaligning rows
+                with open(meta_file) as f:
+                    meta = f.read()
+                os.remove(meta_file)
+                os.replace(entries_file + ".tmp", entries_file)
+                os.replace(vectors_file + ".tmp", vectors_file)
+                with open(meta_file, "w") as f:
+                    f.write(meta)
+            finally:
+                if fcntl:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
@@ -1,30 +1,142 @@
 import os
-from langchain_openai import ChatOpenAI
+from .llm_router import LLMRouter
+from .scheduler import RequestScheduler
 
 class LLMFactory:
     """Factory for creating language model instances"""
     
+    OPENAI_MODEL = "gpt-3.5-turbo"
+    OLLAMA_MODEL = "gemma3:4b"
+    ROUTER_PROVIDER = "Auto (Router)"
+    # Provider prefixes accepted in "provider:model" specs
+    ROUTER_PROVIDERS = {"openai": "OpenAI", "ollama": "Local (Ollama)"}
+    # Agent roles whose model can be overridden with <ROLE>_MODEL
+    ROLES = ("reasoning", "synthesis")
+    DEFAULT_OPENAI_MAX_RETRIES = 4
+    
     @staticmethod
-    def create_llm(provider, ollama_class=None, ollama_available=False):
-        """Create and return a language model based on the specified provider
+    def get_model_name(provider, model_name=None):
+        """Return the model name used for the given provider
         
         Args:
             provider: The LLM provider ("OpenAI" or "Local (Ollama)")
+            model_name: Model chosen by the user, overriding the configured default
+        """
+        if model_name:
+            return model_name
+        if provider == "OpenAI":
+            return LLMFactory.OPENAI_MODEL
+        if provider == LLMFactory.ROUTER_PROVIDER:
+            return ",".join(LLMFactory.get_router_backends())
+        return os.getenv("OLLAMA_MODEL", LLMFactory.OLLAMA_MODEL)
+    
+    @staticmethod
+    def get_router_backends():
+        """Return the router backends configured by LLM_ROUTER_BACKENDS
+        
+        The variable is a comma-separated list of "provider:model" entries, e.g.
+        "openai:gpt-3.5-turbo,ollama:gemma3:4b"; by default the OpenAI model is
+        preferred and the local Ollama model is the fallback.
+        """
+        default = f"openai:{LLMFactory.OPENAI_MODEL},ollama:{LLMFactory.get_model_name('Local (Ollama)')}"
+        specs = os.getenv("LLM_ROUTER_BACKENDS") or default
+        return [spec.strip() for spec in specs.split(",") if spec.strip()]
+    
+    @staticmethod
+    def parse_model_spec(spec):
+        """Split a "provider:model" spec such as "ollama:gemma3:4b"
+        
+        Returns:
+            Tuple of (provider, model name), with provider None if the prefix is unknown
+            and model name None if it is omitted
+        """
+        prefix, _, model_name = spec.partition(":")
+        return LLMFactory.ROUTER_PROVIDERS.get(prefix.strip().lower()), model_name.strip() or None
+    
+    @staticmethod
+    def get_role_spec(role):
+        """Return the "provider:model" spec configured for an agent role, or None
+        
+        REASONING_MODEL sets the model that picks tools and writes search queries,
+        SYNTHESIS_MODEL the model that writes the final answer.
+        """
+        return os.getenv(f"{role.upper()}_MODEL") or None
+    
+    @staticmethod
+    def uses_ollama(provider):
+        """Whether answering with the provider may need an Ollama model
+        
+        True for the Ollama provider, a router with an Ollama backend, or when an
+        agent role is configured with an Ollama model.
+        """
+        specs = list(filter(None, (LLMFactory.get_role_spec(role) for role in LLMFactory.ROLES)))
+        if provider == LLMFactory.ROUTER_PROVIDER:
+            specs.extend(LLMFactory.get_router_backends())
+        elif provider != "OpenAI":
+            return True
+        return any(LLMFactory.parse_model_spec(spec)[0] == "Local (Ollama)" for spec in specs)
+    
+    @staticmethod
+    def create_llm(provider, ollama_class=None, ollama_available=False, model_name=None):
+        """Create and return a language model based on the specified provider
+        
+        Args:
+            provider: The LLM provider ("OpenAI", "Local (Ollama)" or "Auto (Router)")
             ollama_class: The Ollama class to use if provider is "Local (Ollama)"
             ollama_available: Whether Ollama is available
+            model_name: Model to use instead of the provider's default
             
         Returns:
             LLM instance or None if creation failed
         """
-        if provider == "OpenAI":
+        if provider == LLMFactory.ROUTER_PROVIDER:
+            return LLMFactory.create_router(ollama_class, ollama_available)
+        elif provider == "OpenAI":
             if not os.getenv("OPENAI_API_KEY"):
                 return None
-            return ChatOpenAI(temperature=0, model="gpt-3.5-turbo")
+            # Imported on first use so sessions using only Ollama never load the OpenAI SDK
+            from langchain_openai import ChatOpenAI
+            # Requests sharing a prompt_cache_key are routed to the same prompt cache
+            cache_key = os.getenv("OPENAI_PROMPT_CACHE_KEY")
+            # The OpenAI client retries 429 responses with exponential backoff and jitter
+            return ChatOpenAI(
+                temperature=0,
+                model=LLMFactory.get_model_name(provider, model_name),
+                max_retries=int(os.getenv("OPENAI_MAX_RETRIES", LLMFactory.DEFAULT_OPENAI_MAX_RETRIES)),
+                rate_limiter=RequestScheduler.rate_limiter("openai"),
+                model_kwargs={"prompt_cache_key": cache_key} if cache_key else {}
+            )
         else:  # Local (Ollama)
             if not ollama_available:
                 return None
             
             try:
-                return ollama_class(model="gemma3:4b")
+                from utils.ollama_utils import OllamaManager
+                return ollama_class(
+                    model=LLMFactory.get_model_name(provider, model_name),
+                    base_url=OllamaManager.get_base_url(),
+                    rate_limiter=RequestScheduler.rate_limiter("ollama"),
+                    **OllamaManager.get_runtime_options()
+                )
             except Exception:
-                return None
\ No newline at end of file
+                return None
+    
+    @staticmethod
+    def create_router(ollama_class=None, ollama_available=False):
+        """Create a router over every configured backend that can be built
+        
+        Returns:
+            LLMRouter instance or None if no backend is available
+        """
+        backends = []
+        for spec in LLMFactory.get_router_backends():
+            provider, model_name = LLMFactory.parse_model_spec(spec)
+            if provider is None:
+                continue
+            llm = LLMFactory.create_llm(provider, ollama_class, ollama_available, model_name)
+            if llm is not None:
+                backends.append((spec, llm))
+        
+        if not backends:
+            return None
+        return LLMRouter(backends=backends, hedge_after=LLMRouter.hedge_after_from_env())
@@ -0,0 +1,190 @@
+import os
+import time
+import threading
+import contextvars
+from collections import deque
+from typing import ClassVar
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from pydantic import Field
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from .scheduler import RequestScheduler
+
+class BackendStats:
+    """Rolling latency and error statistics of one LLM backend"""
+
+    WINDOW = 20
+    # Weight of the newest latency sample in the moving average
+    ALPHA = 0.3
+    # A backend failing this many times in a row is skipped for COOLDOWN seconds
+    MAX_CONSECUTIVE_FAILURES = 3
+    COOLDOWN = 30.0
+
+    def __init__(self):
+        self.latency = None
+        self.outcomes = deque(maxlen=self.WINDOW)
+        self.consecutive_failures = 0
+        self.cooldown_until = 0.0
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def record_success(self, latency):
+        with self._lock:
+            self.calls += 1
+            self.latency = latency if self.latency is None else self.ALPHA * latency + (1 - self.ALPHA) * self.latency
+            self.outcomes.append(True)
+            self.consecutive_failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.calls += 1
+            self.outcomes.append(False)
+            self.consecutive_failures += 1
+            if self.consecutive_failures >= self.MAX_CONSECUTIVE_FAILURES:
+                self.cooldown_until = time.time() + self.COOLDOWN
+
+    def error_rate(self):
+        with self._lock:
+            return self.outcomes.count(False) / len(self.outcomes) if self.outcomes else 0.0
+
+    def is_healthy(self):
+        return time.time() >= self.cooldown_until
+
+    def snapshot(self):
+        """Return the statistics as a dictionary for display"""
+        return {"latency_s": self.latency, "error_rate": self.error_rate(),
+                "healthy": self.is_healthy(), "calls": self.calls}
+
+class LLMRouter(BaseChatModel):
+    """Chat model that routes each call to the fastest healthy of several backends
+
+    Backends are ranked by health, error rate and moving-average latency; backends
+    without a latency sample yet are tried first, so each one is measured. A failed
+    call falls back to the next backend; with hedge_after set, a call still running
+    after that many seconds is also sent to the next backend and the first answer
+    wins. Streams are not hedged but fall back when a backend fails before its first
+    token. Latency statistics are shared by every router in the process.
+    """
+
+    backends: list = Field(default_factory=list)
+    hedge_after: float = 0.0
+
+    _health: ClassVar[dict] = {}
+    _health_lock: ClassVar = threading.Lock()
+    # Hedged calls whose answer lost the race finish in the background
+    _executor: ClassVar = None
+
+    @property
+    def _llm_type(self):
+        return "router"
+
+    @classmethod
+    def stats(cls, name):
+        """Return the process-wide statistics of a backend"""
+        with cls._health_lock:
+            if name not in cls._health:
+                cls._health[name] = BackendStats()
+            return cls._health[name]
+
+    @classmethod
+    def backend_stats(cls):
+        """Return a snapshot of every backend's statistics, keyed by backend name"""
+        with cls._health_lock:
+            health = dict(cls._health)
+        return {name: stats.snapshot() for name, stats in health.items()}
+
+    @classmethod
+    def executor(cls):
+        """Return the process-wide pool running backend calls
+
+        Every admitted query may have a call and a hedge in flight, so the pool holds
+        two threads per slot of the shared RequestScheduler.
+        """
+        with cls._health_lock:
+            if cls._executor is None:
+                max_workers = 2 * RequestScheduler.shared().max_concurrent
+                cls._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="llm-router")
+            return cls._executor
+
+    def _submit(self, backend, messages, stop, kwargs):
+        # Run in a copy of the caller's context so the query's trace and budget follow the call
+        return self.executor().submit(contextvars.copy_context().run, self._call, backend, messages, stop, kwargs)
+
+    @staticmethod
+    def hedge_after_from_env():
+        """Return the hedging deadline configured by LLM_HEDGE_AFTER (0 disables hedging)"""
+        return float(os.getenv("LLM_HEDGE_AFTER", 0))
+
+    def ranked(self):
+        """Return the (name, llm) backends, best first"""
+        def score(item):
+            index, (name, _) = item
+            stats = self.stats(name)
+            # An unmeasured backend is tried first; ranking it last would never measure it
+            latency = stats.latency if stats.latency is not None else 0.0
+            return (not stats.is_healthy(), stats.error_rate() > 0.5, latency, index)
+
+        return [backend for _, backend in sorted(enumerate(self.backends), key=score)]
+
+    def _call(self, backend, messages, stop, kwargs):
+        name, llm = backend
+        start = time.perf_counter()
+        try:
+            message = llm.invoke(messages, stop=stop, **kwargs)
+        except Exception:
+            self.stats(name).record_failure()
+            raise
+        self.stats(name).record_success(time.perf_counter() - start)
+        return name, message
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        remaining = self.ranked()
+        if not remaining:
+            raise RuntimeError("No LLM backend is configured")
+
+        pending = {self._submit(remaining.pop(0), messages, stop, kwargs)}
+        hedged = False
+        error = None
+        while pending:
+            timeout = self.hedge_after if self.hedge_after and not hedged and remaining else None
+            done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                # The call is slow: race it against the next backend
+                hedged = True
+                pending.add(self._submit(remaining.pop(0), messages, stop, kwargs))
+                continue
+
+            for future in done:
+                if future.exception() is None:
+                    name, message = future.result()
+                    return ChatResult(generations=[ChatGeneration(message=message)], llm_output={"backend": name})
+                error = future.exception()
+
+            # Every running call failed: fall back to the next backend
+            if not pending and remaining:
+                pending.add(self._submit(remaining.pop(0), messages, stop, kwargs))
+
+        raise error
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        error = None
+        for name, llm in self.ranked():
+            start = time.perf_counter()
+            started = False
+            try:
+                for chunk in llm.stream(messages, stop=stop, **kwargs):
+                    started = True
+                    generation = ChatGenerationChunk(message=chunk)
+                    if run_manager:
+                        run_manager.on_llm_new_token(chunk.content, chunk=generation)
+                    yield generation
+            except Exception as e:
+                self.stats(name).record_failure()
+                if started:
+                    raise
+                error = e
+                continue
+            self.stats(name).record_success(time.perf_counter() - start)
+            return
+
+        raise error or RuntimeError("No LLM backend is configured")
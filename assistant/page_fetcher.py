@@ -0,0 +1,205 @@
+import os
+import re
+import math
+import codecs
+import threading
+from html.parser import HTMLParser
+from collections import Counter, defaultdict
+from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from requests.adapters import HTTPAdapter
+
+class TextExtractor(HTMLParser):
+    """Incremental HTML to text converter
+
+    Text is collected while the page is still downloading, so the whole document
+    never has to be held in memory as HTML.
+    """
+
+    SKIPPED_TAGS = {"script", "style", "noscript", "head", "svg", "nav", "footer", "form", "iframe"}
+    BLOCK_TAGS = {"p", "div", "br", "li", "h1", "h2", "h3", "h4", "h5", "h6", "tr", "section", "article"}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self._parts = []
+        self._skip_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIPPED_TAGS:
+            self._skip_depth += 1
+        elif tag in self.BLOCK_TAGS:
+            self._parts.append("\n")
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIPPED_TAGS and self._skip_depth:
+            self._skip_depth -= 1
+        elif tag in self.BLOCK_TAGS:
+            self._parts.append("\n")
+
+    def handle_data(self, data):
+        if not self._skip_depth:
+            self._parts.append(data)
+
+    def get_text(self):
+        """Return the extracted text with whitespace normalized"""
+        text = "".join(self._parts)
+        lines = (" ".join(line.split()) for line in text.splitlines())
+        return "\n".join(line for line in lines if line)
+
+class PageFetcher:
+    """Downloads web pages concurrently and extracts the passages most relevant to a query
+
+    All requests share one pooled requests.Session. Downloads are bounded by a
+    per-request timeout, a maximum response size and a per-host concurrency limit.
+    """
+
+    DEFAULT_TIMEOUT = 8
+    DEFAULT_MAX_BYTES = 1_000_000
+    DEFAULT_PER_HOST_LIMIT = 2
+    DEFAULT_MAX_WORKERS = 8
+    CHUNK_WORDS = 120
+    TEXT_CONTENT_TYPES = ("text/html", "text/plain", "application/xhtml+xml")
+
+    def __init__(self, timeout=None, max_bytes=None, per_host_limit=None, max_workers=None):
+        """Create a fetcher
+
+        Args:
+            timeout: Connect/read timeout per request in seconds (FETCH_TIMEOUT)
+            max_bytes: Maximum bytes read from a single response (FETCH_MAX_BYTES)
+            per_host_limit: Maximum concurrent requests to one host (FETCH_PER_HOST_LIMIT)
+            max_workers: Maximum concurrent downloads overall
+        """
+        self.timeout = timeout or float(os.getenv("FETCH_TIMEOUT", self.DEFAULT_TIMEOUT))
+        self.max_bytes = max_bytes or int(os.getenv("FETCH_MAX_BYTES", self.DEFAULT_MAX_BYTES))
+        self.per_host_limit = per_host_limit or int(os.getenv("FETCH_PER_HOST_LIMIT", self.DEFAULT_PER_HOST_LIMIT))
+        self.max_workers = max_workers or self.DEFAULT_MAX_WORKERS
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=self.max_workers, pool_maxsize=self.max_workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update({"User-Agent": "Mozilla/5.0 (compatible; QuantumResearchAssistant/1.0)"})
+
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        self._host_limits = defaultdict(lambda: threading.BoundedSemaphore(self.per_host_limit))
+        self._host_lock = threading.Lock()
+
+    def fetch(self, url):
+        """Download a page and return its text
+
+        Args:
+            url: Page URL
+
+        Returns:
+            Extracted text, or an empty string if the page could not be read
+        """
+        with self._host_lock:
+            host_limit = self._host_limits[urlparse(url).netloc]
+
+        with host_limit:
+            try:
+                with self.session.get(url, timeout=self.timeout, stream=True) as response:
+                    content_type = response.headers.get("Content-Type", "text/html").lower()
+                    if response.status_code != 200 or not content_type.startswith(self.TEXT_CONTENT_TYPES):
+                        return ""
+
+                    decoder = None
+                    extractor = TextExtractor()
+                    received = 0
+                    for chunk in response.iter_content(chunk_size=16384):
+                        if decoder is None:
+                            encoding = self.detect_encoding(content_type, chunk)
+                            decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+                        received += len(chunk)
+                        extractor.feed(decoder.decode(chunk))
+                        if received >= self.max_bytes:
+                            break
+                    if decoder is not None:
+                        extractor.feed(decoder.decode(b"", final=True))
+                    extractor.close()
+                    return extractor.get_text()
+            except (requests.RequestException, LookupError):
+                return ""
+
+    @staticmethod
+    def detect_encoding(content_type, head):
+        """Pick the character encoding of a page
+
+        requests assumes ISO-8859-1 for text/html without a charset, which garbles the
+        many UTF-8 pages that declare their charset only in a <meta> tag, so the header
+        is used only when it names a charset.
+
+        Args:
+            content_type: Value of the Content-Type header
+            head: First bytes of the body
+
+        Returns:
+            Charset from the header, else from a <meta> tag in head, else "utf-8"
+        """
+        match = re.search(r"charset=[\"']?([\w.:-]+)", content_type, re.IGNORECASE)
+        if not match:
+            match = re.search(rb"<meta[^>]+charset=[\"']?([\w.:-]+)", head[:4096], re.IGNORECASE)
+        if match:
+            encoding = match.group(1)
+            encoding = encoding.decode("ascii") if isinstance(encoding, bytes) else encoding
+            try:
+                return codecs.lookup(encoding).name
+            except LookupError:
+                pass
+        return "utf-8"
+
+    def fetch_many(self, urls):
+        """Download several pages concurrently
+
+        Args:
+            urls: List of page URLs
+
+        Returns:
+            List of extracted texts in the order of urls
+        """
+        return list(self._executor.map(self.fetch, urls))
+
+    def relevant_chunks(self, query, pages, max_chunks=4):
+        """Split pages into chunks and return the ones most relevant to the query
+
+        Args:
+            query: The search query
+            pages: List of (url, text) tuples
+            max_chunks: Number of chunks to return
+
+        Returns:
+            List of (url, chunk) tuples, best first
+        """
+        chunks = [(url, chunk) for url, text in pages for chunk in self.chunk_text(text)]
+        if not chunks:
+            return []
+
+        terms = set(self.tokenize(query))
+        counts = [Counter(self.tokenize(chunk)) for _, chunk in chunks]
+
+        # Weight rare terms higher so common words do not dominate the ranking
+        document_frequency = Counter(term for count in counts for term in terms if term in count)
+
+        scores = []
+        for count in counts:
+            score = sum(
+                math.log(1 + count[term]) * math.log(1 + len(chunks) / document_frequency[term])
+                for term in terms if count[term]
+            )
+            scores.append(score / math.sqrt(sum(count.values()) or 1))
+
+        ranked = sorted(range(len(chunks)), key=lambda index: scores[index], reverse=True)
+        return [chunks[index] for index in ranked[:max_chunks] if scores[index] > 0]
+
+    @staticmethod
+    def chunk_text(text, size=None):
+        """Split text into chunks of roughly size words"""
+        size = size or PageFetcher.CHUNK_WORDS
+        words = text.split()
+        return [" ".join(words[start:start + size]) for start in range(0, len(words), size)]
+
+    @staticmethod
+    def tokenize(text):
+        """Lower-case word tokens used for relevance scoring"""
+        return re.findall(r"[a-z0-9]+", text.lower())
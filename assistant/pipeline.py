@@ -0,0 +1,171 @@
+import time
+from contextlib import contextmanager
+from .llm_factory import LLMFactory
+from .research_agent import ResearchAgent
+from .search_tools import SearchTools
+from .answer_cache import SemanticAnswerCache
+from .query_classifier import QueryClassifier
+from .registry import ResourceRegistry
+from .sources import SourceTracker
+from .scheduler import RequestScheduler, AdmissionTimeout
+from utils.tracing import QueryTrace, Tracer
+
+class ResearchPipeline:
+    """Runs a research query end to end without depending on the Streamlit UI"""
+
+    BUSY_MESSAGE = "The assistant is busy right now. Please try again in a moment."
+
+    @staticmethod
+    def generate(query, llm_provider, memory, search_enabled=True, agent_mode="ReAct",
+                 ollama_class=None, ollama_available=False, has_history=False, stream=False, model_name=None,
+                 session_id=None, on_wait=None):
+        """Generate a response to a query
+
+        Args:
+            query: The user's query
+            llm_provider: The LLM provider ("OpenAI" or "Local (Ollama)")
+            memory: The session's TokenBudgetMemory
+            search_enabled: Whether the user enabled Google Search
+            agent_mode: "ReAct" or "Plan & Execute"
+            ollama_class: The Ollama class to use if provider is "Local (Ollama)"
+            ollama_available: Whether Ollama is available
+            has_history: Whether the conversation already has earlier turns
+            stream: Return an event generator (see ResearchAgent.stream_query)
+            model_name: Model to use instead of the provider's default
+            session_id: Identifier of the session, used to queue queries fairly
+            on_wait: Optional callback receiving the queue position while the query
+                waits for admission (see RequestScheduler.admit)
+
+        Returns:
+            Response text, an event generator when stream is True, or None if no LLM
+            could be created
+        """
+        # Serve paraphrases of recently answered questions from the answer cache
+        if not SemanticAnswerCache.is_follow_up(query, has_history):
+            with Tracer.span("answer_cache") as span:
+                cache_key = ResearchPipeline.answer_cache_key(llm_provider, search_enabled, model_name)
+                cached = ResourceRegistry.get_answer_cache().lookup(query, cache_key)
+                span["hit"] = cached is not None
+            if cached:
+                return ResearchPipeline.format_cached_answer(cached)
+
+        with Tracer.span("setup"):
+            # Get search tools, unless the question can be answered from the model's knowledge
+            tools = SearchTools.get_search_tools(search_enabled)
+            if tools and QueryClassifier.is_enabled() and not QueryClassifier.needs_search(query):
+                tools = []
+
+            # Get the shared LLM client (built once per process)
+            llm = ResourceRegistry.get_llm(llm_provider, ollama_class, ollama_available, model_name)
+            if not llm:
+                return None
+
+            # Use the shared agent if search is enabled and tools are available
+            model = llm
+            if tools:
+                if agent_mode == "Plan & Execute":
+                    model = ResourceRegistry.get_planner(llm_provider, SearchTools.get_search_function(),
+                                                         ollama_class, ollama_available, model_name)
+                else:
+                    model = ResourceRegistry.get_agent(llm_provider, tools, ollama_class, ollama_available, model_name)
+
+        if tools:
+            def run(stream):
+                # Number and de-duplicate the sources found while answering, and list the cited ones
+                tracker = SourceTracker()
+                if stream:
+                    return ResearchPipeline._cite_stream(tracker, lambda: ResearchAgent.run_query(
+                        model, query, memory=memory, stream=True))
+                with tracker.activated():
+                    return tracker.cite(ResearchAgent.run_query(model, query, memory=memory))
+        else:
+            # Use LLM directly if no search or tools, with the history that fits the token budget
+            synthesis_llm = ResourceRegistry.get_role_llm("synthesis", llm_provider, ollama_class,
+                                                          ollama_available, model_name) or llm
+            
+            def run(stream):
+                return ResearchAgent.run_query(synthesis_llm, query, memory.get_history(), stream=stream)
+
+        # Remember generated answers so paraphrased questions can be served from cache
+        if stream:
+            response = ResearchPipeline._admitted_stream(lambda: run(True), session_id, on_wait)
+            return ResearchPipeline._remember_stream(response, query, llm_provider, search_enabled, has_history, model_name)
+        try:
+            with ResearchPipeline.admitted(session_id, on_wait):
+                response = run(False)
+        except AdmissionTimeout:
+            return ResearchPipeline.BUSY_MESSAGE
+        ResearchPipeline.remember_answer(query, response, llm_provider, search_enabled, has_history, model_name)
+        return response
+
+    @staticmethod
+    @contextmanager
+    def admitted(session_id=None, on_wait=None):
+        """Hold one of the process-wide query slots, recording the wait in the current trace"""
+        start = time.perf_counter()
+        with RequestScheduler.shared().admit(session_id, on_wait):
+            trace = QueryTrace.current()
+            if trace is not None:
+                trace.add_span("admission", start, time.perf_counter() - start)
+            yield
+
+    @staticmethod
+    def _admitted_stream(start_stream, session_id=None, on_wait=None):
+        """Wait for admission when the stream is first consumed and hold the slot until it ends"""
+        try:
+            with ResearchPipeline.admitted(session_id, on_wait):
+                yield from start_stream()
+        except AdmissionTimeout:
+            yield {"type": "final", "content": ResearchPipeline.BUSY_MESSAGE}
+
+    @staticmethod
+    def _cite_stream(tracker, start_stream):
+        """Run a stream with the source tracker active and add the cited sources to the final answer"""
+        with tracker.activated():
+            for event in start_stream():
+                if event["type"] == "final":
+                    event = {**event, "content": tracker.cite(event["content"])}
+                yield event
+
+    @staticmethod
+    def is_failure(answer):
+        """Whether a response reports an error or a full queue instead of answering"""
+        return answer.startswith(("An error occurred", "Setup failed")) or answer == ResearchPipeline.BUSY_MESSAGE
+
+    @staticmethod
+    def remember_answer(query, answer, llm_provider, search_enabled=True, has_history=False, model_name=None):
+        """Store a generated answer in the semantic answer cache
+
+        Errors and follow-up questions that depend on the conversation are not stored.
+        """
+        if ResearchPipeline.is_failure(answer) or SemanticAnswerCache.is_follow_up(query, has_history):
+            return
+        cache_key = ResearchPipeline.answer_cache_key(llm_provider, search_enabled, model_name)
+        ResourceRegistry.get_answer_cache().store(query, answer, cache_key)
+
+    @staticmethod
+    def _remember_stream(events, query, llm_provider, search_enabled, has_history, model_name=None):
+        """Pass events through and store the final answer once the stream completes"""
+        for event in events:
+            if event["type"] == "final":
+                ResearchPipeline.remember_answer(query, event["content"], llm_provider, search_enabled,
+                                                 has_history, model_name)
+            yield event
+
+    @staticmethod
+    def answer_cache_key(llm_provider, search_enabled=True, model_name=None):
+        """Build the answer cache partition key for a configuration"""
+        search_active = search_enabled and SearchTools.has_search_keys()
+        model = LLMFactory.get_model_name(llm_provider, model_name)
+        return SemanticAnswerCache.make_key(llm_provider, model, search_active)
+
+    @staticmethod
+    def format_cached_answer(cached):
+        """Format a cached answer with its sources and age"""
+        created_at = time.strftime("%Y-%m-%d %H:%M", time.localtime(cached["created_at"]))
+        result = cached["answer"]
+        # Answers from the search agent already end with their cited sources
+        if cached["sources"] and SourceTracker.SOURCES_HEADING not in result:
+            result += f"\n\n{SourceTracker.SOURCES_HEADING} " + ", ".join(cached["sources"])
+        result += f"\n\n*⚡ Cached answer from {created_at} for a similar question: \"{cached['query']}\"*"
+        return result
@@ -0,0 +1,102 @@
+import os
+import re
+from langchain_core.messages import SystemMessage, HumanMessage
+from utils.tracing import Tracer
+from .synthesis import synthesis_messages
+
+class PlanExecuteAgent:
+    """Research agent that plans every search up front, runs them as one batch and answers once
+
+    A ReAct agent makes an LLM call between every search (2N+1 calls for N searches);
+    this agent always needs exactly two: one to decompose the question into search
+    queries and one to synthesize the cited answer from all results.
+    """
+
+    DEFAULT_MAX_QUERIES = 4
+
+    PLAN_PROMPT = """You are planning web research for a quantum research assistant with mathematics expertise.
+Break the user's question into at most {max_queries} independent Google search queries that together cover everything needed to answer it.
+Return only the queries, one per line, without numbering or commentary."""
+
+    def __init__(self, llm, search_func, max_queries=None, synthesis_llm=None):
+        """Create a plan-then-execute agent
+
+        Args:
+            llm: The language model used for planning (and synthesis by default)
+            search_func: Blocking function taking a query and returning result dictionaries
+            max_queries: Maximum number of searches per question (defaults to the
+                PLANNER_MAX_QUERIES environment variable)
+            synthesis_llm: Optional stronger model that writes the final answer
+        """
+        self.llm = llm
+        self.synthesis_llm = synthesis_llm or llm
+        self.search_func = search_func
+        self.max_queries = max_queries or int(os.getenv("PLANNER_MAX_QUERIES", self.DEFAULT_MAX_QUERIES))
+        # Per-session memory is injected through the inputs, as with a shared AgentExecutor
+        self.memory = None
+
+    def invoke(self, inputs, config=None):
+        """Answer a question
+
+        Args:
+            inputs: Dictionary with the question under "input" and optional "chat_history"
+            config: Optional runnable config passed to the LLM calls
+
+        Returns:
+            Dictionary with the answer under "output"
+        """
+        from .search_tools import SearchTools
+
+        question = inputs["input"]
+        queries = self.parse_plan(self.llm.invoke(self.plan_messages(question), config=config).content, question)
+        with Tracer.span("planner:searches", queries=len(queries)):
+            results = [SearchTools.observe(result) for result in SearchTools.search_many(queries, self.search_func)]
+        messages = synthesis_messages(question, queries, results, inputs.get("chat_history"))
+        return {"output": self.synthesis_llm.invoke(messages, config=config).content}
+
+    def stream(self, inputs, config=None):
+        """Answer a question, yielding events in the format of ResearchAgent.stream_query"""
+        from .search_tools import SearchTools
+
+        question = inputs["input"]
+        queries = self.parse_plan(self.llm.invoke(self.plan_messages(question), config=config).content, question)
+        for query in queries:
+            yield {"type": "action", "tool": "Google Search", "input": query}
+
+        with Tracer.span("planner:searches", queries=len(queries)):
+            results = [SearchTools.observe(result) for result in SearchTools.search_many(queries, self.search_func)]
+        yield {"type": "observation", "content": SearchTools.format_multi_results(queries, results)}
+
+        answer = ""
+        messages = synthesis_messages(question, queries, results, inputs.get("chat_history"))
+        for chunk in self.synthesis_llm.stream(messages, config=config):
+            if chunk.content:
+                answer += chunk.content
+                yield {"type": "token", "content": chunk.content}
+
+        yield {"type": "final", "content": answer}
+
+    def plan_messages(self, question):
+        """Build the messages for the planning call"""
+        return [
+            SystemMessage(content=self.PLAN_PROMPT.format(max_queries=self.max_queries)),
+            HumanMessage(content=question)
+        ]
+
+    def parse_plan(self, text, question):
+        """Extract the search queries from the planner output
+
+        Args:
+            text: Raw planner output
+            question: The original question, used when no query could be parsed
+
+        Returns:
+            List of at most max_queries distinct queries
+        """
+        queries = []
+        for line in text.splitlines():
+            # Drop list markers and quotes the model may add despite the instructions
+            query = re.sub(r"^\s*(?:[-*•]|\d+[.)])\s*", "", line).strip().strip("\"'")
+            if query and query not in queries:
+                queries.append(query)
+        return queries[:self.max_queries] or [question]
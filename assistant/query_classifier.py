@@ -0,0 +1,57 @@
+import os
+import re
+
+class QueryClassifier:
+    """Cheap rule-based check whether a question needs a web search
+
+    Definitions, explanations, derivations and calculations are answered from the
+    model's own knowledge; anything about recent events, specific named things,
+    numbers that change, or sources still goes through the search agent. Unclear
+    questions are searched, so the classifier only skips searches it is sure about.
+    """
+
+    # Signs that the answer depends on current or specific information
+    SEARCH_PATTERN = re.compile(
+        r"\b(latest|recent(ly)?|news|today|yesterday|tomorrow|current(ly)?|now|nowadays|this (week|month|year)|"
+        r"upcoming|price|cost|stock|weather|released?|announce[sd]?|launch(ed)?|who|whom|whose|"
+        r"when (is|was|will|did)|where (is|can|to)|(19|20)\d\d|papers?|arxiv|stud(y|ies)|sources?|cite|"
+        r"references?|links?|website|compan(y|ies)|versions?|record|ranking|best)\b",
+        re.IGNORECASE
+    )
+    # Questions about concepts, which the model can answer without searching
+    KNOWLEDGE_PATTERN = re.compile(
+        r"^\s*(what (is|are)|what's|define|explain|derive|prove|show that|calculate|compute|solve|simplify|"
+        r"evaluate|how (does|do) .+ work|why (is|are|does|do)|what is the difference|difference between|"
+        r"compare|give an? (example|intuition|analogy))\b",
+        re.IGNORECASE
+    )
+    SMALL_TALK_PATTERN = re.compile(
+        r"^\s*(hi|hello|hey|thanks|thank you|good (morning|afternoon|evening)|ok(ay)?|bye)\b[\s!.?]*$",
+        re.IGNORECASE
+    )
+    # Capitalized words after the first one usually name a product, person or organization
+    PROPER_NOUN_PATTERN = re.compile(r"(?<!^)(?<![.?!]\s)\b[A-Z][a-zA-Z]+")
+
+    @staticmethod
+    def is_enabled():
+        """Whether the classifier is enabled (SEARCH_CLASSIFIER, on by default)"""
+        return os.getenv("SEARCH_CLASSIFIER", "1").lower() not in ("0", "false", "off", "no")
+
+    @staticmethod
+    def needs_search(query):
+        """Decide whether a question should be answered with web search
+
+        Args:
+            query: The user's question
+
+        Returns:
+            False only for small talk and concept questions without signs of
+            current or specific information
+        """
+        if QueryClassifier.SMALL_TALK_PATTERN.match(query):
+            return False
+        if QueryClassifier.SEARCH_PATTERN.search(query):
+            return True
+        if QueryClassifier.PROPER_NOUN_PATTERN.search(query.strip()):
+            return True
+        return not QueryClassifier.KNOWLEDGE_PATTERN.match(query)
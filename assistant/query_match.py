@@ -0,0 +1,59 @@
+import re
+from utils.cache_utils import SearchCache
+
+class QueryMatch:
+    """Guards the reuse of results stored for one query for another, similar query
+
+    Embedding similarity cannot tell "IBM quantum roadmap 2024" from "IonQ quantum
+    roadmap 2023" or from "why is the roadmap not public". A stored result is only
+    reused when the queries are the same after normalization, or when they mention
+    the same numbers, the same names and agree on negation.
+    """
+
+    NEGATIONS = {"not", "no", "never", "without", "none", "nor", "cannot", "neither"}
+    # Capitalized words that start a question without naming anything
+    QUESTION_WORDS = {
+        "what", "whats", "what's", "how", "why", "who", "whom", "whose", "when", "where", "which", "is", "are",
+        "was", "were", "do", "does", "did", "can", "could", "should", "would", "will", "has", "have", "had",
+        "explain", "describe", "define", "compare", "list", "summarize", "tell", "give", "show", "find",
+        "the", "a", "an", "in", "on", "for", "of", "about", "latest", "recent", "current", "please"
+    }
+
+    @staticmethod
+    def normalize(query):
+        """Normalize a query the way the search cache does"""
+        return SearchCache.normalize_query(query)
+
+    @classmethod
+    def terms(cls, query):
+        """Return the parts of a query that must match for its results to be reused
+
+        Returns:
+            Tuple of (sorted numbers, set of lower-cased names, whether the query is negated)
+        """
+        numbers = tuple(sorted(re.findall(r"\d+(?:[.,]\d+)*", query)))
+
+        names = set()
+        sentence_start = True
+        for match in re.finditer(r"[A-Za-z][\w&'’.-]*|[.?!:;]", query):
+            word = match.group().rstrip(".")
+            if word in ".?!:;" or not word:
+                sentence_start = True
+                continue
+            word = re.sub(r"['’]s$", "", word)
+            capitalized = word[0].isupper() and (not sentence_start or word.lower() not in cls.QUESTION_WORDS)
+            # Acronyms and names such as IBM, IonQ or eBay are names anywhere in the query
+            if capitalized or any(char.isupper() for char in word[1:]):
+                names.add(word.lower())
+            sentence_start = False
+
+        words = re.findall(r"[a-z']+", query.lower())
+        negated = any(word in cls.NEGATIONS or word.endswith("n't") for word in words)
+        return numbers, names, negated
+
+    @classmethod
+    def compatible(cls, query, other):
+        """Whether results stored for other may be reused for query"""
+        if cls.normalize(query) == cls.normalize(other):
+            return True
+        return cls.terms(query) == cls.terms(other)
@@ -0,0 +1,166 @@
+import os
+import hashlib
+import threading
+from .llm_factory import LLMFactory
+from .research_agent import ResearchAgent
+from .planner import PlanExecuteAgent
+from .answer_cache import SemanticAnswerCache
+
+class ResourceRegistry:
+    """Process-wide registry of expensive resources (LLM clients, search wrappers, agents)
+
+    Resources are built once per process and shared by every Streamlit session and
+    rerun, so HTTP connection pools are reused between queries. Nothing session
+    specific (such as conversation memory) is stored here.
+    """
+
+    _resources = {}
+    _lock = threading.RLock()
+
+    @classmethod
+    def get_or_create(cls, key, factory):
+        """Return the resource stored under key, building it with factory on first use
+
+        Args:
+            key: Hashable key identifying the resource
+            factory: Callable returning the resource; a None result is not cached
+
+        Returns:
+            The cached or newly built resource
+        """
+        with cls._lock:
+            if key in cls._resources:
+                return cls._resources[key]
+
+            resource = factory()
+            if resource is not None:
+                cls._resources[key] = resource
+            return resource
+
+    @classmethod
+    def get_llm(cls, provider, ollama_class=None, ollama_available=False, model_name=None):
+        """Return a shared LLM client for the provider
+
+        Args:
+            provider: The LLM provider ("OpenAI" or "Local (Ollama)")
+            ollama_class: The Ollama class to use if provider is "Local (Ollama)"
+            ollama_available: Whether Ollama is available
+            model_name: Model to use instead of the provider's default
+
+        Returns:
+            LLM instance or None if creation failed
+        """
+        return cls.get_or_create(
+            cls.llm_key(provider, model_name),
+            lambda: LLMFactory.create_llm(provider, ollama_class, ollama_available, model_name)
+        )
+
+    @classmethod
+    def get_agent(cls, provider, tools, ollama_class=None, ollama_available=False, model_name=None):
+        """Return a shared agent executor for the provider and tool set
+
+        The executor is built without memory; per-session memory is passed to
+        ResearchAgent.run_query instead.
+
+        Args:
+            provider: The LLM provider ("OpenAI" or "Local (Ollama)")
+            tools: List of tools available to the agent
+            ollama_class: The Ollama class to use if provider is "Local (Ollama)"
+            ollama_available: Whether Ollama is available
+            model_name: Model to use instead of the provider's default
+
+        Returns:
+            AgentExecutor instance or None if it could not be built
+        """
+        def build():
+            llm = cls.get_role_llm("reasoning", provider, ollama_class, ollama_available, model_name)
+            synthesis_llm = cls.get_role_llm("synthesis", provider, ollama_class, ollama_available, model_name)
+            if llm is None or synthesis_llm is None:
+                return None
+            # Only split the roles when they actually use different models
+            return ResearchAgent.create_agent(llm, tools, synthesis_llm=synthesis_llm if synthesis_llm is not llm else None)
+
+        key = (("agent",) + cls.llm_key(provider, model_name)[1:] + (tuple(tool.name for tool in tools),)
+               + cls.roles_key())
+        return cls.get_or_create(key, build)
+
+    @classmethod
+    def get_planner(cls, provider, search_func, ollama_class=None, ollama_available=False, model_name=None):
+        """Return a shared plan-then-execute agent for the provider
+
+        Args:
+            provider: The LLM provider ("OpenAI" or "Local (Ollama)")
+            search_func: Blocking search function used to run the planned queries
+            ollama_class: The Ollama class to use if provider is "Local (Ollama)"
+            ollama_available: Whether Ollama is available
+            model_name: Model to use instead of the provider's default
+
+        Returns:
+            PlanExecuteAgent instance or None if the LLM could not be built
+        """
+        def build():
+            llm = cls.get_role_llm("reasoning", provider, ollama_class, ollama_available, model_name)
+            synthesis_llm = cls.get_role_llm("synthesis", provider, ollama_class, ollama_available, model_name)
+            if llm is None or synthesis_llm is None:
+                return None
+            return PlanExecuteAgent(llm, search_func, synthesis_llm=synthesis_llm)
+
+        return cls.get_or_create(("planner",) + cls.llm_key(provider, model_name)[1:] + cls.roles_key(), build)
+
+    @classmethod
+    def get_role_llm(cls, role, provider, ollama_class=None, ollama_available=False, model_name=None):
+        """Return the shared LLM client for an agent role
+
+        Uses the model configured for the role (see LLMFactory.get_role_spec), or the
+        session's provider and model when none is configured.
+
+        Args:
+            role: "reasoning" or "synthesis"
+            provider: The session's LLM provider
+            ollama_class: The Ollama class to use for Ollama models
+            ollama_available: Whether Ollama is available
+            model_name: The session's model, used when the role has no model configured
+
+        Returns:
+            LLM instance or None if creation failed
+        """
+        spec = LLMFactory.get_role_spec(role)
+        if spec:
+            role_provider, role_model = LLMFactory.parse_model_spec(spec)
+            if role_provider is not None:
+                return cls.get_llm(role_provider, ollama_class, ollama_available, role_model)
+        return cls.get_llm(provider, ollama_class, ollama_available, model_name)
+
+    @classmethod
+    def get_answer_cache(cls):
+        """Return the semantic answer cache shared by all sessions"""
+        return cls.get_or_create(("answer_cache",), SemanticAnswerCache.from_env)
+
+    @classmethod
+    def clear(cls):
+        """Drop every cached resource"""
+        with cls._lock:
+            cls._resources.clear()
+
+    @classmethod
+    def register(cls, key, resource):
+        """Store a prebuilt resource under key, replacing any existing one
+
+        Used to substitute backends, e.g. fake LLMs and search wrappers in benchmarks.
+        """
+        with cls._lock:
+            cls._resources[key] = resource
+
+    @staticmethod
+    def roles_key():
+        """Return the part of an agent's registry key describing its per-role models"""
+        return tuple(LLMFactory.get_role_spec(role) for role in LLMFactory.ROLES)
+
+    @staticmethod
+    def llm_key(provider, model_name=None):
+        """Return the registry key of the LLM client for the provider and model"""
+        # Include a fingerprint of the API key so a key entered in the sidebar
+        # produces a fresh client instead of reusing one built with the old key
+        api_key = os.getenv("OPENAI_API_KEY", "") if provider in ("OpenAI", LLMFactory.ROUTER_PROVIDER) else ""
+        fingerprint = hashlib.sha256(api_key.encode()).hexdigest()[:12] if api_key else ""
+        return ("llm", provider, LLMFactory.get_model_name(provider, model_name), fingerprint)
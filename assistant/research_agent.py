@@ -1,100 +1,386 @@
+import sys
+import queue
+import threading
+import contextvars
+from functools import lru_cache
 from langchain_core.prompts import PromptTemplate
-from langchain.agents import AgentExecutor, create_react_agent
+from langchain_core.callbacks import BaseCallbackHandler
 from langchain_core.messages import SystemMessage, HumanMessage
+from utils.tracing import Tracer
+from utils.cache_utils import SingleFlight
+from .planner import PlanExecuteAgent
+from .synthesis import synthesis_messages, split_steps
+from .budget import QueryBudget
+
+class AgentStreamHandler(BaseCallbackHandler):
+    """Callback handler that forwards agent tokens and tool events to a queue"""
+    
+    def __init__(self, event_queue):
+        self.event_queue = event_queue
+    
+    def on_llm_start(self, serialized, prompts, **kwargs):
+        self.event_queue.put(("llm_start", None))
+    
+    def on_chat_model_start(self, serialized, messages, **kwargs):
+        self.event_queue.put(("llm_start", None))
+    
+    def on_llm_new_token(self, token, **kwargs):
+        self.event_queue.put(("llm_token", token))
+    
+    def on_agent_action(self, action, **kwargs):
+        self.event_queue.put(("action", {"tool": action.tool, "input": action.tool_input}))
+    
+    def on_tool_end(self, output, **kwargs):
+        self.event_queue.put(("observation", str(output)))
 
 class ResearchAgent:
     """Manages the research agent functionality"""
     
+    # Prompts start with their static instructions so that providers and Ollama can
+    # reuse the computed prefix between calls; the per-call text always comes last
+    REACT_PROMPT = """You are a quantum research assistant with mathematics expertise. Your goal is to help users find information and answer their questions.
+You have access to Google Search. Use it to find the most up-to-date information.
+When you need several independent facts, look them up together with a single Google Multi Search.
+
+You have access to the following tools:
+{tools}
+
+Use the following format:
+Question: the input question you must answer
+Thought: you should always think about what to do
+Action: the action to take, should be one of [{tool_names}]
+Action Input: the input to the action
+Observation: the result of the action
+... (this Thought/Action/Action Input/Observation can repeat N times)
+Thought: I now know the final answer
+{final_answer}
+
+Begin! Provide detailed and accurate information to the user, and cite your sources by their [n] IDs.
+
+Question: {input}
+{agent_scratchpad}"""
+    
+    DIRECT_PROMPT = """You are a quantum research assistant with mathematics expertise.
+You do NOT have access to Google Search, so use only your built-in knowledge to answer questions.
+Provide detailed and accurate information to the user."""
+    
+    DIRECT_SYSTEM_MESSAGE = SystemMessage(content=DIRECT_PROMPT)
+    
     @staticmethod
-    def create_agent(llm, tools, memory):
+    @lru_cache(maxsize=None)
+    def react_prompt(synthesizing=False):
+        """Return the ReAct prompt template (built once per answer style)
+        
+        Args:
+            synthesizing: Whether a synthesis model writes the answer afterwards, in
+                which case the reasoning model's conclusion is kept short
+        """
+        if synthesizing:
+            final_answer = "Final Answer: one sentence saying what you found"
+        else:
+            final_answer = "Final Answer: the final answer to the original input question"
+        return PromptTemplate.from_template(ResearchAgent.REACT_PROMPT).partial(final_answer=final_answer)
+    
+    @staticmethod
+    def create_agent(llm, tools, memory=None, synthesis_llm=None):
         """Create a research agent with the given LLM, tools, and memory
         
         Args:
             llm: The language model
             tools: List of tools available to the agent
-            memory: Conversation memory
+            memory: Conversation memory to bind to the executor; leave as None for
+                executors shared between sessions and pass memory to run_query instead
+            synthesis_llm: Optional stronger model that writes the final answer; llm
+                then only picks tools and search queries
             
         Returns:
-            AgentExecutor instance or None if tools aren't available
+            BudgetedAgentExecutor (or SynthesizingAgent when synthesis_llm is given)
+            instance or None if tools aren't available
         """
         if len(tools) > 0:
-            # Define the agent's prompt template with search status
-            template = """You are a quantum research assistant with mathematics expertise. Your goal is to help users find information and answer their questions.
-            You have access to Google Search. Use it to find the most up-to-date information.
-            
-            You have access to the following tools:
-            {tools}
-            
-            Use the following format:
-            Question: the input question you must answer
-            Thought: you should always think about what to do
-            Action: the action to take, should be one of [{tool_names}]
-            Action Input: the input to the action
-            Observation: the result of the action
-            ... (this Thought/Action/Action Input/Observation can repeat N times)
-            Thought: I now know the final answer
-            Final Answer: the final answer to the original input question
-            
-            Begin! Provide detailed and accurate information to the user, and cite your sources when possible.
-            
-            Question: {input}
-            {agent_scratchpad}
-            """
+            # The prompt is built once per answer style; only the question and scratchpad vary
+            prompt = ResearchAgent.react_prompt(synthesis_llm is not None)
             
-            # Create prompt
-            prompt = PromptTemplate.from_template(template)
-            
-            # Create the agent
+            # Create the agent (langchain.agents is imported on first use; it is slow to load)
+            from langchain.agents import create_react_agent
+            from .agent_executor import BudgetedAgentExecutor
             agent = create_react_agent(llm, tools, prompt)
-            agent_executor = AgentExecutor.from_agent_and_tools(
+            agent_executor = BudgetedAgentExecutor.from_agent_and_tools(
                 agent=agent,
                 tools=tools,
                 memory=memory,
                 verbose=False,
-                handle_parsing_errors=True
+                handle_parsing_errors=True,
+                return_intermediate_steps=synthesis_llm is not None,
+                # A SynthesizingAgent writes the answer from the steps itself when the budget runs out
+                fallback_llm=llm if synthesis_llm is None else None
             )
             
+            if synthesis_llm is not None:
+                return SynthesizingAgent(agent_executor, synthesis_llm)
             return agent_executor
         return None
     
     @staticmethod
-    def run_query(model, query, chat_history=None):
+    def is_agent_executor(model):
+        """Whether model is a LangChain AgentExecutor, without importing langchain.agents"""
+        agents = sys.modules.get("langchain.agents")
+        return agents is not None and isinstance(model, agents.AgentExecutor)
+    
+    @staticmethod
+    def is_agent(model):
+        """Whether model is an agent with tools rather than a bare LLM"""
+        return isinstance(model, (PlanExecuteAgent, SynthesizingAgent)) or ResearchAgent.is_agent_executor(model)
+    
+    @staticmethod
+    def run_query(model, query, chat_history=None, memory=None, stream=False):
         """Run a research query using either an agent or direct LLM
         
         Args:
-            model: Either an AgentExecutor or LLM
+            model: An AgentExecutor, PlanExecuteAgent, SynthesizingAgent or LLM
             query: The user's query
             chat_history: Formatted chat history for LLM (not used for agent)
+            memory: Session memory whose variables are injected into the agent inputs
+                (not used for LLM)
+            stream: Return a generator of events instead of the full response
+                (see stream_query)
             
         Returns:
-            Response text
+            Response text, or an event generator when stream is True
         """
+        if stream:
+            return ResearchAgent.stream_query(model, query, chat_history, memory)
+        
+        # Record LLM and tool spans into the current trace, if any
+        config = {"callbacks": Tracer.callbacks()}
+        
         try:
-            if isinstance(model, AgentExecutor):
-                # This is the agent with tools
-                response = model.invoke({"input": query})
+            if ResearchAgent.is_agent(model):
+                # This is the agent with tools; its loop stops when the query budget runs out
+                budget = QueryBudget()
+                config["callbacks"] = config["callbacks"] + budget.callbacks()
+                with Tracer.span("run_query:agent"), budget.activated():
+                    response = model.invoke(ResearchAgent.build_agent_inputs(model, query, memory), config=config)
                 return response.get("output", "No response generated.")
             else:
                 # This is just the LLM (when search is disabled)
-                # Create a system message
-                system_message = """You are a quantum research assistant with mathematics expertise. 
-                You do NOT have access to Google Search, so use only your built-in knowledge to answer questions.
-                Provide detailed and accurate information to the user."""
-                
-                messages = [
-                    SystemMessage(content=system_message)
-                ]
+                messages = ResearchAgent.build_direct_messages(query, chat_history)
                 
-                # Add conversation history if available
-                if chat_history:
-                    messages.extend(chat_history)
+                # Get response from the LLM, sharing it with identical concurrent requests
+                with Tracer.span("run_query:direct") as span:
+                    response, span["coalesced"] = SingleFlight.shared("llm").do(
+                        ResearchAgent.request_key(model, messages), lambda: model.invoke(messages, config=config))
                 
-                # Add the current query
-                messages.append(HumanMessage(content=query))
+                return response.content
+        except Exception as e:
+            return f"An error occurred: {str(e)}"
+    
+    @staticmethod
+    def stream_query(model, query, chat_history=None, memory=None):
+        """Run a research query, yielding events as they are produced
+        
+        Events are dictionaries with a "type" key:
+            token: {"content": str} - the next piece of the answer
+            action: {"tool": str, "input": str} - the agent called a tool
+            observation: {"content": str} - the tool returned a result
+            final: {"content": str} - the complete answer (always the last event)
+        
+        Args:
+            model: An AgentExecutor, PlanExecuteAgent, SynthesizingAgent or LLM
+            query: The user's query
+            chat_history: Formatted chat history for LLM (not used for agent)
+            memory: Session memory whose variables are injected into the agent inputs
+                (not used for LLM)
+            
+        Yields:
+            Event dictionaries
+        """
+        config = {"callbacks": Tracer.callbacks()}
+        
+        try:
+            if isinstance(model, (PlanExecuteAgent, SynthesizingAgent)):
+                budget = QueryBudget()
+                config["callbacks"] = config["callbacks"] + budget.callbacks()
+                with Tracer.span("run_query:agent"), budget.activated():
+                    yield from model.stream(ResearchAgent.build_agent_inputs(model, query, memory), config=config)
+            elif ResearchAgent.is_agent_executor(model):
+                # Activated before the worker thread starts, so its copied context sees the budget
+                budget = QueryBudget()
+                config["callbacks"] = config["callbacks"] + budget.callbacks()
+                with Tracer.span("run_query:agent"), budget.activated():
+                    yield from ResearchAgent._stream_agent(model, ResearchAgent.build_agent_inputs(model, query, memory),
+                                                           config)
+            else:
+                messages = ResearchAgent.build_direct_messages(query, chat_history)
                 
-                # Get response from the LLM
-                response = model.invoke(messages)
+                answer = ""
+                chunks = SingleFlight.shared("llm").stream(
+                    ResearchAgent.request_key(model, messages), lambda: model.stream(messages, config=config))
+                for chunk in chunks:
+                    if chunk.content:
+                        answer += chunk.content
+                        yield {"type": "token", "content": chunk.content}
                 
-                return response.content
+                yield {"type": "final", "content": answer}
         except Exception as e:
-            return f"An error occurred: {str(e)}"
\ No newline at end of file
+            yield {"type": "final", "content": f"An error occurred: {str(e)}"}
+    
+    @staticmethod
+    def build_agent_inputs(model, query, memory=None):
+        """Build the input dictionary for an agent executor
+        
+        Args:
+            model: The AgentExecutor, PlanExecuteAgent or SynthesizingAgent
+            query: The user's query
+            memory: Session memory to inject when the executor has none of its own
+            
+        Returns:
+            Input dictionary for AgentExecutor.invoke
+        """
+        inputs = {"input": query}
+        if memory is not None and model.memory is None:
+            inputs.update(memory.load_memory_variables({}))
+        return inputs
+    
+    @staticmethod
+    def request_key(model, messages):
+        """Identify a direct LLM request for coalescing identical concurrent requests"""
+        # Models are process-wide singletons from the ResourceRegistry, so identity suffices
+        return (id(model),) + tuple((message.type, str(message.content)) for message in messages)
+    
+    @staticmethod
+    def build_direct_messages(query, chat_history=None):
+        """Build the message list for answering without tools
+        
+        Args:
+            query: The user's query
+            chat_history: Formatted chat history
+            
+        Returns:
+            List of messages ready for LLM invocation
+        """
+        # The shared system message keeps the prompt prefix identical across calls
+        messages = [ResearchAgent.DIRECT_SYSTEM_MESSAGE]
+        
+        # Add conversation history if available (append-only between compactions, see TokenBudgetMemory)
+        if chat_history:
+            messages.extend(chat_history)
+        
+        # Add the current query
+        messages.append(HumanMessage(content=query))
+        return messages
+    
+    @staticmethod
+    def _stream_agent(model, inputs, config=None, answer_tokens=True):
+        """Run the agent in a worker thread and translate its callbacks into events
+        
+        With answer_tokens False, the text after "Final Answer:" is not streamed as
+        token events; only the final event carries it.
+        """
+        event_queue = queue.Queue()
+        handler = AgentStreamHandler(event_queue)
+        callbacks = [handler] + list((config or {}).get("callbacks") or [])
+        
+        def worker():
+            try:
+                response = model.invoke(inputs, config={"callbacks": callbacks})
+                event_queue.put(("done", response.get("output", "No response generated.")))
+            except Exception as e:
+                event_queue.put(("done", f"An error occurred: {str(e)}"))
+        
+        # Run the worker in a copy of the current context so tool code sees the active trace
+        context = contextvars.copy_context()
+        threading.Thread(target=context.run, args=(worker,), daemon=True).start()
+        
+        # Text of the current LLM step and how much of its final answer was already sent
+        step_text = ""
+        sent = 0
+        marker = "Final Answer:"
+        
+        while True:
+            kind, payload = event_queue.get()
+            
+            if kind == "llm_start":
+                step_text = ""
+                sent = 0
+            elif kind == "llm_token":
+                step_text += payload
+                position = step_text.find(marker)
+                if position != -1 and answer_tokens:
+                    answer = step_text[position + len(marker):].lstrip()
+                    if len(answer) > sent:
+                        yield {"type": "token", "content": answer[sent:]}
+                        sent = len(answer)
+            elif kind == "action":
+                yield {"type": "action", "tool": payload["tool"], "input": payload["input"]}
+            elif kind == "observation":
+                yield {"type": "observation", "content": payload}
+            elif kind == "done":
+                yield {"type": "final", "content": payload}
+                return
+
+class SynthesizingAgent:
+    """ReAct agent whose tool steps run on a fast model and whose answer is written by a stronger one
+
+    Most ReAct iterations only pick the next search, so they do not need the large
+    model; it is called once, with every observation, to write the cited answer.
+    """
+    
+    def __init__(self, executor, synthesis_llm):
+        """Create the agent
+        
+        Args:
+            executor: AgentExecutor built with return_intermediate_steps=True
+            synthesis_llm: The language model that writes the final answer
+        """
+        self.executor = executor
+        self.synthesis_llm = synthesis_llm
+        # Per-session memory is injected through the inputs, as with a shared AgentExecutor
+        self.memory = None
+    
+    def invoke(self, inputs, config=None):
+        """Answer a question
+        
+        Args:
+            inputs: Dictionary with the question under "input" and optional "chat_history"
+            config: Optional runnable config passed to the executor and LLM calls
+            
+        Returns:
+            Dictionary with the answer under "output"
+        """
+        response = self.executor.invoke(inputs, config=config)
+        queries, results = split_steps(response["intermediate_steps"])
+        messages = synthesis_messages(inputs["input"], queries, results, inputs.get("chat_history"))
+        return {"output": self.synthesis_llm.invoke(messages, config=config).content}
+    
+    def stream(self, inputs, config=None):
+        """Answer a question, yielding events in the format of ResearchAgent.stream_query"""
+        actions = []
+        observations = []
+        for event in ResearchAgent._stream_agent(self.executor, inputs, config, answer_tokens=False):
+            if event["type"] == "action":
+                actions.append(event)
+            elif event["type"] == "observation":
+                observations.append(event["content"])
+            elif event["type"] == "final":
+                if event["content"].startswith("An error occurred"):
+                    yield event
+                    return
+                continue
+            yield event
+        
+        queries = []
+        results = []
+        for action, observation in zip(actions, observations):
+            if action["tool"] != "_Exception":
+                queries.append(f"{action['tool']}: {action['input']}")
+                results.append(observation)
+        
+        answer = ""
+        messages = synthesis_messages(inputs["input"], queries, results, inputs.get("chat_history"))
+        for chunk in self.synthesis_llm.stream(messages, config=config):
+            if chunk.content:
+                answer += chunk.content
+                yield {"type": "token", "content": chunk.content}
+        
+        yield {"type": "final", "content": answer}
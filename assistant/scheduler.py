@@ -0,0 +1,211 @@
+import os
+import time
+import random
+import threading
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from langchain_core.rate_limiters import InMemoryRateLimiter
+
+class AdmissionTimeout(Exception):
+    """Raised when a query waited longer than ADMISSION_TIMEOUT for a free slot"""
+
+class RequestScheduler:
+    """Process-wide admission control and rate limiting for LLM and search backends
+
+    At most MAX_CONCURRENT_QUERIES queries run at once. Waiting queries are admitted
+    round-robin across sessions, so one session sending many queries cannot starve
+    the others. Each backend additionally has a token bucket limiting its request
+    rate, and search calls rejected with HTTP 429 are retried with exponential
+    backoff and jitter.
+    """
+
+    DEFAULT_MAX_CONCURRENT = 4
+    DEFAULT_ADMISSION_TIMEOUT = 120.0
+    # Requests per second and burst size per backend (0 disables the limit)
+    DEFAULT_RATES = {"google": (1.5, 10), "openai": (0, 0), "ollama": (0, 0)}
+    DEFAULT_MAX_RETRIES = 4
+    BACKOFF_BASE = 0.5
+    BACKOFF_MAX = 20.0
+
+    _shared = None
+    _limiters = {}
+    _lock = threading.Lock()
+
+    def __init__(self, max_concurrent=None, timeout=None):
+        """Create a scheduler
+
+        Args:
+            max_concurrent: Maximum number of queries running at once (defaults to
+                MAX_CONCURRENT_QUERIES)
+            timeout: Seconds a query may wait for admission (defaults to ADMISSION_TIMEOUT)
+        """
+        self.max_concurrent = max_concurrent or int(os.getenv("MAX_CONCURRENT_QUERIES", self.DEFAULT_MAX_CONCURRENT))
+        self.timeout = timeout or float(os.getenv("ADMISSION_TIMEOUT", self.DEFAULT_ADMISSION_TIMEOUT))
+        self.active = 0
+        # Waiting tickets per session; sessions are served in this order
+        self._queues = OrderedDict()
+        self._condition = threading.Condition()
+
+    @classmethod
+    def shared(cls):
+        """Return the scheduler shared by every session in the process"""
+        with cls._lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    @classmethod
+    def configure(cls, max_concurrent=None, timeout=None):
+        """Replace the shared scheduler with one using explicit limits
+
+        Used by callers that know their own concurrency, such as batch mode, which
+        needs a slot for every worker whatever MAX_CONCURRENT_QUERIES says.
+
+        Returns:
+            The new shared scheduler
+        """
+        with cls._lock:
+            cls._shared = cls(max_concurrent, timeout)
+            return cls._shared
+
+    @contextmanager
+    def admit(self, session_id=None, on_wait=None):
+        """Wait for a free slot and hold it for the duration of the block
+
+        Args:
+            session_id: Identifier of the session the query belongs to
+            on_wait: Optional callback receiving the 1-based queue position whenever it
+                changes while waiting
+
+        Raises:
+            AdmissionTimeout: If no slot became free within the timeout
+        """
+        ticket = object()
+        session_id = session_id if session_id is not None else id(ticket)
+        deadline = time.monotonic() + self.timeout
+        reported = None
+
+        with self._condition:
+            self._queues.setdefault(session_id, deque()).append(ticket)
+        try:
+            while True:
+                with self._condition:
+                    if self.active < self.max_concurrent and self._next_ticket() is ticket:
+                        self._dequeue(session_id, ticket)
+                        # Serve the other sessions before this one's next query
+                        if session_id in self._queues:
+                            self._queues.move_to_end(session_id)
+                        self.active += 1
+                        break
+                    if time.monotonic() >= deadline:
+                        raise AdmissionTimeout(f"No capacity after waiting {self.timeout:.0f}s")
+                    position = self.position(ticket)
+                    if position == reported or on_wait is None:
+                        self._condition.wait(min(0.5, max(0.0, deadline - time.monotonic())))
+                        continue
+                # Report outside the lock; the callback may update the UI
+                reported = position
+                on_wait(position)
+        except BaseException:
+            with self._condition:
+                self._dequeue(session_id, ticket)
+                self._condition.notify_all()
+            raise
+
+        try:
+            yield
+        finally:
+            with self._condition:
+                self.active -= 1
+                self._condition.notify_all()
+
+    def position(self, ticket):
+        """Return the 1-based position of a waiting ticket in round-robin order"""
+        queues = [list(queue) for queue in self._queues.values()]
+        position = 0
+        for depth in range(max((len(queue) for queue in queues), default=0)):
+            for queue in queues:
+                if depth < len(queue):
+                    position += 1
+                    if queue[depth] is ticket:
+                        return position
+        return position
+
+    def waiting(self):
+        """Return the number of queries waiting for admission"""
+        with self._condition:
+            return sum(len(queue) for queue in self._queues.values())
+
+    def _next_ticket(self):
+        for queue in self._queues.values():
+            if queue:
+                return queue[0]
+        return None
+
+    def _dequeue(self, session_id, ticket):
+        queue = self._queues.get(session_id)
+        if queue is not None and ticket in queue:
+            queue.remove(ticket)
+            if not queue:
+                del self._queues[session_id]
+
+    @classmethod
+    def rate_limiter(cls, backend):
+        """Return the process-wide token bucket for a backend, or None if unlimited
+
+        The rate and burst are set with <BACKEND>_REQUESTS_PER_SECOND and
+        <BACKEND>_BURST, e.g. GOOGLE_REQUESTS_PER_SECOND.
+
+        Args:
+            backend: "google", "openai" or "ollama"
+        """
+        default_rate, default_burst = cls.DEFAULT_RATES.get(backend, (0, 0))
+        rate = float(os.getenv(f"{backend.upper()}_REQUESTS_PER_SECOND", default_rate))
+        if rate <= 0:
+            return None
+        burst = int(os.getenv(f"{backend.upper()}_BURST", default_burst) or 1)
+
+        with cls._lock:
+            key = (backend, rate, burst)
+            if key not in cls._limiters:
+                cls._limiters[key] = InMemoryRateLimiter(requests_per_second=rate, check_every_n_seconds=0.05,
+                                                         max_bucket_size=max(1, burst))
+            return cls._limiters[key]
+
+    @classmethod
+    def limited(cls, backend, func):
+        """Wrap a blocking backend call with the backend's rate limit and 429 backoff
+
+        Args:
+            backend: Backend name passed to rate_limiter
+            func: The function calling the backend
+
+        Returns:
+            Function with the same signature
+        """
+        def call(*args, **kwargs):
+            limiter = cls.rate_limiter(backend)
+            retries = int(os.getenv("BACKEND_MAX_RETRIES", cls.DEFAULT_MAX_RETRIES))
+            for attempt in range(retries + 1):
+                if limiter is not None:
+                    limiter.acquire()
+                try:
+                    return func(*args, **kwargs)
+                except Exception as e:
+                    if attempt == retries or not cls.is_rate_limited(e):
+                        raise
+                    # Full jitter spreads out the retries of sessions throttled together
+                    time.sleep(random.uniform(0, min(cls.BACKOFF_MAX, cls.BACKOFF_BASE * 2 ** attempt)))
+
+        return call
+
+    @staticmethod
+    def is_rate_limited(error):
+        """Whether an exception reports HTTP 429 / quota exhaustion"""
+        status = getattr(error, "status_code", None) or getattr(getattr(error, "resp", None), "status", None)
+        if status is None:
+            status = getattr(getattr(error, "response", None), "status_code", None)
+        if str(status) == "429":
+            return True
+        message = str(error).lower()
+        return "429" in message or "rate limit" in message or "ratelimit" in message or "quota" in message
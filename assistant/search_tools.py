@@ -1,32 +1,343 @@
 import os
-from langchain_google_community import GoogleSearchAPIWrapper
-from langchain.agents import Tool
+import re
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from langchain_core.tools import Tool
+from utils.cache_utils import SearchCache, SingleFlight
+from utils.tracing import Tracer
+from .registry import ResourceRegistry
+from .scheduler import RequestScheduler
+from .page_fetcher import PageFetcher
+from .knowledge_index import VectorIndex
+from .sources import SourceTracker
+from .query_match import QueryMatch
 
 class SearchTools:
     """Manages search tools for the research assistant"""
     
+    DEFAULT_MAX_CONCURRENCY = 4
+    DEFAULT_FETCH_TOP_K = 3
+    DEFAULT_FETCH_MAX_CHUNKS = 4
+    DEFAULT_FETCH_MIN_SCORE = 0.15
+    DEFAULT_KNOWLEDGE_MATCH_SCORE = 0.9
+    DEFAULT_NUM_RESULTS = 5
+    
     @staticmethod
-    def get_search_tools():
+    def get_search_tools(search_enabled=None):
         """Get search tools if enabled and available
         
+        Args:
+            search_enabled: Whether search is enabled; read from the Streamlit session when None
+        
         Returns:
             List of tools or empty list if search is not available
         """
+        if search_enabled is None:
+            search_enabled = SearchTools.is_search_enabled()
+        
         # Only create search tools if search is enabled and API keys are available
         if (os.getenv("GOOGLE_API_KEY") and 
             os.getenv("GOOGLE_CSE_ID") and 
-            SearchTools.is_search_enabled()):
-            
-            search = GoogleSearchAPIWrapper()
-            return [
-                Tool(
-                    name="Google Search",
-                    description="Search Google for recent information on a topic",
-                    func=search.run
-                )
-            ]
+            search_enabled):
+            
+            # The search wrapper and tools are built once per process and shared
+            return list(ResourceRegistry.get_or_create(("search_tools",), SearchTools.create_search_tools))
         return []
     
+    @staticmethod
+    def create_search_tools():
+        """Build the search tools backed by the shared Google search function
+        
+        Results are rendered as compact observations with source IDs, leaving out what
+        the agent has already seen while answering the current question (see
+        SourceTracker).
+        
+        Returns:
+            List of tools
+        """
+        search_results = SearchTools.get_search_function()
+        page_passages = SearchTools.cached_search(SearchTools.read_top_results, namespace="page_passages")
+        
+        def search(query):
+            return SearchTools.observe(search_results(query))
+        
+        def read_pages(query):
+            return SearchTools.observe_pages(page_passages(query))
+        
+        def multi_search(queries):
+            queries = SearchTools.split_queries(queries)
+            results = SearchTools.search_many(queries, search_results)
+            return SearchTools.format_multi_results(queries, [SearchTools.observe(result) for result in results])
+        
+        return [
+            Tool(
+                name="Google Search",
+                description="Search Google for recent information on a topic",
+                func=search
+            ),
+            Tool(
+                name="Google Multi Search",
+                description=("Run several independent Google searches at the same time. "
+                             "Input: the search queries separated by ' | '"),
+                func=multi_search
+            ),
+            Tool(
+                name="Read Top Results",
+                description=("Search Google and read the full text of the top result pages. "
+                             "Use it when search snippets are not detailed enough. Input: a search query"),
+                func=read_pages
+            )
+        ]
+    
+    @staticmethod
+    def get_search_wrapper():
+        """Return the GoogleSearchAPIWrapper shared by the whole process"""
+        def create_wrapper():
+            # Imported on first use; the Google client libraries are slow to load
+            from langchain_google_community import GoogleSearchAPIWrapper
+            return GoogleSearchAPIWrapper()
+        
+        return ResourceRegistry.get_or_create(("google_wrapper",), create_wrapper)
+    
+    @staticmethod
+    def get_search_function():
+        """Return the shared, cached Google search function
+        
+        Returns:
+            Function taking a query string and returning a list of result dictionaries
+            (rank, title, link and snippet); render them with observe
+        """
+        def build():
+            # Rate limit and retry only the calls that actually reach Google
+            results = RequestScheduler.limited("google", SearchTools.get_search_wrapper().results)
+            num_results = int(os.getenv("SEARCH_NUM_RESULTS", SearchTools.DEFAULT_NUM_RESULTS))
+            
+            def search(query):
+                return SearchTools.normalize_results(results(query, num_results))
+            
+            return SearchTools.cached_search(SearchTools.indexed_search(search), namespace="google_results")
+        
+        return ResourceRegistry.get_or_create(("google_search",), build)
+    
+    @staticmethod
+    def get_knowledge_index():
+        """Return the VectorIndex of everything retrieved so far, shared by all sessions"""
+        return ResourceRegistry.get_or_create(("knowledge_index",), VectorIndex.from_env)
+    
+    @staticmethod
+    def indexed_search(search_func):
+        """Wrap a search function so results are stored in and served from the knowledge index
+        
+        A query whose embedding is close enough to an earlier query (KNOWLEDGE_MATCH_SCORE)
+        is answered with that query's results without calling the search backend, but
+        only if both mention the same numbers and names and agree on negation (see
+        QueryMatch). Stored results expire after SEARCH_CACHE_TTL like cached ones, and
+        are not reused at all when the search cache is disabled.
+        
+        Args:
+            search_func: Function taking a query string and returning result dictionaries
+            
+        Returns:
+            Function with the same signature
+        """
+        def search(query):
+            index = SearchTools.get_knowledge_index()
+            min_score = float(os.getenv("KNOWLEDGE_MATCH_SCORE", SearchTools.DEFAULT_KNOWLEDGE_MATCH_SCORE))
+            # With the search cache disabled, results are always fetched fresh
+            matches = index.search(query, k=3, min_score=min_score, where={"kind": "results"}) \
+                if SearchCache.shared().ttl else []
+            for _, _, metadata in matches:
+                # Embeddings barely separate "IBM ... 2023" from "IonQ ... 2024"
+                if QueryMatch.compatible(query, metadata["query"]):
+                    return metadata["results"]
+            
+            results = search_func(query)
+            if results:
+                text = " ".join(f"{result['title']}. {result['snippet']}" for result in results)
+                index.add([text], [{"kind": "results", "query": query, "results": results}], keys=[query])
+            return results
+        
+        return search
+    
+    @staticmethod
+    def get_page_fetcher():
+        """Return the PageFetcher (and its connection pool) shared by the whole process"""
+        return ResourceRegistry.get_or_create(("page_fetcher",), PageFetcher)
+    
+    @staticmethod
+    def read_top_results(query):
+        """Search Google, download the top result pages and return their most relevant passages
+        
+        The number of pages and passages are set with FETCH_TOP_K and FETCH_MAX_CHUNKS;
+        passages scoring below FETCH_MIN_SCORE against the query are left out.
+        
+        Args:
+            query: The search query
+            
+        Returns:
+            List of passage dictionaries (title, link and the passage as snippet), or a
+            message when no page could be read
+        """
+        top_k = int(os.getenv("FETCH_TOP_K", SearchTools.DEFAULT_FETCH_TOP_K))
+        max_chunks = int(os.getenv("FETCH_MAX_CHUNKS", SearchTools.DEFAULT_FETCH_MAX_CHUNKS))
+        
+        results = RequestScheduler.limited("google", SearchTools.get_search_wrapper().results)(query, top_k)
+        urls = [result["link"] for result in results if result.get("link")]
+        if not urls:
+            return "No pages found for this query."
+        
+        fetcher = SearchTools.get_page_fetcher()
+        pages = list(zip(urls, fetcher.fetch_many(urls)))
+        
+        # Pre-select passages lexically, then index them and rank them together with
+        # passages kept from earlier research so only the best few reach the prompt
+        index = SearchTools.get_knowledge_index()
+        candidates = fetcher.relevant_chunks(query, pages, max_chunks * 3)
+        index.add([chunk for _, chunk in candidates],
+                  [{"kind": "page", "url": url, "query": query} for url, _ in candidates])
+        # Passages kept from earlier research only count when they are actually relevant
+        min_score = float(os.getenv("FETCH_MIN_SCORE", SearchTools.DEFAULT_FETCH_MIN_SCORE))
+        passages = [(metadata["url"], text) for _, text, metadata in
+                    index.search(query, k=max_chunks, min_score=min_score, where={"kind": "page"})]
+        if not passages:
+            return "The result pages had no passages relevant to this query. Try Google Search instead."
+        
+        titles = {result["link"]: result.get("title", "") for result in results if result.get("link")}
+        return [{"rank": rank, "title": titles.get(url, ""), "link": url, "snippet": passage}
+                for rank, (url, passage) in enumerate(passages, start=1)]
+    
+    @staticmethod
+    def normalize_results(results):
+        """Keep the title, link and snippet of Google results and number them by rank
+        
+        Entries without a link (such as the wrapper's "no result" placeholder) are dropped.
+        """
+        return [
+            {"rank": rank, "title": result.get("title", ""), "link": result["link"],
+             "snippet": result.get("snippet", "")}
+            for rank, result in enumerate((result for result in results if result.get("link")), start=1)
+        ]
+    
+    @staticmethod
+    def observe(results):
+        """Render search results as an observation for the agent
+        
+        Results get the source IDs of the current answer's SourceTracker; URLs and
+        snippets it has already shown are left out. Messages (failed searches) are
+        passed through.
+        """
+        if isinstance(results, str):
+            return results
+        if not results:
+            return "No results found."
+        tracker = SourceTracker.current() or SourceTracker()
+        return tracker.format_observation(results)
+    
+    @staticmethod
+    def observe_pages(passages):
+        """Render page passages as an observation; passages are kept whole and several may share a page"""
+        if isinstance(passages, str):
+            return passages
+        tracker = SourceTracker.current() or SourceTracker()
+        max_chars = 3 * int(os.getenv("SEARCH_OBSERVATION_CHARS", SourceTracker.DEFAULT_OBSERVATION_CHARS))
+        return tracker.format_observation(passages, max_chars=max_chars, snippet_chars=0, repeat_urls=True)
+    
+    @staticmethod
+    async def asearch_many(queries, search_func=None, max_concurrency=None):
+        """Run several searches concurrently
+        
+        Args:
+            queries: List of query strings
+            search_func: Blocking search function (defaults to the shared Google search)
+            max_concurrency: Maximum number of searches in flight (defaults to the
+                SEARCH_MAX_CONCURRENCY environment variable)
+            
+        Returns:
+            List of results in the order of queries; a failed search yields its error message
+        """
+        search_func = search_func or SearchTools.get_search_function()
+        if max_concurrency is None:
+            max_concurrency = int(os.getenv("SEARCH_MAX_CONCURRENCY", SearchTools.DEFAULT_MAX_CONCURRENCY))
+        semaphore = asyncio.Semaphore(max(1, max_concurrency))
+        
+        async def run_one(query):
+            async with semaphore:
+                try:
+                    return await asyncio.to_thread(search_func, query)
+                except Exception as e:
+                    return f"Search failed: {str(e)}"
+        
+        return await asyncio.gather(*(run_one(query) for query in queries))
+    
+    @staticmethod
+    def search_many(queries, search_func=None, max_concurrency=None):
+        """Blocking wrapper around asearch_many"""
+        return SearchTools.run_coroutine(SearchTools.asearch_many(queries, search_func, max_concurrency))
+    
+    @staticmethod
+    def split_queries(text):
+        """Split a multi-search tool input into individual, de-duplicated queries"""
+        queries = []
+        for query in re.split(r"\s*(?:\||\n)\s*", text):
+            query = query.strip().strip("\"'")
+            if query and query not in queries:
+                queries.append(query)
+        return queries
+    
+    @staticmethod
+    def format_multi_results(queries, results):
+        """Format the results of several searches as one observation"""
+        return "\n\n".join(f"Results for '{query}':\n{result}" for query, result in zip(queries, results))
+    
+    @staticmethod
+    def run_coroutine(coroutine):
+        """Run a coroutine to completion from synchronous code
+        
+        Uses a helper thread when the calling thread already runs an event loop.
+        """
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(coroutine)
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            # Keep the caller's context (trace, source tracker) in the helper thread
+            return executor.submit(contextvars.copy_context().run, asyncio.run, coroutine).result()
+    
+    @staticmethod
+    def cached_search(search_func, namespace="google"):
+        """Wrap a search function with the shared search result cache
+        
+        Concurrent calls for the same query, from any session, share one backend call.
+        Only results are cached: a message returned instead (such as "The result pages
+        could not be read") reflects a failure that may be temporary.
+        
+        Args:
+            search_func: Function taking a query string and returning results
+            namespace: Cache namespace for the wrapped function
+            
+        Returns:
+            Function with the same signature that serves repeated queries from the cache
+        """
+        cache = SearchCache.shared()
+        flights = SingleFlight.shared("search")
+        
+        def search(query):
+            with Tracer.span(f"search:{namespace}") as span:
+                span["cached"] = True
+                
+                def compute(query):
+                    span["cached"] = False
+                    return search_func(query)
+                
+                key = (namespace, SearchCache.normalize_query(query))
+                result, span["coalesced"] = flights.do(
+                    key, lambda: cache.get_or_compute(query, compute, namespace=namespace,
+                                                      cache_if=lambda value: not isinstance(value, str)))
+                return result
+        
+        return search
+    
     @staticmethod
     def is_search_enabled():
         """Check if search functionality is enabled in session state
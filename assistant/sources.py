@@ -0,0 +1,136 @@
+import os
+import re
+import threading
+import contextvars
+from contextlib import contextmanager
+
+class SourceTracker:
+    """Numbers the sources found while answering one question and drops repeats
+
+    Every URL gets a stable ID ([1], [2], ...) the first time a tool returns it, so
+    the answer can cite sources by ID. Results whose URL or snippet was already
+    shown earlier in the same answer are left out of later observations, which
+    keeps the agent's scratchpad from growing with overlapping search results.
+    """
+
+    DEFAULT_OBSERVATION_CHARS = 1500
+    DEFAULT_SNIPPET_CHARS = 300
+    # Word trigram overlap above which two snippets count as the same text
+    DUPLICATE_SIMILARITY = 0.8
+    SOURCES_HEADING = "**Sources:**"
+
+    _current = contextvars.ContextVar("source_tracker", default=None)
+
+    def __init__(self):
+        self.sources = []
+        self._ids = {}
+        self._shingles = []
+        self._lock = threading.Lock()
+
+    @classmethod
+    def current(cls):
+        """Return the tracker of the answer being generated, or None"""
+        return cls._current.get()
+
+    @contextmanager
+    def activated(self):
+        """Make this tracker current for the duration of the block"""
+        token = self._current.set(self)
+        try:
+            yield self
+        finally:
+            self._current.reset(token)
+
+    def format_observation(self, results, max_chars=None, snippet_chars=None, repeat_urls=False):
+        """Render search results as a compact observation with source IDs
+
+        Args:
+            results: List of dictionaries with title, link and snippet
+            max_chars: Maximum length of the observation (defaults to SEARCH_OBSERVATION_CHARS)
+            snippet_chars: Maximum length of each snippet (defaults to SEARCH_SNIPPET_CHARS;
+                0 keeps snippets whole)
+            repeat_urls: Keep results from URLs shown before if their text is new, e.g.
+                several passages of one page
+
+        Returns:
+            Observation text
+        """
+        if max_chars is None:
+            max_chars = int(os.getenv("SEARCH_OBSERVATION_CHARS", self.DEFAULT_OBSERVATION_CHARS))
+        if snippet_chars is None:
+            snippet_chars = int(os.getenv("SEARCH_SNIPPET_CHARS", self.DEFAULT_SNIPPET_CHARS))
+
+        lines = []
+        repeated = []
+        length = 0
+        with self._lock:
+            for result in results:
+                link = result.get("link", "")
+                snippet = self.truncate(" ".join(result.get("snippet", "").split()), snippet_chars)
+                shingles = self.shingles(snippet)
+                seen_url = link in self._ids
+                if (seen_url and not repeat_urls) or self.is_duplicate(shingles):
+                    if seen_url and self._ids[link] not in repeated:
+                        repeated.append(self._ids[link])
+                    continue
+
+                source_id = self._ids.get(link, len(self.sources) + 1)
+                title = result.get("title") or link
+                entry = f"[{source_id}] {title} ({link})\n{snippet}" if snippet else f"[{source_id}] {title} ({link})"
+                if lines and length + len(entry) > max_chars:
+                    break
+                # IDs are only assigned to results the agent actually gets to see
+                self._source_id(link, result.get("title", ""))
+                lines.append(entry)
+                length += len(entry) + 2
+                if shingles:
+                    self._shingles.append(shingles)
+
+        if repeated:
+            lines.append("Already seen: " + ", ".join(f"[{source_id}]" for source_id in repeated))
+        if not lines:
+            return "No new results."
+        return "\n\n".join(lines)
+
+    def _source_id(self, link, title):
+        if link not in self._ids:
+            self.sources.append({"id": len(self.sources) + 1, "title": title, "link": link})
+            self._ids[link] = len(self.sources)
+        return self._ids[link]
+
+    def is_duplicate(self, shingles):
+        """Whether a snippet's trigrams overlap an earlier snippet's almost completely"""
+        if not shingles:
+            return False
+        for seen in self._shingles:
+            overlap = len(shingles & seen) / min(len(shingles), len(seen))
+            if overlap >= self.DUPLICATE_SIMILARITY:
+                return True
+        return False
+
+    @staticmethod
+    def shingles(text):
+        """Return the set of word trigrams of a text"""
+        words = re.findall(r"\w+", text.lower())
+        return {tuple(words[i:i + 3]) for i in range(max(1, len(words) - 2))} if words else set()
+
+    @staticmethod
+    def truncate(text, max_chars):
+        """Cut a text at a word boundary"""
+        if not max_chars or len(text) <= max_chars:
+            return text
+        return text[:max_chars].rsplit(" ", 1)[0] + "…"
+
+    def cite(self, answer):
+        """Append the sources an answer cites by ID, so the IDs can be followed
+
+        Returns:
+            The answer, with a source list when it cites any known ID
+        """
+        cited = {int(source_id) for source_id in re.findall(r"\[(\d+)\]", answer)}
+        sources = [source for source in self.sources if source["id"] in cited and source["link"]]
+        if not sources or answer.startswith("An error occurred"):
+            return answer
+        listing = "\n".join(f"- [{source['id']}] {source['title'] or source['link']} - {source['link']}"
+                            for source in sources)
+        return f"{answer}\n\n{self.SOURCES_HEADING}\n{listing}"
@@ -0,0 +1,38 @@
+from langchain_core.messages import SystemMessage, HumanMessage
+
+SYNTHESIS_PROMPT = """You are a quantum research assistant with mathematics expertise. Your goal is to help users find information and answer their questions.
+Answer the user's question using the Google Search results below. Provide detailed and accurate information and cite your sources by their [n] IDs.
+If the results do not contain the answer, say so and answer from your own knowledge."""
+
+def synthesis_messages(question, queries, results, chat_history=None):
+    """Build the messages for writing the final answer from the searches run so far
+
+    Used by every agent that answers from collected search results: the
+    plan-then-execute agent, the SynthesizingAgent and the budgeted executor's
+    best-answer fallback.
+
+    Args:
+        question: The user's question
+        queries: The searches that were run
+        results: Their observations, with source IDs (see SearchTools.observe)
+        chat_history: Optional earlier conversation
+    """
+    sources = "\n\n".join(f"Search: {query}\n{result}" for query, result in zip(queries, results))
+
+    messages = [SystemMessage(content=SYNTHESIS_PROMPT)]
+    if chat_history:
+        messages.extend(chat_history)
+    messages.append(HumanMessage(content=f"Search results:\n{sources}\n\nQuestion: {question}"))
+    return messages
+
+def split_steps(intermediate_steps):
+    """Turn an AgentExecutor's (action, observation) pairs into searches and results"""
+    queries = []
+    results = []
+    for action, observation in intermediate_steps:
+        # Skip the executor's feedback on unparsable model output
+        if action.tool == "_Exception":
+            continue
+        queries.append(f"{action.tool}: {action.tool_input}")
+        results.append(str(observation))
+    return queries, results
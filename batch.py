@@ -0,0 +1,194 @@
+"""Offline batch mode for the research assistant
+
+Answers a file of questions with the same pipeline as the app, several at a time,
+and appends each answer to a JSON lines file as soon as it is ready:
+
+    python batch.py questions.jsonl --output answers.jsonl --workers 8
+
+Questions are read from JSON lines (a "query" and optional "id" field), CSV (a
+"query" and optional "id" column) or plain text (one question per line). Running
+the same command again after an interruption skips the questions already answered
+in the output file and retries the ones that failed.
+"""
+import os
+import csv
+import sys
+import json
+import time
+import hashlib
+import argparse
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from dotenv import load_dotenv
+
+from utils import MemoryManager, QueryTrace, Tracer, get_ollama_class
+from assistant import LLMFactory, ResearchPipeline, RequestScheduler
+
+# Load environment variables
+load_dotenv()
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Answer a file of research questions in parallel")
+    parser.add_argument("input", help="Questions as JSON lines, CSV or plain text")
+    parser.add_argument("--output", help="JSON lines file the answers are appended to (default: <input>.answers.jsonl)")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("BATCH_WORKERS", 4)),
+                        help="Number of questions answered in parallel")
+    parser.add_argument("--provider", choices=["OpenAI", "Local (Ollama)", LLMFactory.ROUTER_PROVIDER],
+                        default=os.getenv("API_DEFAULT_PROVIDER", "OpenAI"), help="AI engine")
+    parser.add_argument("--model", help="Model to use instead of the provider's default")
+    parser.add_argument("--agent-mode", choices=["ReAct", "Plan & Execute"], default="ReAct", help="Agent mode")
+    parser.add_argument("--no-search", action="store_true", help="Answer from the model's knowledge only")
+    parser.add_argument("--restart", action="store_true", help="Ignore earlier answers in the output file")
+    return parser.parse_args(argv)
+
+def question_id(query):
+    """Stable identifier of a question without an explicit id"""
+    return hashlib.sha1(" ".join(query.split()).lower().encode()).hexdigest()[:16]
+
+def load_questions(path):
+    """Read questions from a JSON lines, CSV or text file
+
+    Returns:
+        List of {"id", "query"} dictionaries, without repeated ids
+    """
+    with open(path, newline="") as f:
+        if path.endswith(".csv"):
+            rows = list(csv.DictReader(f))
+        else:
+            rows = []
+            for line in f:
+                line = line.strip()
+                if not line or line.startswith("#"):
+                    continue
+                rows.append(json.loads(line) if line.startswith("{") else {"query": line})
+
+    questions = {}
+    for row in rows:
+        query = str(row.get("query") or "").strip()
+        if not query:
+            continue
+        item_id = str(row.get("id") or "").strip() or question_id(query)
+        questions.setdefault(item_id, {"id": item_id, "query": query})
+    return list(questions.values())
+
+def load_answered(path):
+    """Return the ids answered successfully in an earlier run of the output file"""
+    answered = set()
+    if not os.path.exists(path):
+        return answered
+    with open(path) as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # A line cut off when the previous run was killed
+                continue
+            # The last record of an id decides, so a later failure is retried
+            if record.get("status") == "ok":
+                answered.add(record["id"])
+            else:
+                answered.discard(record.get("id"))
+    return answered
+
+def answer_question(question, args, ollama_class=None, ollama_available=False):
+    """Answer one question in the calling thread
+
+    Returns:
+        Output record with the answer, status and timings
+    """
+    started = time.perf_counter()
+    trace = QueryTrace(question["query"], {"provider": args.provider, "batch": True})
+    with trace.activated():
+        try:
+            answer = ResearchPipeline.generate(
+                question["query"],
+                args.provider,
+                MemoryManager.initialize_memory(),
+                search_enabled=not args.no_search,
+                agent_mode=args.agent_mode,
+                ollama_class=ollama_class,
+                ollama_available=ollama_available,
+                model_name=args.model,
+                session_id="batch"
+            )
+        except Exception as e:
+            answer = f"An error occurred: {str(e)}"
+    Tracer.export(trace.finish())
+
+    if answer is None:
+        answer = "Setup failed. Please check the provider configuration."
+    failed = ResearchPipeline.is_failure(answer)
+    return {
+        "id": question["id"],
+        "query": question["query"],
+        "answer": answer,
+        "status": "error" if failed else "ok",
+        "latency_s": round(time.perf_counter() - started, 3),
+        "finished_at": time.time()
+    }
+
+def run(args):
+    """Answer every question not yet answered in the output file
+
+    Returns:
+        Dictionary with the number of questions answered, skipped and failed
+    """
+    output = args.output or os.path.splitext(args.input)[0] + ".answers.jsonl"
+    questions = load_questions(args.input)
+    answered = set() if args.restart else load_answered(output)
+    pending = [question for question in questions if question["id"] not in answered]
+
+    # Every worker must get a slot, or it would wait for admission behind its siblings;
+    # a lower MAX_CONCURRENT_QUERIES from .env must not apply here
+    RequestScheduler.configure(max_concurrent=max(1, args.workers))
+    ollama_class, ollama_available = get_ollama_class() if LLMFactory.uses_ollama(args.provider) else (None, False)
+
+    counts = {"questions": len(questions), "skipped": len(questions) - len(pending), "answered": 0, "failed": 0}
+    print(f"{len(pending)} of {len(questions)} questions to answer, writing to {output}", file=sys.stderr)
+
+    started = time.perf_counter()
+    with open(output, "w" if args.restart else "a") as f, ThreadPoolExecutor(max_workers=max(1, args.workers)) as executor:
+        def record(result):
+            # One write per line, flushed at once, so an interrupted run leaves complete records
+            f.write(json.dumps(result, ensure_ascii=False) + "\n")
+            f.flush()
+            counts["answered" if result["status"] == "ok" else "failed"] += 1
+            done = counts["answered"] + counts["failed"]
+            print(f"[{done}/{len(pending)}] {result['status']} {result['latency_s']:.1f}s {result['query'][:60]}",
+                  file=sys.stderr)
+
+        # Submit a bounded window of questions so a long file is not queued all at once
+        remaining = iter(pending)
+        running = set()
+        try:
+            while True:
+                for question in remaining:
+                    running.add(executor.submit(answer_question, question, args, ollama_class, ollama_available))
+                    if len(running) >= 2 * max(1, args.workers):
+                        break
+                if not running:
+                    break
+                finished, running = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    record(future.result())
+        except KeyboardInterrupt:
+            # Keep the answers already being generated; the rest is picked up on resume
+            print("Interrupted, finishing the questions in progress; run the same command again to resume",
+                  file=sys.stderr)
+            executor.shutdown(wait=False, cancel_futures=True)
+            for future in wait(running).done:
+                if not future.cancelled():
+                    record(future.result())
+            raise
+
+    counts["elapsed_s"] = time.perf_counter() - started
+    return counts
+
+def main(argv=None):
+    args = parse_args(argv)
+    counts = run(args)
+    print(f"Answered {counts['answered']}, failed {counts['failed']}, skipped {counts['skipped']} already answered "
+          f"in {counts['elapsed_s']:.1f}s", file=sys.stderr)
+    return 1 if counts["failed"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
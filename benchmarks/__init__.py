@@ -0,0 +1,3 @@
+from .fakes import FakeResearchLLM, FakeSearchWrapper
+
+__all__ = ['FakeResearchLLM', 'FakeSearchWrapper']
@@ -0,0 +1,113 @@
+import re
+import time
+import random
+import threading
+import zlib
+from pydantic import PrivateAttr
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+WORDS = ("quantum state qubit entanglement superposition measurement operator hilbert space amplitude "
+         "decoherence algorithm circuit gate error correction fidelity photon spin lattice energy "
+         "research result experiment theory model evidence source study").split()
+
+def deterministic_text(seed_text, words):
+    """Return a reproducible pseudo-random text of the given number of words"""
+    rng = random.Random(zlib.crc32(seed_text.encode()))
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+class FakeResearchLLM(BaseChatModel):
+    """Deterministic chat model that plays the research agent's part without a backend
+
+    It recognizes the prompts used by the app: it answers ReAct prompts with a fixed
+    number of Google Search actions followed by a Final Answer, returns search
+    queries for the planner, and plain answers for direct and synthesis calls.
+    """
+
+    latency: float = 0.05
+    token_latency: float = 0.0
+    answer_words: int = 150
+    searches_per_query: int = 2
+
+    _calls: int = PrivateAttr(default=0)
+    _lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+
+    @property
+    def _llm_type(self):
+        return "fake-research"
+
+    @property
+    def calls(self):
+        """Number of completed model calls"""
+        return self._calls
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        text = self._respond(messages)
+        time.sleep(self.latency + self.token_latency * len(text.split()))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text))])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        text = self._respond(messages)
+        time.sleep(self.latency)
+        for word in re.findall(r"\S+\s*", text):
+            time.sleep(self.token_latency)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=word))
+            if run_manager:
+                run_manager.on_llm_new_token(word, chunk=chunk)
+            yield chunk
+
+    def _respond(self, messages):
+        with self._lock:
+            self._calls += 1
+
+        prompt = "\n".join(str(message.content) for message in messages)
+
+        if "Break the user's question" in prompt:
+            question = messages[-1].content
+            return "\n".join(f"{question} aspect {index}" for index in range(1, self.searches_per_query + 1))
+
+        if "Progressively summarize" in prompt:
+            return deterministic_text(prompt, 40)
+
+        if "Action Input:" in prompt and "Final Answer:" in prompt:
+            # ReAct prompt: the scratchpad follows the last "Question:" line
+            question_part = prompt.rsplit("Question: ", 1)[-1]
+            question = question_part.splitlines()[0].strip()
+            observations = question_part.count("Observation:")
+            if observations < self.searches_per_query:
+                return (f"Thought: I need more information.\nAction: Google Search\n"
+                        f"Action Input: {question} part {observations + 1}")
+            return "Thought: I now know the final answer\nFinal Answer: " + deterministic_text(prompt, self.answer_words)
+
+        return deterministic_text(prompt, self.answer_words)
+
+class FakeSearchWrapper:
+    """Stand-in for GoogleSearchAPIWrapper with configurable latency and payload size"""
+
+    def __init__(self, latency=0.2, payload_chars=1200, results_per_query=5):
+        self.latency = latency
+        self.payload_chars = payload_chars
+        self.results_per_query = results_per_query
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def run(self, query):
+        """Return a snippet string like GoogleSearchAPIWrapper.run"""
+        return " ".join(result["snippet"] for result in self.results(query, self.results_per_query))
+
+    def results(self, query, num_results, **kwargs):
+        """Return result dictionaries like GoogleSearchAPIWrapper.results"""
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.latency)
+
+        snippet_words = max(1, self.payload_chars // (7 * max(1, num_results)))
+        return [
+            {
+                "title": f"Result {rank} for {query}",
+                "link": f"https://example.org/{zlib.crc32(query.encode())}/{rank}",
+                "snippet": deterministic_text(f"{query}:{rank}", snippet_words)
+            }
+            for rank in range(1, num_results + 1)
+        ]
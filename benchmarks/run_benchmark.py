@@ -0,0 +1,192 @@
+"""Headless benchmark for the research pipeline
+
+Replays a corpus of queries through ResearchPipeline with a deterministic fake LLM
+and fake Google Search backend, so it runs offline and in CI:
+
+    python -m benchmarks.run_benchmark --mode react --repeat 3 --concurrency 4
+"""
+import os
+import sys
+import json
+import math
+import time
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_QUERIES = os.path.join(os.path.dirname(__file__), "queries.txt")
+MODES = {"react": "ReAct", "plan": "Plan & Execute", "direct": None}
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the research pipeline with fake backends")
+    parser.add_argument("--queries", default=DEFAULT_QUERIES, help="Text file with one query per line, or JSONL with a 'query' field")
+    parser.add_argument("--repeat", type=int, default=1, help="Number of times the corpus is replayed")
+    parser.add_argument("--concurrency", type=int, default=1, help="Number of queries run in parallel")
+    parser.add_argument("--mode", choices=sorted(MODES), default="react", help="Agent mode, or direct for no search")
+    parser.add_argument("--provider", choices=["OpenAI", "Local (Ollama)"], default="OpenAI",
+                        help="Provider whose code path is exercised (its backend is replaced by the fake)")
+    parser.add_argument("--stream", action="store_true", help="Consume responses as event streams")
+    parser.add_argument("--cache", action="store_true", help="Enable the in-memory search, knowledge and answer caches")
+    parser.add_argument("--classifier", action="store_true", help="Let the search classifier answer knowledge questions directly")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="Seconds per fake LLM call")
+    parser.add_argument("--token-latency", type=float, default=0.0, help="Seconds per generated token")
+    parser.add_argument("--answer-words", type=int, default=150, help="Words per fake answer")
+    parser.add_argument("--searches", type=int, default=2, help="Searches the fake agent makes per query")
+    parser.add_argument("--search-latency", type=float, default=0.2, help="Seconds per fake search call")
+    parser.add_argument("--payload-chars", type=int, default=1200, help="Characters per fake search response")
+    parser.add_argument("--json", dest="json_path", help="Also write the report as JSON to this file")
+    return parser.parse_args(argv)
+
+def configure_environment(args):
+    """Keep every cache in memory and disable the ones not under test"""
+    os.environ["SEARCH_CACHE_PATH"] = ""
+    os.environ["KNOWLEDGE_INDEX_PATH"] = ""
+    os.environ["EMBEDDING_PROVIDER"] = "hashing"
+    os.environ.setdefault("GOOGLE_API_KEY", "benchmark")
+    os.environ.setdefault("GOOGLE_CSE_ID", "benchmark")
+    os.environ["SEARCH_CLASSIFIER"] = "1" if args.classifier else "0"
+    # Admission control and the Google rate limit stay out of the way unless set explicitly
+    os.environ.setdefault("MAX_CONCURRENT_QUERIES", str(max(1, args.concurrency)))
+    os.environ.setdefault("GOOGLE_REQUESTS_PER_SECOND", "0")
+    if args.cache:
+        # The hashing embedder only enables the answer cache with an explicit TTL;
+        # the benchmark's repeated queries are identical, so word overlap is enough
+        os.environ.setdefault("ANSWER_CACHE_TTL", "3600")
+    else:
+        os.environ["SEARCH_CACHE_TTL"] = "0"
+        os.environ["ANSWER_CACHE_TTL"] = "0"
+        os.environ["KNOWLEDGE_MATCH_SCORE"] = "2"
+
+def load_queries(path):
+    """Read queries from a text or JSON lines file"""
+    queries = []
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            queries.append(json.loads(line)["query"] if line.startswith("{") else line)
+    return queries
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, math.ceil(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+def run_query(query, args):
+    """Run one query through the pipeline and time it"""
+    from assistant import ResearchPipeline
+    from utils import MemoryManager
+
+    search_enabled = MODES[args.mode] is not None
+    started = time.perf_counter()
+    first_token = None
+
+    response = ResearchPipeline.generate(
+        query,
+        args.provider,
+        MemoryManager.initialize_memory(),
+        search_enabled=search_enabled,
+        agent_mode=MODES[args.mode] or "ReAct",
+        stream=args.stream
+    )
+
+    if isinstance(response, str) or response is None:
+        answer = response or ""
+    else:
+        answer = ""
+        for event in response:
+            if event["type"] == "token" and first_token is None:
+                first_token = time.perf_counter() - started
+            elif event["type"] == "final":
+                answer = event["content"]
+
+    latency = time.perf_counter() - started
+    return {"latency": latency, "first_token": first_token if first_token is not None else latency,
+            "error": answer.startswith("An error occurred") or not answer}
+
+def run(args):
+    configure_environment(args)
+
+    from assistant import ResourceRegistry
+    from utils import SearchCache
+    from benchmarks.fakes import FakeResearchLLM, FakeSearchWrapper
+
+    llm = FakeResearchLLM(latency=args.llm_latency, token_latency=args.token_latency,
+                          answer_words=args.answer_words, searches_per_query=args.searches)
+    search = FakeSearchWrapper(latency=args.search_latency, payload_chars=args.payload_chars)
+    ResourceRegistry.register(ResourceRegistry.llm_key(args.provider), llm)
+    ResourceRegistry.register(("google_wrapper",), search)
+
+    queries = load_queries(args.queries) * args.repeat
+    lock = threading.Lock()
+    results = []
+
+    def worker(query):
+        result = run_query(query, args)
+        with lock:
+            results.append(result)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, args.concurrency)) as executor:
+        list(executor.map(worker, queries))
+    elapsed = time.perf_counter() - started
+
+    latencies = [result["latency"] for result in results]
+    first_tokens = [result["first_token"] for result in results]
+    answer_cache = ResourceRegistry.get_answer_cache()
+    return {
+        "mode": args.mode,
+        "stream": args.stream,
+        "cache": args.cache,
+        "concurrency": args.concurrency,
+        "queries": len(results),
+        "errors": sum(result["error"] for result in results),
+        "elapsed_s": elapsed,
+        "throughput_qps": len(results) / elapsed if elapsed else 0.0,
+        "latency_s": {
+            "mean": sum(latencies) / len(latencies) if latencies else 0.0,
+            "p50": percentile(latencies, 0.50),
+            "p95": percentile(latencies, 0.95),
+            "p99": percentile(latencies, 0.99),
+            "max": max(latencies, default=0.0)
+        },
+        "first_token_s": {
+            "p50": percentile(first_tokens, 0.50),
+            "p95": percentile(first_tokens, 0.95)
+        },
+        "llm_calls_per_query": llm.calls / len(results) if results else 0.0,
+        "search_calls_per_query": search.calls / len(results) if results else 0.0,
+        "search_cache_hit_rate": SearchCache.shared().hit_rate(),
+        "answer_cache_hits": answer_cache.stats["hits"]
+    }
+
+def format_report(report):
+    latency = report["latency_s"]
+    lines = [
+        f"Mode: {report['mode']}  stream: {report['stream']}  cache: {report['cache']}  concurrency: {report['concurrency']}",
+        f"Queries: {report['queries']}  errors: {report['errors']}  elapsed: {report['elapsed_s']:.2f}s",
+        f"Throughput: {report['throughput_qps']:.2f} queries/s",
+        f"Latency (s): mean {latency['mean']:.3f}  p50 {latency['p50']:.3f}  p95 {latency['p95']:.3f}  "
+        f"p99 {latency['p99']:.3f}  max {latency['max']:.3f}",
+        f"Time to first token (s): p50 {report['first_token_s']['p50']:.3f}  p95 {report['first_token_s']['p95']:.3f}",
+        f"LLM calls per query: {report['llm_calls_per_query']:.2f}",
+        f"Search calls per query: {report['search_calls_per_query']:.2f}",
+        f"Search cache hit rate: {report['search_cache_hit_rate']:.0%}  answer cache hits: {report['answer_cache_hits']}"
+    ]
+    return "\n".join(lines)
+
+def main(argv=None):
+    args = parse_args(argv)
+    report = run(args)
+    print(format_report(report))
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(report, f, indent=2)
+    return 1 if report["errors"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
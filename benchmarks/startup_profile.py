@@ -0,0 +1,88 @@
+"""Startup profile: where the cold-start import time goes
+
+Imports an entry module in a fresh interpreter with -X importtime and reports the
+slowest modules and the total per top-level package:
+
+    python -m benchmarks.startup_profile --entry main --top 20
+"""
+import os
+import sys
+import json
+import argparse
+import subprocess
+from collections import defaultdict
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Report import time per module for a cold start")
+    parser.add_argument("--entry", default="main", help="Module to import, e.g. main or server")
+    parser.add_argument("--top", type=int, default=15, help="Number of modules and packages to list")
+    parser.add_argument("--repeat", type=int, default=3, help="Cold starts to run; the fastest is reported")
+    parser.add_argument("--json", dest="json_path", help="Also write the report as JSON to this file")
+    return parser.parse_args(argv)
+
+def profile_imports(entry):
+    """Import entry in a new interpreter and parse its -X importtime output
+
+    Returns:
+        List of (module, self microseconds, cumulative microseconds) in import order
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {entry}"],
+        cwd=REPO_ROOT, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {entry} failed:\n{result.stderr[-2000:]}")
+
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules.append((name.strip(), int(self_us), int(cumulative_us)))
+    return modules
+
+def summarize(modules, top):
+    """Build the report: total time, slowest modules and time per top-level package"""
+    packages = defaultdict(int)
+    cumulative = {}
+    for name, self_us, cumulative_us in modules:
+        packages[name.split(".")[0]] += self_us
+        # A module imported again from inside its own import is listed twice
+        if cumulative_us > cumulative.get(name, (0, 0))[1]:
+            cumulative[name] = (self_us, cumulative_us)
+
+    return {
+        "total_s": sum(self_us for _, self_us, _ in modules) / 1e6,
+        "modules": [{"module": name, "self_s": self_us / 1e6, "cumulative_s": cumulative_us / 1e6}
+                    for name, (self_us, cumulative_us) in sorted(cumulative.items(), key=lambda m: m[1][1],
+                                                                 reverse=True)[:top]],
+        "packages": [{"package": name, "self_s": self_us / 1e6}
+                     for name, self_us in sorted(packages.items(), key=lambda p: p[1], reverse=True)[:top]]
+    }
+
+def print_report(report, entry):
+    print(f"Cold import of {entry}: {report['total_s']:.3f}s")
+    print()
+    print(f"{'Slowest modules (cumulative)':<60} {'cumulative':>10} {'self':>8}")
+    for module in report["modules"]:
+        print(f"{module['module']:<60} {module['cumulative_s']:>9.3f}s {module['self_s']:>7.3f}s")
+    print()
+    print(f"{'Packages (self time)':<60} {'self':>10}")
+    for package in report["packages"]:
+        print(f"{package['package']:<60} {package['self_s']:>9.3f}s")
+
+def main(argv=None):
+    args = parse_args(argv)
+    # Every run is a fresh interpreter; the fastest one is least disturbed by disk and CPU noise
+    runs = [summarize(profile_imports(args.entry), args.top) for _ in range(max(1, args.repeat))]
+    report = min(runs, key=lambda run: run["total_s"])
+
+    print_report(report, args.entry)
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(report, f, indent=2)
+
+if __name__ == "__main__":
+    main()
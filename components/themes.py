@@ -1,10 +1,182 @@
+import re
 import streamlit as st
+from functools import lru_cache
 
 class ThemeManager:
     """Manages application themes and styling"""
     
     THEMES = ["Quantum Blue", "Matrix Green", "Classic"]
     
+    # Styling shared by all themes (Quantum Blue uses it unchanged)
+    BASE_CSS = """
+    .main {
+        background-color: #0e1117;
+        background-image: linear-gradient(rgba(14, 17, 23, 0.8), rgba(14, 17, 23, 0.8)), 
+                        url("data:image/svg+xml,%3Csvg width='100' height='100' viewBox='0 0 100 100' xmlns='http://www.w3.org/2000/svg'%3E%3Cpath d='M10 10L20 20M30 30L40 40M50 50L60 60M70 70L80 80M90 90L95 95' stroke='%233b82f640' stroke-width='1'/%3E%3Cpath d='M20 10L10 20M40 30L30 40M60 50L50 60M80 70L70 80M95 90L90 95' stroke='%233b82f640' stroke-width='1'/%3E%3Cpath d='M30 10C40 20,45 25,50 30' stroke='%234b96ff40' stroke-width='1' fill='none'/%3E%3C/svg%3E");
+        color: white !important;
+    }
+    body {
+        background-color: #0e1117;
+        color: white;
+    }
+    .stApp {
+        background: none;
+        max-width: 1200px;
+        margin: 0 auto;
+    }
+    h1, h2, h3 {
+        color: #4b96ff !important;
+        font-family: 'Courier New', Courier, monospace;
+        text-shadow: 0 0 5px rgba(75, 150, 255, 0.3);
+    }
+    .stButton>button {
+        background-color: #3b82f6;
+        color: white;
+        border-radius: 8px;
+    }
+    .stButton>button:hover {
+        background-color: #1e40af;
+    }
+    .stChat {
+        border-radius: 12px;
+        border: 1px solid #e0e7ff;
+    }
+    .css-1oe6o3n {
+        background-color: #dbeafe;
+    }
+    .css-1e5imcs {
+        background-color: #eff6ff;
+    }
+    .stSidebar {
+        background-color: #0e1117 !important;
+        background-image: linear-gradient(rgba(14, 17, 23, 0.95), rgba(14, 17, 23, 0.95)), 
+                        url("data:image/svg+xml,%3Csvg width='100' height='100' viewBox='0 0 100 100' xmlns='http://www.w3.org/2000/svg'%3E%3Cpath d='M10 10L20 20M30 30L40 40M50 50L60 60M70 70L80 80M90 90L95 95' stroke='%233b82f680' stroke-width='1'/%3E%3Cpath d='M20 10L10 20M40 30L30 40M60 50L50 60M80 70L70 80M95 90L90 95' stroke='%233b82f680' stroke-width='1'/%3E%3Cpath d='M30 10C40 20,45 25,50 30' stroke='%234b96ff50' stroke-width='1' fill='none'/%3E%3C/svg%3E");
+        color: white !important;
+    }
+    .stSidebar [data-testid="stMarkdown"] {
+        color: white !important;
+    }
+    .stSidebar h1, .stSidebar h2, .stSidebar h3, .stSidebar .stExpander {
+        color: #4b96ff !important;
+    }
+    .stSidebar .stButton > button {
+        background-color: #4b96ff;
+        color: white;
+    }
+    .stSidebar .stSelectbox > div > div {
+        background-color: #1e293b;
+        color: white;
+        border-color: #3b82f6;
+    }
+    /* Quantum wave patterns across the entire page */
+    .quantum-waves {
+        position: fixed;
+        top: 0;
+        left: 0;
+        width: calc(100% + 50px);
+        height: 100%;
+        pointer-events: none;
+        z-index: -1;
+        background-image: 
+            url("data:image/svg+xml,%3Csvg width='100%25' height='100%25' xmlns='http://www.w3.org/2000/svg'%3E%3Cdefs%3E%3ClinearGradient id='grad' x1='0%25' y1='0%25' x2='100%25' y2='0%25'%3E%3Cstop offset='0%25' style='stop-color:%234b96ff;stop-opacity:0.4' /%3E%3Cstop offset='100%25' style='stop-color:%233b82f6;stop-opacity:0.1' /%3E%3C/linearGradient%3E%3C/defs%3E%3Cpath d='M-50 80 Q -25 60, 0 80 T 50 80 T 100 80 T 150 80 T 200 80 T 250 80' stroke='url(%23grad)' stroke-width='1' fill='none' opacity='0.3' /%3E%3Cpath d='M-50 120 Q -25 100, 0 120 T 50 120 T 100 120 T 150 120 T 200 120 T 250 120' stroke='url(%23grad)' stroke-width='1' fill='none' opacity='0.2' /%3E%3Cpath d='M-50 160 Q -25 140, 0 160 T 50 160 T 100 160 T 150 160 T 200 160 T 250 160' stroke='url(%23grad)' stroke-width='1' fill='none' opacity='0.1' /%3E%3C/svg%3E"),
+            url("data:image/svg+xml,%3Csvg width='100%25' height='100%25' xmlns='http://www.w3.org/2000/svg'%3E%3Cdefs%3E%3ClinearGradient id='grad2' x1='0%25' y1='0%25' x2='100%25' y2='0%25'%3E%3Cstop offset='0%25' style='stop-color:%234b96ff;stop-opacity:0.3' /%3E%3Cstop offset='100%25' style='stop-color:%233b82f6;stop-opacity:0.1' /%3E%3C/defs%3E%3Cpath d='M-50 40 Q 0 0, 50 40 T 150 40 T 250 40 T 350 40' stroke='url(%23grad2)' stroke-width='1' fill='none' opacity='0.2' /%3E%3Cpath d='M-50 200 Q 0 160, 50 200 T 150 200 T 250 200 T 350 200' stroke='url(%23grad2)' stroke-width='1' fill='none' opacity='0.2' /%3E%3C/svg%3E");
+        background-size: 100% 100%, 100% 100%;
+        animation: wave-animation 20s linear infinite;
+        margin-left: -50px;
+    }
+
+    @keyframes wave-animation {
+        0% { background-position: 0% 0%, 0% 0%; }
+        100% { background-position: 100% 0%, -100% 0%; }
+    }
+
+    /* Quantum particles effect */
+    .quantum-particles {
+        position: fixed;
+        top: 0;
+        left: 0;
+        width: 100%;
+        height: 100%;
+        pointer-events: none;
+        z-index: -1;
+        background-image: radial-gradient(circle at 10% 20%, rgba(75, 150, 255, 0.1) 0%, transparent 10%),
+                        radial-gradient(circle at 30% 70%, rgba(75, 150, 255, 0.1) 0%, transparent 10%),
+                        radial-gradient(circle at 60% 30%, rgba(75, 150, 255, 0.1) 0%, transparent 10%),
+                        radial-gradient(circle at 80% 80%, rgba(75, 150, 255, 0.1) 0%, transparent 10%),
+                        radial-gradient(circle at 90% 10%, rgba(75, 150, 255, 0.1) 0%, transparent 10%);
+    }
+
+"""
+    
+    # Per-theme overrides of the base styling
+    THEME_CSS = {
+        "Quantum Blue": "",
+        "Matrix Green": """
+    .main { background-color: #0a190a !important; }
+    h1, h2, h3 { color: #00cc00 !important; text-shadow: 0 0 5px rgba(0, 204, 0, 0.5); }
+    .stButton>button { background-color: #00cc00 !important; }
+    .stButton>button:hover { background-color: #009900 !important; }
+    .quantum-waves {
+        background-image: 
+            url("data:image/svg+xml,%3Csvg width='100%25' height='100%25' xmlns='http://www.w3.org/2000/svg'%3E%3Cdefs%3E%3ClinearGradient id='grad' x1='0%25' y1='0%25' x2='100%25' y2='0%25'%3E%3Cstop offset='0%25' style='stop-color:%2300cc00;stop-opacity:0.4' /%3E%3Cstop offset='100%25' style='stop-color:%23009900;stop-opacity:0.1' /%3E%3C/linearGradient%3E%3C/defs%3E%3Cpath d='M-50 80 Q -25 60, 0 80 T 50 80 T 100 80 T 150 80 T 200 80 T 250 80' stroke='url(%23grad)' stroke-width='1' fill='none' opacity='0.3' /%3E%3Cpath d='M-50 120 Q -25 100, 0 120 T 50 120 T 100 120 T 150 120 T 200 120 T 250 120' stroke='url(%23grad)' stroke-width='1' fill='none' opacity='0.2' /%3E%3Cpath d='M-50 160 Q -25 140, 0 160 T 50 160 T 100 160 T 150 160 T 200 160 T 250 160' stroke='url(%23grad)' stroke-width='1' fill='none' opacity='0.1' /%3E%3C/svg%3E"),
+            url("data:image/svg+xml,%3Csvg width='100%25' height='100%25' xmlns='http://www.w3.org/2000/svg'%3E%3Cdefs%3E%3ClinearGradient id='grad2' x1='0%25' y1='0%25' x2='100%25' y2='0%25'%3E%3Cstop offset='0%25' style='stop-color:%2300cc00;stop-opacity:0.3' /%3E%3Cstop offset='100%25' style='stop-color:%23009900;stop-opacity:0.1' /%3E%3C/defs%3E%3Cpath d='M-50 40 Q 0 0, 50 40 T 150 40 T 250 40 T 350 40' stroke='url(%23grad2)' stroke-width='1' fill='none' opacity='0.2' /%3E%3Cpath d='M-50 200 Q 0 160, 50 200 T 150 200 T 250 200 T 350 200' stroke='url(%23grad2)' stroke-width='1' fill='none' opacity='0.2' /%3E%3C/svg%3E") !important;
+    }
+    .quantum-particles {
+        background-image: radial-gradient(circle at 10% 20%, rgba(0, 204, 0, 0.1) 0%, transparent 10%),
+                        radial-gradient(circle at 30% 70%, rgba(0, 204, 0, 0.1) 0%, transparent 10%),
+                        radial-gradient(circle at 60% 30%, rgba(0, 204, 0, 0.1) 0%, transparent 10%),
+                        radial-gradient(circle at 80% 80%, rgba(0, 204, 0, 0.1) 0%, transparent 10%),
+                        radial-gradient(circle at 90% 10%, rgba(0, 204, 0, 0.1) 0%, transparent 10%) !important;
+    }
+    .stSidebar [data-testid="stMarkdown"] svg path { stroke: #00cc00 !important; }
+    .stSidebar [data-testid="stMarkdown"] svg text { fill: #00cc00 !important; }
+    .stSidebar [data-testid="stMarkdown"] { color: #00cc00 !important; }
+    .stSidebar h1, .stSidebar h2, .stSidebar h3, .stSidebar .stExpander { color: #00cc00 !important; }
+    .stSidebar .stButton > button { background-color: #00cc00 !important; }
+
+""",
+        "Classic": """
+    .main { background-color: #252a34 !important; }
+    h1, h2, h3 { color: #ffffff !important; text-shadow: none; font-family: sans-serif; }
+    .stButton>button { background-color: #A9A9A9 !important; }
+    .stButton>button:hover { background-color: #3949ab !important; }
+    .quantum-waves {
+        background-image: 
+            url("data:image/svg+xml,%3Csvg width='100%25' height='100%25' xmlns='http://www.w3.org/2000/svg'%3E%3Cdefs%3E%3ClinearGradient id='grad' x1='0%25' y1='0%25' x2='100%25' y2='0%25'%3E%3Cstop offset='0%25' style='stop-color:%23757de8;stop-opacity:0.4' /%3E%3Cstop offset='100%25' style='stop-color:%233949ab;stop-opacity:0.1' /%3E%3C/linearGradient%3E%3C/defs%3E%3Cpath d='M-50 80 Q -25 60, 0 80 T 50 80 T 100 80 T 150 80 T 200 80 T 250 80' stroke='url(%23grad)' stroke-width='1' fill='none' opacity='0.3' /%3E%3Cpath d='M-50 120 Q -25 100, 0 120 T 50 120 T 100 120 T 150 120 T 200 120 T 250 120' stroke='url(%23grad)' stroke-width='1' fill='none' opacity='0.2' /%3E%3Cpath d='M-50 160 Q -25 140, 0 160 T 50 160 T 100 160 T 150 160 T 200 160 T 250 160' stroke='url(%23grad)' stroke-width='1' fill='none' opacity='0.1' /%3E%3C/svg%3E"),
+            url("data:image/svg+xml,%3Csvg width='100%25' height='100%25' xmlns='http://www.w3.org/2000/svg'%3E%3Cdefs%3E%3ClinearGradient id='grad2' x1='0%25' y1='0%25' x2='100%25' y2='0%25'%3E%3Cstop offset='0%25' style='stop-color:%23757de8;stop-opacity:0.3' /%3E%3Cstop offset='100%25' style='stop-color:%233949ab;stop-opacity:0.1' /%3E%3C/defs%3E%3Cpath d='M-50 40 Q 0 0, 50 40 T 150 40 T 250 40 T 350 40' stroke='url(%23grad2)' stroke-width='1' fill='none' opacity='0.2' /%3E%3Cpath d='M-50 200 Q 0 160, 50 200 T 150 200 T 250 200 T 350 200' stroke='url(%23grad2)' stroke-width='1' fill='none' opacity='0.2' /%3E%3C/svg%3E") !important;
+    }
+    .quantum-particles {
+        background-image: radial-gradient(circle at 10% 20%, rgba(117, 125, 232, 0.1) 0%, transparent 10%),
+                        radial-gradient(circle at 30% 70%, rgba(117, 125, 232, 0.1) 0%, transparent 10%),
+                        radial-gradient(circle at 60% 30%, rgba(117, 125, 232, 0.1) 0%, transparent 10%),
+                        radial-gradient(circle at 80% 80%, rgba(117, 125, 232, 0.1) 0%, transparent 10%),
+                        radial-gradient(circle at 90% 10%, rgba(117, 125, 232, 0.1) 0%, transparent 10%) !important;
+    }
+    .stSidebar [data-testid="stMarkdown"] svg path { stroke: #757de8 !important; }
+    .stSidebar [data-testid="stMarkdown"] svg text { fill: #757de8 !important; }
+    .stSidebar [data-testid="stMarkdown"] { color: #ffffff !important; }
+    .stSidebar h1, .stSidebar h2, .stSidebar h3, .stSidebar .stExpander { color: #757de8 !important; }
+    .stSidebar .stButton > button { background-color: #A9A9A9 !important; }
+
+"""
+    }
+    
+    # Styles the search toggle in the theme color
+    TOGGLE_CSS = """
+    /* Style the toggle switch based on theme */
+    .stToggle > div > div:hover {{
+        color: {theme_color} !important;
+    }}
+    .stToggle > div[data-baseweb="toggle"] > div {{
+        background-color: {theme_color} !important;
+    }}
+    .stToggle > div[data-baseweb="toggle"] > div > div:last-child {{
+        background-color: white !important;
+    }}
+"""
+    
+    BACKGROUND_HTML = '<div class="quantum-waves"></div><div class="quantum-particles"></div>'
+    
     @staticmethod
     def initialize_theme():
         """Initialize theme in session state if not present"""
@@ -23,56 +195,37 @@ class ThemeManager:
     
     @staticmethod
     def apply_theme(theme_name):
-        """Apply the selected theme CSS to the application"""
-        if theme_name == "Matrix Green":
-            st.markdown("""
-            <style>
-                .main { background-color: #0a190a !important; }
-                h1, h2, h3 { color: #00cc00 !important; text-shadow: 0 0 5px rgba(0, 204, 0, 0.5); }
-                .stButton>button { background-color: #00cc00 !important; }
-                .stButton>button:hover { background-color: #009900 !important; }
-                .quantum-waves {
-                    background-image: 
-                        url("data:image/svg+xml,%3Csvg width='100%25' height='100%25' xmlns='http://www.w3.org/2000/svg'%3E%3Cdefs%3E%3ClinearGradient id='grad' x1='0%25' y1='0%25' x2='100%25' y2='0%25'%3E%3Cstop offset='0%25' style='stop-color:%2300cc00;stop-opacity:0.4' /%3E%3Cstop offset='100%25' style='stop-color:%23009900;stop-opacity:0.1' /%3E%3C/linearGradient%3E%3C/defs%3E%3Cpath d='M-50 80 Q -25 60, 0 80 T 50 80 T 100 80 T 150 80 T 200 80 T 250 80' stroke='url(%23grad)' stroke-width='1' fill='none' opacity='0.3' /%3E%3Cpath d='M-50 120 Q -25 100, 0 120 T 50 120 T 100 120 T 150 120 T 200 120 T 250 120' stroke='url(%23grad)' stroke-width='1' fill='none' opacity='0.2' /%3E%3Cpath d='M-50 160 Q -25 140, 0 160 T 50 160 T 100 160 T 150 160 T 200 160 T 250 160' stroke='url(%23grad)' stroke-width='1' fill='none' opacity='0.1' /%3E%3C/svg%3E"),
-                        url("data:image/svg+xml,%3Csvg width='100%25' height='100%25' xmlns='http://www.w3.org/2000/svg'%3E%3Cdefs%3E%3ClinearGradient id='grad2' x1='0%25' y1='0%25' x2='100%25' y2='0%25'%3E%3Cstop offset='0%25' style='stop-color:%2300cc00;stop-opacity:0.3' /%3E%3Cstop offset='100%25' style='stop-color:%23009900;stop-opacity:0.1' /%3E%3C/defs%3E%3Cpath d='M-50 40 Q 0 0, 50 40 T 150 40 T 250 40 T 350 40' stroke='url(%23grad2)' stroke-width='1' fill='none' opacity='0.2' /%3E%3Cpath d='M-50 200 Q 0 160, 50 200 T 150 200 T 250 200 T 350 200' stroke='url(%23grad2)' stroke-width='1' fill='none' opacity='0.2' /%3E%3C/svg%3E") !important;
-                }
-                .quantum-particles {
-                    background-image: radial-gradient(circle at 10% 20%, rgba(0, 204, 0, 0.1) 0%, transparent 10%),
-                                    radial-gradient(circle at 30% 70%, rgba(0, 204, 0, 0.1) 0%, transparent 10%),
-                                    radial-gradient(circle at 60% 30%, rgba(0, 204, 0, 0.1) 0%, transparent 10%),
-                                    radial-gradient(circle at 80% 80%, rgba(0, 204, 0, 0.1) 0%, transparent 10%),
-                                    radial-gradient(circle at 90% 10%, rgba(0, 204, 0, 0.1) 0%, transparent 10%) !important;
-                }
-                .stSidebar [data-testid="stMarkdown"] svg path { stroke: #00cc00 !important; }
-                .stSidebar [data-testid="stMarkdown"] svg text { fill: #00cc00 !important; }
-                .stSidebar [data-testid="stMarkdown"] { color: #00cc00 !important; }
-                .stSidebar h1, .stSidebar h2, .stSidebar h3, .stSidebar .stExpander { color: #00cc00 !important; }
-                .stSidebar .stButton > button { background-color: #00cc00 !important; }
-            </style>
-            """, unsafe_allow_html=True)
-        elif theme_name == "Classic":
-            st.markdown("""
-            <style>
-                .main { background-color: #252a34 !important; }
-                h1, h2, h3 { color: #ffffff !important; text-shadow: none; font-family: sans-serif; }
-                .stButton>button { background-color: #A9A9A9 !important; }
-                .stButton>button:hover { background-color: #3949ab !important; }
-                .quantum-waves {
-                    background-image: 
-                        url("data:image/svg+xml,%3Csvg width='100%25' height='100%25' xmlns='http://www.w3.org/2000/svg'%3E%3Cdefs%3E%3ClinearGradient id='grad' x1='0%25' y1='0%25' x2='100%25' y2='0%25'%3E%3Cstop offset='0%25' style='stop-color:%23757de8;stop-opacity:0.4' /%3E%3Cstop offset='100%25' style='stop-color:%233949ab;stop-opacity:0.1' /%3E%3C/linearGradient%3E%3C/defs%3E%3Cpath d='M-50 80 Q -25 60, 0 80 T 50 80 T 100 80 T 150 80 T 200 80 T 250 80' stroke='url(%23grad)' stroke-width='1' fill='none' opacity='0.3' /%3E%3Cpath d='M-50 120 Q -25 100, 0 120 T 50 120 T 100 120 T 150 120 T 200 120 T 250 120' stroke='url(%23grad)' stroke-width='1' fill='none' opacity='0.2' /%3E%3Cpath d='M-50 160 Q -25 140, 0 160 T 50 160 T 100 160 T 150 160 T 200 160 T 250 160' stroke='url(%23grad)' stroke-width='1' fill='none' opacity='0.1' /%3E%3C/svg%3E"),
-                        url("data:image/svg+xml,%3Csvg width='100%25' height='100%25' xmlns='http://www.w3.org/2000/svg'%3E%3Cdefs%3E%3ClinearGradient id='grad2' x1='0%25' y1='0%25' x2='100%25' y2='0%25'%3E%3Cstop offset='0%25' style='stop-color:%23757de8;stop-opacity:0.3' /%3E%3Cstop offset='100%25' style='stop-color:%233949ab;stop-opacity:0.1' /%3E%3C/defs%3E%3Cpath d='M-50 40 Q 0 0, 50 40 T 150 40 T 250 40 T 350 40' stroke='url(%23grad2)' stroke-width='1' fill='none' opacity='0.2' /%3E%3Cpath d='M-50 200 Q 0 160, 50 200 T 150 200 T 250 200 T 350 200' stroke='url(%23grad2)' stroke-width='1' fill='none' opacity='0.2' /%3E%3C/svg%3E") !important;
-                }
-                .quantum-particles {
-                    background-image: radial-gradient(circle at 10% 20%, rgba(117, 125, 232, 0.1) 0%, transparent 10%),
-                                    radial-gradient(circle at 30% 70%, rgba(117, 125, 232, 0.1) 0%, transparent 10%),
-                                    radial-gradient(circle at 60% 30%, rgba(117, 125, 232, 0.1) 0%, transparent 10%),
-                                    radial-gradient(circle at 80% 80%, rgba(117, 125, 232, 0.1) 0%, transparent 10%),
-                                    radial-gradient(circle at 90% 10%, rgba(117, 125, 232, 0.1) 0%, transparent 10%) !important;
-                }
-                .stSidebar [data-testid="stMarkdown"] svg path { stroke: #757de8 !important; }
-                .stSidebar [data-testid="stMarkdown"] svg text { fill: #757de8 !important; }
-                .stSidebar [data-testid="stMarkdown"] { color: #ffffff !important; }
-                .stSidebar h1, .stSidebar h2, .stSidebar h3, .stSidebar .stExpander { color: #757de8 !important; }
-                .stSidebar .stButton > button { background-color: #A9A9A9 !important; }
-            </style>
-            """, unsafe_allow_html=True)
\ No newline at end of file
+        """Apply the base styling and the selected theme to the application
+        
+        Streamlit removes elements a rerun does not emit again, so the styles are
+        sent on every rerun; they go out as one prebuilt, minified element.
+        """
+        st.markdown(ThemeManager.build_stylesheet(theme_name), unsafe_allow_html=True)
+    
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def build_stylesheet(theme_name):
+        """Build the complete styling markup of a theme (once per process)
+        
+        Args:
+            theme_name: One of THEMES
+            
+        Returns:
+            A single minified <style> element followed by the background elements
+        """
+        css = (ThemeManager.BASE_CSS + ThemeManager.THEME_CSS.get(theme_name, "") +
+               ThemeManager.TOGGLE_CSS.format(theme_color=ThemeManager.get_theme_color(theme_name)))
+        return f"<style>{ThemeManager.minify_css(css)}</style>{ThemeManager.BACKGROUND_HTML}"
+    
+    @staticmethod
+    def minify_css(css):
+        """Remove comments and insignificant whitespace from a stylesheet
+        
+        Quoted strings, such as the SVG data URIs, are left untouched.
+        """
+        parts = re.split(r"(\"[^\"]*\"|'[^']*')", css)
+        for i in range(0, len(parts), 2):
+            text = re.sub(r"/\*.*?\*/", "", parts[i], flags=re.S)
+            text = re.sub(r"\s+", " ", text)
+            parts[i] = re.sub(r"\s*([{};,>])\s*", r"\1", text).replace(";}", "}")
+        return "".join(parts).strip()
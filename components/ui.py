@@ -1,7 +1,9 @@
 import streamlit as st
 import os
 from .themes import ThemeManager
-from utils.memory_utils import MemoryManager
+from utils.cache_utils import SearchCache
+from assistant.llm_factory import LLMFactory
+from assistant.llm_router import LLMRouter
 
 class UI:
     """UI component management for the application"""
@@ -15,112 +17,6 @@ class UI:
             layout="wide"
         )
     
-    @staticmethod
-    def apply_base_styling():
-        """Apply base styling to the application"""
-        st.markdown("""
-        <style>
-            .main {
-                background-color: #0e1117;
-                background-image: linear-gradient(rgba(14, 17, 23, 0.8), rgba(14, 17, 23, 0.8)), 
-                                url("data:image/svg+xml,%3Csvg width='100' height='100' viewBox='0 0 100 100' xmlns='http://www.w3.org/2000/svg'%3E%3Cpath d='M10 10L20 20M30 30L40 40M50 50L60 60M70 70L80 80M90 90L95 95' stroke='%233b82f640' stroke-width='1'/%3E%3Cpath d='M20 10L10 20M40 30L30 40M60 50L50 60M80 70L70 80M95 90L90 95' stroke='%233b82f640' stroke-width='1'/%3E%3Cpath d='M30 10C40 20,45 25,50 30' stroke='%234b96ff40' stroke-width='1' fill='none'/%3E%3C/svg%3E");
-                color: white !important;
-            }
-            body {
-                background-color: #0e1117;
-                color: white;
-            }
-            .stApp {
-                background: none;
-                max-width: 1200px;
-                margin: 0 auto;
-            }
-            h1, h2, h3 {
-                color: #4b96ff !important;
-                font-family: 'Courier New', Courier, monospace;
-                text-shadow: 0 0 5px rgba(75, 150, 255, 0.3);
-            }
-            .stButton>button {
-                background-color: #3b82f6;
-                color: white;
-                border-radius: 8px;
-            }
-            .stButton>button:hover {
-                background-color: #1e40af;
-            }
-            .stChat {
-                border-radius: 12px;
-                border: 1px solid #e0e7ff;
-            }
-            .css-1oe6o3n {
-                background-color: #dbeafe;
-            }
-            .css-1e5imcs {
-                background-color: #eff6ff;
-            }
-            .stSidebar {
-                background-color: #0e1117 !important;
-                background-image: linear-gradient(rgba(14, 17, 23, 0.95), rgba(14, 17, 23, 0.95)), 
-                                url("data:image/svg+xml,%3Csvg width='100' height='100' viewBox='0 0 100 100' xmlns='http://www.w3.org/2000/svg'%3E%3Cpath d='M10 10L20 20M30 30L40 40M50 50L60 60M70 70L80 80M90 90L95 95' stroke='%233b82f680' stroke-width='1'/%3E%3Cpath d='M20 10L10 20M40 30L30 40M60 50L50 60M80 70L70 80M95 90L90 95' stroke='%233b82f680' stroke-width='1'/%3E%3Cpath d='M30 10C40 20,45 25,50 30' stroke='%234b96ff50' stroke-width='1' fill='none'/%3E%3C/svg%3E");
-                color: white !important;
-            }
-            .stSidebar [data-testid="stMarkdown"] {
-                color: white !important;
-            }
-            .stSidebar h1, .stSidebar h2, .stSidebar h3, .stSidebar .stExpander {
-                color: #4b96ff !important;
-            }
-            .stSidebar .stButton > button {
-                background-color: #4b96ff;
-                color: white;
-            }
-            .stSidebar .stSelectbox > div > div {
-                background-color: #1e293b;
-                color: white;
-                border-color: #3b82f6;
-            }
-            /* Quantum wave patterns across the entire page */
-            .quantum-waves {
-                position: fixed;
-                top: 0;
-                left: 0;
-                width: calc(100% + 50px);
-                height: 100%;
-                pointer-events: none;
-                z-index: -1;
-                background-image: 
-                    url("data:image/svg+xml,%3Csvg width='100%25' height='100%25' xmlns='http://www.w3.org/2000/svg'%3E%3Cdefs%3E%3ClinearGradient id='grad' x1='0%25' y1='0%25' x2='100%25' y2='0%25'%3E%3Cstop offset='0%25' style='stop-color:%234b96ff;stop-opacity:0.4' /%3E%3Cstop offset='100%25' style='stop-color:%233b82f6;stop-opacity:0.1' /%3E%3C/linearGradient%3E%3C/defs%3E%3Cpath d='M-50 80 Q -25 60, 0 80 T 50 80 T 100 80 T 150 80 T 200 80 T 250 80' stroke='url(%23grad)' stroke-width='1' fill='none' opacity='0.3' /%3E%3Cpath d='M-50 120 Q -25 100, 0 120 T 50 120 T 100 120 T 150 120 T 200 120 T 250 120' stroke='url(%23grad)' stroke-width='1' fill='none' opacity='0.2' /%3E%3Cpath d='M-50 160 Q -25 140, 0 160 T 50 160 T 100 160 T 150 160 T 200 160 T 250 160' stroke='url(%23grad)' stroke-width='1' fill='none' opacity='0.1' /%3E%3C/svg%3E"),
-                    url("data:image/svg+xml,%3Csvg width='100%25' height='100%25' xmlns='http://www.w3.org/2000/svg'%3E%3Cdefs%3E%3ClinearGradient id='grad2' x1='0%25' y1='0%25' x2='100%25' y2='0%25'%3E%3Cstop offset='0%25' style='stop-color:%234b96ff;stop-opacity:0.3' /%3E%3Cstop offset='100%25' style='stop-color:%233b82f6;stop-opacity:0.1' /%3E%3C/defs%3E%3Cpath d='M-50 40 Q 0 0, 50 40 T 150 40 T 250 40 T 350 40' stroke='url(%23grad2)' stroke-width='1' fill='none' opacity='0.2' /%3E%3Cpath d='M-50 200 Q 0 160, 50 200 T 150 200 T 250 200 T 350 200' stroke='url(%23grad2)' stroke-width='1' fill='none' opacity='0.2' /%3E%3C/svg%3E");
-                background-size: 100% 100%, 100% 100%;
-                animation: wave-animation 20s linear infinite;
-                margin-left: -50px;
-            }
-            
-            @keyframes wave-animation {
-                0% { background-position: 0% 0%, 0% 0%; }
-                100% { background-position: 100% 0%, -100% 0%; }
-            }
-            
-            /* Quantum particles effect */
-            .quantum-particles {
-                position: fixed;
-                top: 0;
-                left: 0;
-                width: 100%;
-                height: 100%;
-                pointer-events: none;
-                z-index: -1;
-                background-image: radial-gradient(circle at 10% 20%, rgba(75, 150, 255, 0.1) 0%, transparent 10%),
-                                radial-gradient(circle at 30% 70%, rgba(75, 150, 255, 0.1) 0%, transparent 10%),
-                                radial-gradient(circle at 60% 30%, rgba(75, 150, 255, 0.1) 0%, transparent 10%),
-                                radial-gradient(circle at 80% 80%, rgba(75, 150, 255, 0.1) 0%, transparent 10%),
-                                radial-gradient(circle at 90% 10%, rgba(75, 150, 255, 0.1) 0%, transparent 10%);
-            }
-        </style>
-        <div class="quantum-waves"></div>
-        <div class="quantum-particles"></div>
-        """, unsafe_allow_html=True)
-    
     @staticmethod
     def render_header():
         """Render the application header"""
@@ -137,6 +33,28 @@ class UI:
         </div>
         """, unsafe_allow_html=True)
     
+    @staticmethod
+    def render_timings(timings):
+        """Render a collapsible per-stage timing breakdown for an answer
+        
+        Args:
+            timings: Trace summary (see QueryTrace.summary)
+        """
+        with st.expander(f"⏱️ Timing breakdown ({timings['total_s']:.2f}s)", expanded=False):
+            rows = [
+                {"Stage": name, "Calls": stage["count"], "Seconds": round(stage["total_s"], 3)}
+                for name, stage in sorted(timings["stages"].items(), key=lambda item: -item[1]["total_s"])
+            ]
+            if rows:
+                st.table(rows)
+            details = [f"{timings.get('llm_calls', 0)} LLM calls", f"{timings.get('tool_calls', 0)} tool calls",
+                       f"{timings.get('iterations', 0)} agent iterations"]
+            if timings.get("prompt_tokens") or timings.get("completion_tokens"):
+                details.append(f"{timings['prompt_tokens']} prompt / {timings['completion_tokens']} completion tokens")
+            if timings.get("first_token_s") is not None:
+                details.append(f"first token after {timings['first_token_s']:.2f}s")
+            st.caption(" · ".join(details))
+    
     @staticmethod
     def render_sidebar_logo():
         """Render the logo in the sidebar"""
@@ -153,27 +71,11 @@ class UI:
         </div>
         """, unsafe_allow_html=True)
     
-    @staticmethod
-    def style_toggle_switch(theme_color):
-        """Style the toggle switch based on the current theme color"""
-        st.markdown(f"""
-        <style>
-            /* Style the toggle switch based on theme */
-            .stToggle > div > div:hover {{
-                color: {theme_color} !important;
-            }}
-            .stToggle > div[data-baseweb="toggle"] > div {{
-                background-color: {theme_color} !important;
-            }}
-            .stToggle > div[data-baseweb="toggle"] > div > div:last-child {{
-                background-color: white !important;
-            }}
-        </style>
-        """, unsafe_allow_html=True)
-
 class SidebarUI:
     """Manages the sidebar UI components"""
     
+    AGENT_MODES = ["ReAct", "Plan & Execute"]
+    
     @staticmethod
     def render_sidebar(ollama_manager):
         """Render the complete sidebar with all components"""
@@ -184,7 +86,7 @@ class SidebarUI:
             # LLM provider selection
             llm_provider = st.selectbox(
                 "Select AI Engine",
-                options=["OpenAI", "Local (Ollama)"],
+                options=["OpenAI", "Local (Ollama)", LLMFactory.ROUTER_PROVIDER],
                 index=0
             )
             
@@ -199,8 +101,11 @@ class SidebarUI:
             
             # Clear conversation button at the bottom of sidebar
             if st.button("Clear Conversation", key="clear_chat"):
-                st.session_state.messages = []
-                st.session_state.memory = MemoryManager.initialize_memory()
+                st.session_state.memory.clear()
+                # Start a new session, which also resets the conversation on an API server
+                for key in ("messages", "memory", "session_id", "render_window"):
+                    st.session_state.pop(key, None)
+                st.query_params.pop("session", None)
                 st.rerun()
                 
         return llm_provider
@@ -216,26 +121,82 @@ class SidebarUI:
                 if not os.getenv("OPENAI_API_KEY"):
                     st.text_input("Enter OpenAI API Key", type="password", key="openai_api_key", 
                                 on_change=lambda: os.environ.update({"OPENAI_API_KEY": st.session_state.openai_api_key}))
+            elif llm_provider == LLMFactory.ROUTER_PROVIDER:
+                SidebarUI.render_router_status()
             else:
-                ollama_status = "Running" if ollama_manager.is_ollama_running() else "Not Running"
-                st.info(f"Ollama Server: {ollama_status}")
+                # Read the background monitor's cached status so rendering never waits on the network
+                status = ollama_manager.get_status()
+                if status["running"]:
+                    st.info(f"Ollama Server: Running ({status['latency_ms']:.0f} ms)")
+                    SidebarUI.render_model_picker(status)
+                elif status["starting"]:
+                    st.info("Ollama Server: Starting...")
+                elif status["running"] is None:
+                    st.info("Ollama Server: Checking...")
+                else:
+                    st.info("Ollama Server: Not Running")
                 
                 # Import the function directly from utils
                 from utils.ollama_utils import get_ollama_class
                 OLLAMA_CLASS, OLLAMA_AVAILABLE = get_ollama_class()
                 
-                if not ollama_manager.is_ollama_running() and OLLAMA_AVAILABLE:
+                if status["running"] is False and not status["starting"] and OLLAMA_AVAILABLE:
                     if st.button("Start Ollama Server"):
-                        with st.spinner("Starting Ollama server..."):
-                            if ollama_manager.start_ollama_server():
-                                st.success("Ollama server started successfully!")
-                                st.rerun()
-                            else:
-                                st.error("Failed to start server. Please start it manually.")
+                        if ollama_manager.start_ollama_server():
+                            st.rerun()
+                        else:
+                            st.error("Failed to start server. Please start it manually.")
+                elif status["starting"]:
+                    if st.button("Refresh Status"):
+                        st.rerun()
                 elif not OLLAMA_AVAILABLE:
                     st.error("Ollama integration not available")
                     st.markdown("Install with: `pip install -U langchain_ollama`")
     
+    @staticmethod
+    def render_router_status():
+        """Render the router's backends with their rolling latency and error rate"""
+        stats = LLMRouter.backend_stats()
+        for backend in LLMFactory.get_router_backends():
+            backend_stats = stats.get(backend)
+            if not backend_stats or backend_stats["latency_s"] is None:
+                st.caption(f"{backend}: no calls yet")
+                continue
+            health = "healthy" if backend_stats["healthy"] else "cooling down"
+            st.caption(f"{backend}: {backend_stats['latency_s']:.2f}s avg, "
+                       f"{backend_stats['error_rate']:.0%} errors, {health}")
+        
+        if not os.getenv("OPENAI_API_KEY"):
+            st.text_input("Enter OpenAI API Key", type="password", key="openai_api_key", 
+                        on_change=lambda: os.environ.update({"OPENAI_API_KEY": st.session_state.openai_api_key}))
+    
+    @staticmethod
+    def render_model_picker(status):
+        """Render the selector for installed Ollama models and the model's warm-up state
+        
+        Args:
+            status: Cached Ollama server status (see OllamaMonitor.status)
+        """
+        models = status["models"]
+        if not models:
+            st.warning("No models installed. Pull one with `ollama pull <model>`.")
+            return
+        
+        # Default to the configured model when it is installed
+        if st.session_state.get("ollama_model") not in models:
+            default_model = LLMFactory.get_model_name("Local (Ollama)")
+            st.session_state.ollama_model = default_model if default_model in models else models[0]
+        
+        st.selectbox("Model", options=models, key="ollama_model")
+        
+        warm_state = status["warm"].get(st.session_state.ollama_model)
+        if warm_state == "loading":
+            st.caption("⏳ Loading model into memory...")
+        elif warm_state == "ready":
+            st.caption("🔥 Model loaded and kept warm")
+        elif warm_state == "error":
+            st.caption("⚠️ Model could not be preloaded")
+    
     @staticmethod
     def render_search_capability():
         """Render the search capability expander"""
@@ -244,12 +205,6 @@ class SidebarUI:
             api_status = "Available" if google_api_key else "Not Available"
             st.info(f"Google Search API: {api_status}")
             
-            # Get theme color
-            theme_color = ThemeManager.get_theme_color(st.session_state.app_theme)
-            
-            # Apply custom CSS to style the toggle switch based on theme
-            UI.style_toggle_switch(theme_color)
-            
             # Initialize search state if not present
             if "google_search_enabled" not in st.session_state:
                 st.session_state.google_search_enabled = True
@@ -277,6 +232,28 @@ class SidebarUI:
                 st.error("Google Search is enabled but API keys are missing.")
             else:
                 st.success("Google Search is enabled and ready to use.")
+            
+            # Agent mode selection
+            if st.session_state.google_search_enabled:
+                SidebarUI.render_agent_mode()
+            
+            # Show search cache effectiveness
+            cache = SearchCache.shared()
+            cache_hits = cache.stats["memory_hits"] + cache.stats["disk_hits"]
+            st.caption(f"Search cache: {cache_hits} hits, {cache.stats['misses']} misses "
+                       f"({cache.hit_rate():.0%} hit rate)")
+    
+    @staticmethod
+    def render_agent_mode():
+        """Render the agent mode selector"""
+        agent_mode = st.radio(
+            "Agent Mode",
+            SidebarUI.AGENT_MODES,
+            index=SidebarUI.AGENT_MODES.index(st.session_state.get("agent_mode", "ReAct")),
+            help="ReAct searches step by step. Plan & Execute plans all searches up front, "
+                 "runs them together and answers with a single synthesis call."
+        )
+        st.session_state.agent_mode = agent_mode
     
     @staticmethod
     def render_theme_selector():
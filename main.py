@@ -1,38 +1,50 @@
 import streamlit as st
 import os
+import time
+import uuid
 from dotenv import load_dotenv
 
 # Import component modules
 from components import UI, SidebarUI, ThemeManager
-from utils import OllamaManager, MemoryManager, get_ollama_class
-from assistant import LLMFactory, ResearchAgent, SearchTools
+from utils import OllamaManager, OllamaMonitor, MemoryManager, get_ollama_class, QueryTrace, Tracer
+from assistant import LLMFactory, SearchTools, ResourceRegistry, ResearchPipeline, ResearchClient
 
 # Load environment variables
 load_dotenv()
 
+DEFAULT_RENDER_WINDOW = 20
+
 def main():
     # Initialize application
     initialize_app()
     
+    # Serve Prometheus metrics when METRICS_PORT is set
+    Tracer.start_metrics_server()
+    
     # Setup page
     UI.setup_page_config()
-    UI.apply_base_styling()
+    ThemeManager.apply_theme(st.session_state.app_theme)
     UI.render_header()
     
-    # Initialize Ollama management and get class information
+    # Initialize Ollama management (starts the background health monitor) and get class information
     ollama_manager = OllamaManager()
-    OLLAMA_CLASS, OLLAMA_AVAILABLE = get_ollama_class()
+    OllamaMonitor.shared()
     
     # Render sidebar and get provider selection
     llm_provider = SidebarUI.render_sidebar(ollama_manager)
     
-    # Apply selected theme
-    ThemeManager.apply_theme(st.session_state.app_theme)
+    # The Ollama integration is slow to import, so it is only loaded when the provider needs it
+    if LLMFactory.uses_ollama(llm_provider):
+        OLLAMA_CLASS, OLLAMA_AVAILABLE = get_ollama_class()
+    else:
+        OLLAMA_CLASS, OLLAMA_AVAILABLE = None, False
+    
+    # Preload the selected local model so the first query does not pay for loading it
+    if llm_provider == "Local (Ollama)" and OllamaManager.is_ollama_running():
+        OllamaMonitor.shared().keep_warm(get_model_name(llm_provider))
     
     # Display chat history
-    for message in st.session_state.messages:
-        with st.chat_message(message["role"]):
-            st.markdown(message["content"])
+    render_history()
     
     # Chat input
     query = st.chat_input("Ask a research question...")
@@ -48,20 +60,64 @@ def initialize_app():
     # Initialize theme
     ThemeManager.initialize_theme()
     
-    # Initialize messages if not present
+    # Identify the session so queued queries are admitted fairly across sessions. The id
+    # is kept in the URL, so a reload or another app process continues the conversation.
+    if "session_id" not in st.session_state:
+        st.session_state.session_id = st.query_params.get("session") or uuid.uuid4().hex
+        st.query_params["session"] = st.session_state.session_id
+    
+    # Initialize messages if not present, with the latest turns of a stored conversation
     if "messages" not in st.session_state:
-        st.session_state.messages = []
+        start, messages = MemoryManager.load_transcript(st.session_state.session_id)
+        st.session_state.messages = messages
+        st.session_state.history_start = start
+    
+    # Number of latest messages rendered on each rerun
+    if "render_window" not in st.session_state:
+        st.session_state.render_window = int(os.getenv("CHAT_RENDER_WINDOW", DEFAULT_RENDER_WINDOW))
     
     # Initialize memory if not present
     if "memory" not in st.session_state:
-        st.session_state.memory = MemoryManager.initialize_memory()
+        st.session_state.memory = MemoryManager.initialize_memory(st.session_state.session_id)
     
     # Initialize Google Search toggle if not present
     if "google_search_enabled" not in st.session_state:
         st.session_state.google_search_enabled = True
+    
+    # Initialize agent mode if not present
+    if "agent_mode" not in st.session_state:
+        st.session_state.agent_mode = "ReAct"
+
+def render_history():
+    """Render the latest messages of the chat history
+    
+    Every rerun sends the rendered messages to the browser again, so only the last
+    render_window messages are rendered; earlier ones (loaded from the session
+    store once the loaded ones are all shown) are added a page at a time on request.
+    """
+    messages = st.session_state.messages
+    window = st.session_state.render_window
+    if (len(messages) > window or st.session_state.history_start > 0) and st.button("Show earlier messages"):
+        page = int(os.getenv("CHAT_RENDER_WINDOW", DEFAULT_RENDER_WINDOW))
+        st.session_state.render_window += page
+        if st.session_state.render_window > len(messages) and st.session_state.history_start > 0:
+            start, earlier = MemoryManager.load_transcript(st.session_state.session_id,
+                                                           end=st.session_state.history_start, limit=page)
+            messages[:0] = earlier
+            st.session_state.history_start = start
+        st.rerun()
+    
+    for message in messages[-window:]:
+        with st.chat_message(message["role"]):
+            st.markdown(message["content"])
+            if message.get("timings"):
+                UI.render_timings(message["timings"])
 
 def process_query(query, llm_provider, OLLAMA_CLASS, OLLAMA_AVAILABLE):
     """Process a user query and generate a response"""
+    # Pick up turns stored for this session by other app processes
+    st.session_state.memory.sync()
+    
     # Add user message to chat history
     st.session_state.messages.append({"role": "user", "content": query})
     
@@ -84,47 +140,143 @@ def process_query(query, llm_provider, OLLAMA_CLASS, OLLAMA_AVAILABLE):
         else:
             loading_message = "Generating with local model..."
         
-        # Show the appropriate loading message and generate response
-        with st.spinner(loading_message):
-            result = generate_response(query, llm_provider, OLLAMA_CLASS, OLLAMA_AVAILABLE)
+        # Record where the time goes for this answer
+        trace = QueryTrace(query, {"provider": llm_provider, "model": get_model_name(llm_provider),
+                                   "search": search_enabled and has_search_keys,
+                                   "agent_mode": st.session_state.agent_mode})
+        
+        # Show the appropriate loading message and stream the response as it is generated
+        with trace.activated(), st.spinner(loading_message):
+            response = generate_response(query, llm_provider, OLLAMA_CLASS, OLLAMA_AVAILABLE, stream=True,
+                                         message_placeholder=message_placeholder)
+            if isinstance(response, str):
+                result = response
+            else:
+                result = render_stream(response, message_placeholder, trace)
         
         # Update the message placeholder with the result
         message_placeholder.markdown(result)
         
-        # Add assistant response to chat history
-        st.session_state.messages.append({"role": "assistant", "content": result})
+        # Export the trace and show the per-stage breakdown under the answer
+        # (as measured by the API server when the app is a thin client)
+        Tracer.export(trace.finish())
+        timings = trace.summary()
+        timings = timings.pop("server_timings", None) or timings
+        UI.render_timings(timings)
         
+        # Add assistant response to chat history
+        st.session_state.messages.append({"role": "assistant", "content": result, "timings": timings})
+    
+    # The API server keeps the memory of its sessions itself
+    if ResearchClient.from_env() is None:
         # Update memory with this interaction
-        st.session_state.memory.chat_memory.add_user_message(query)
-        st.session_state.memory.chat_memory.add_ai_message(result)
+        st.session_state.memory.save_context({"input": query}, {"output": result})
+        
+        # Fold turns that no longer fit the history budget into the running summary
+        llm = ResourceRegistry.get_llm(llm_provider, OLLAMA_CLASS, OLLAMA_AVAILABLE, get_model_name(llm_provider))
+        if llm:
+            st.session_state.memory.compact(llm)
 
-def generate_response(query, llm_provider, OLLAMA_CLASS, OLLAMA_AVAILABLE):
-    """Generate a response to the user's query"""
-    # Get search tools
-    tools = SearchTools.get_search_tools()
+def render_stream(events, message_placeholder, trace=None):
+    """Render streamed response events into the placeholder and return the final answer
     
-    # Create LLM
-    llm = LLMFactory.create_llm(llm_provider, OLLAMA_CLASS, OLLAMA_AVAILABLE)
+    When a trace is given, the time spent rendering and the time to first token are
+    recorded in it.
+    """
+    status_placeholder = st.empty()
+    answer = ""
+    result = ""
+    render_start = None
+    render_time = 0.0
     
-    if llm:
-        # Convert chat history to the format needed by LLM
-        chat_history = MemoryManager.format_chat_history(st.session_state.messages)
-        
-        # Create agent if search is enabled and tools are available
-        if SearchTools.is_search_enabled() and tools:
-            model = ResearchAgent.create_agent(llm, tools, st.session_state.memory)
-            return ResearchAgent.run_query(model, query)
-        else:
-            # Use LLM directly if no search or tools
-            return ResearchAgent.run_query(llm, query, chat_history)
+    for event in events:
+        if event["type"] == "token":
+            answer += event["content"]
+            start = time.perf_counter()
+            if render_start is None:
+                render_start = start
+                if trace is not None:
+                    trace.attributes["first_token_s"] = trace.elapsed()
+            message_placeholder.markdown(answer + "▌")
+            render_time += time.perf_counter() - start
+        elif event["type"] == "action":
+            status_placeholder.caption(f"🔎 {event['tool']}: {event['input']}")
+        elif event["type"] == "observation":
+            status_placeholder.caption("📄 Reading results...")
+        elif event["type"] == "queued":
+            message_placeholder.markdown(queue_message(event["position"]))
+        elif event["type"] == "final":
+            result = event["content"]
+            if trace is not None and event.get("timings"):
+                trace.attributes["server_timings"] = event["timings"]
+    
+    status_placeholder.empty()
+    if trace is not None and render_start is not None:
+        trace.add_span("render", render_start, render_time)
+    return result
+
+def generate_response(query, llm_provider, OLLAMA_CLASS, OLLAMA_AVAILABLE, stream=False, message_placeholder=None):
+    """Generate a response to the user's query
+    
+    Returns the response text, or an event generator (see ResearchAgent.stream_query)
+    when stream is True and a model is available. While the query waits for a free
+    slot, its queue position is shown in message_placeholder.
+    """
+    # Let the API server answer when the app runs as a thin client
+    client = ResearchClient.from_env()
+    if client is not None:
+        events = client.stream(query, st.session_state.session_id, llm_provider, get_model_name(llm_provider),
+                               search_enabled=SearchTools.is_search_enabled(), agent_mode=st.session_state.agent_mode)
+        if stream:
+            return events
+        return next(event["content"] for event in events if event["type"] == "final")
+    
+    def show_queue_position(position):
+        if message_placeholder is not None:
+            message_placeholder.markdown(queue_message(position))
+    
+    # A streamed answer is generated while it is rendered, so the span ends with the stream
+    response = Tracer.span_stream("generate_response", lambda: ResearchPipeline.generate(
+        query,
+        llm_provider,
+        st.session_state.memory,
+        search_enabled=SearchTools.is_search_enabled(),
+        agent_mode=st.session_state.agent_mode,
+        ollama_class=OLLAMA_CLASS,
+        ollama_available=OLLAMA_AVAILABLE,
+        has_history=has_history(),
+        stream=stream,
+        model_name=get_model_name(llm_provider),
+        session_id=st.session_state.session_id,
+        on_wait=show_queue_position
+    ))
+    if response is not None:
+        return response
+    
+    # Handle error cases
+    if llm_provider == "OpenAI" and not os.getenv("OPENAI_API_KEY"):
+        return "Please provide your OpenAI API key in the sidebar."
+    elif llm_provider == "Local (Ollama)" and not OllamaManager.is_ollama_running():
+        return "Ollama server is not running. Please start it using the button in the sidebar."
+    elif llm_provider == LLMFactory.ROUTER_PROVIDER:
+        return "No AI engine is available. Please provide an OpenAI API key or start the Ollama server."
     else:
-        # Handle error cases
-        if llm_provider == "OpenAI" and not os.getenv("OPENAI_API_KEY"):
-            return "Please provide your OpenAI API key in the sidebar."
-        elif llm_provider == "Local (Ollama)" and not OllamaManager.is_ollama_running():
-            return "Ollama server is not running. Please start it using the button in the sidebar."
-        else:
-            return "Setup failed. Please check your configuration."
+        return "Setup failed. Please check your configuration."
+
+def queue_message(position):
+    """Text shown while a query waits for admission"""
+    return f"⏳ Many questions are being answered right now. You are number {position} in the queue..."
+
+def get_model_name(llm_provider):
+    """Return the model selected in the sidebar for the provider"""
+    if llm_provider == "Local (Ollama)" and st.session_state.get("ollama_model"):
+        return st.session_state.ollama_model
+    return LLMFactory.get_model_name(llm_provider)
+
+def has_history():
+    """Check whether the conversation has turns before the current query"""
+    # The current query is already in the message list
+    return len(st.session_state.messages) > 1
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
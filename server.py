@@ -0,0 +1,257 @@
+"""Headless HTTP API for the research assistant
+
+Serves the same pipeline as the Streamlit app, without the UI, so it can be called
+by other services and scaled out with several workers:
+
+    uvicorn server:app --host 0.0.0.0 --port 8000 --workers 4
+
+Endpoints:
+    POST /v1/chat                 Answer a question (JSON, or server-sent events with "stream": true)
+    POST /v1/sessions             Start a conversation and return its session_id
+    DELETE /v1/sessions/{id}      Forget a conversation
+    GET /health                   Liveness and load information
+    GET /metrics                  Prometheus text metrics
+"""
+import os
+import json
+import time
+import uuid
+import asyncio
+import threading
+import contextvars
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.routing import Route
+
+from utils import MemoryManager, OllamaManager, QueryTrace, SessionStore, Tracer, get_ollama_class
+from assistant import LLMFactory, ResourceRegistry, ResearchPipeline, RequestScheduler
+
+# Load environment variables
+load_dotenv()
+
+class SessionMemories:
+    """Conversation memory per API session
+
+    Conversations live in the shared SessionStore (SESSION_STORE_URL), so any worker
+    or replica can continue them; this keeps the recently used ones loaded. Sessions
+    not used for API_SESSION_TTL seconds are unloaded, as are the least recently
+    used ones beyond API_MAX_SESSIONS. Without a store, unloading a session forgets it.
+    """
+
+    DEFAULT_TTL = 24 * 60 * 60
+    DEFAULT_MAX_SESSIONS = 10000
+
+    def __init__(self, ttl=None, max_sessions=None):
+        self.ttl = ttl or int(os.getenv("API_SESSION_TTL", self.DEFAULT_TTL))
+        self.max_sessions = max_sessions or int(os.getenv("API_MAX_SESSIONS", self.DEFAULT_MAX_SESSIONS))
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session_id):
+        """Return (memory, lock) for a session, creating it on first use
+
+        The lock serializes queries of one session so its memory stays consistent.
+        """
+        now = time.time()
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+            if session is None or now - session["used_at"] > self.ttl:
+                session = {"memory": MemoryManager.initialize_memory(session_id), "lock": threading.Lock()}
+            session["used_at"] = now
+            self._sessions[session_id] = session
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+            return session["memory"], session["lock"]
+
+    def delete(self, session_id):
+        """Forget a session; returns whether it existed"""
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+        store = SessionStore.shared()
+        stored = store is not None and store.delete(session_id)
+        return session is not None or stored
+
+sessions = SessionMemories()
+
+# Answers run in a bounded pool. Queries waiting for admission hold a thread so they
+# can report their queue position; requests beyond the pool wait for a free thread.
+executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("API_WORKER_THREADS", 0)) or 4 * RequestScheduler.shared().max_concurrent,
+    thread_name_prefix="api-answer"
+)
+
+def parse_chat_request(body):
+    """Validate a chat request body and fill in defaults
+
+    Returns:
+        Tuple of (options dictionary, error message or None)
+    """
+    query = str(body.get("query") or "").strip()
+    if not query:
+        return None, "'query' is required"
+
+    provider = body.get("provider") or os.getenv("API_DEFAULT_PROVIDER", "OpenAI")
+    if provider not in ("OpenAI", "Local (Ollama)", LLMFactory.ROUTER_PROVIDER):
+        return None, f"Unknown provider: {provider}"
+
+    agent_mode = body.get("agent_mode") or "ReAct"
+    if agent_mode not in ("ReAct", "Plan & Execute"):
+        return None, f"Unknown agent_mode: {agent_mode}"
+
+    return {
+        "query": query,
+        "session_id": str(body.get("session_id") or uuid.uuid4().hex),
+        "provider": provider,
+        "model": body.get("model") or None,
+        "search": bool(body.get("search", True)),
+        "agent_mode": agent_mode,
+        "stream": bool(body.get("stream", False))
+    }, None
+
+def answer(options, emit):
+    """Answer a chat request in the calling thread, passing every event to emit
+
+    Events are those of ResearchAgent.stream_query plus "queued" while waiting for
+    admission; the final event also carries the session_id and timings.
+    """
+    memory, session_lock = sessions.get(options["session_id"])
+    ollama_class, ollama_available = get_ollama_class() if LLMFactory.uses_ollama(options["provider"]) else (None, False)
+    trace = QueryTrace(options["query"], {"provider": options["provider"], "api": True})
+
+    with trace.activated(), session_lock:
+        # Pick up turns another worker stored for this session
+        memory.sync()
+        has_history = memory.has_history()
+        response = ResearchPipeline.generate(
+            options["query"],
+            options["provider"],
+            memory,
+            search_enabled=options["search"],
+            agent_mode=options["agent_mode"],
+            ollama_class=ollama_class,
+            ollama_available=ollama_available,
+            has_history=has_history,
+            stream=True,
+            model_name=options["model"],
+            session_id=options["session_id"],
+            on_wait=lambda position: emit({"type": "queued", "position": position})
+        )
+
+        if response is None:
+            result = setup_error(options["provider"])
+        elif isinstance(response, str):
+            result = response
+        else:
+            result = ""
+            for event in response:
+                if event["type"] == "final":
+                    result = event["content"]
+                else:
+                    emit(event)
+
+        # An error is not part of the conversation; the question can simply be asked again
+        if response is not None and result and not ResearchPipeline.is_failure(result):
+            memory.save_context({"input": options["query"]}, {"output": result})
+
+    Tracer.export(trace.finish())
+    emit({"type": "final", "content": result, "session_id": options["session_id"], "timings": trace.summary()})
+
+    # Fold old turns into the summary after the answer has been delivered
+    llm = ResourceRegistry.get_llm(options["provider"], ollama_class, ollama_available, options["model"])
+    if llm is not None:
+        with session_lock:
+            memory.compact(llm)
+
+def setup_error(provider):
+    """Explain why no model could be created for the provider"""
+    if provider == "OpenAI" and not os.getenv("OPENAI_API_KEY"):
+        return "OPENAI_API_KEY is not set on the server."
+    if provider == "Local (Ollama)" and not OllamaManager.is_ollama_running():
+        return "Ollama server is not running."
+    return "Setup failed. Please check the server configuration."
+
+def run_in_thread(options, loop, events):
+    """Run answer() in the worker pool, forwarding its events to an asyncio queue"""
+    def emit(event):
+        loop.call_soon_threadsafe(events.put_nowait, event)
+
+    def worker():
+        try:
+            answer(options, emit)
+        except Exception as e:
+            emit({"type": "final", "content": f"An error occurred: {str(e)}", "session_id": options["session_id"]})
+
+    executor.submit(contextvars.copy_context().run, worker)
+
+async def chat(request):
+    try:
+        body = await request.json()
+    except ValueError:
+        return JSONResponse({"error": "Request body must be JSON"}, status_code=400)
+    options, error = parse_chat_request(body if isinstance(body, dict) else {})
+    if error:
+        return JSONResponse({"error": error}, status_code=400)
+
+    events = asyncio.Queue()
+    run_in_thread(options, asyncio.get_running_loop(), events)
+
+    if options["stream"] or "text/event-stream" in request.headers.get("accept", ""):
+        async def event_stream():
+            while True:
+                event = await events.get()
+                yield f"event: {event['type']}\ndata: {json.dumps(event, default=str)}\n\n"
+                if event["type"] == "final":
+                    return
+
+        return StreamingResponse(event_stream(), media_type="text/event-stream",
+                                 headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+    while True:
+        event = await events.get()
+        if event["type"] == "final":
+            return JSONResponse({"session_id": event["session_id"], "answer": event["content"],
+                                 "timings": event.get("timings")})
+
+async def create_session(request):
+    return JSONResponse({"session_id": uuid.uuid4().hex}, status_code=201)
+
+async def delete_session(request):
+    if not sessions.delete(request.path_params["session_id"]):
+        return JSONResponse({"error": "Unknown session"}, status_code=404)
+    return JSONResponse({"deleted": True})
+
+async def health(request):
+    scheduler = RequestScheduler.shared()
+    return JSONResponse({
+        "status": "ok",
+        "active_queries": scheduler.active,
+        "queued_queries": scheduler.waiting(),
+        "ollama_running": OllamaManager.get_status()["running"]
+    })
+
+async def metrics(request):
+    return PlainTextResponse(Tracer.prometheus_text(), media_type="text/plain; version=0.0.4")
+
+def create_app():
+    """Build the Starlette application"""
+    return Starlette(routes=[
+        Route("/v1/chat", chat, methods=["POST"]),
+        Route("/v1/sessions", create_session, methods=["POST"]),
+        Route("/v1/sessions/{session_id}", delete_session, methods=["DELETE"]),
+        Route("/health", health, methods=["GET"]),
+        Route("/metrics", metrics, methods=["GET"])
+    ])
+
+app = create_app()
+
+def main():
+    import uvicorn
+
+    uvicorn.run("server:app", host=os.getenv("API_HOST", "127.0.0.1"), port=int(os.getenv("API_PORT", 8000)),
+                workers=int(os.getenv("API_WORKERS", 1)))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+import os
+import sys
+
+# Keep every cache, index, trace and session in memory and use the local embedder
+os.environ.update({
+    "SEARCH_CACHE_PATH": "",
+    "KNOWLEDGE_INDEX_PATH": "",
+    "TRACE_PATH": "",
+    "SESSION_STORE_URL": "",
+    "EMBEDDING_PROVIDER": "hashing",
+    "GOOGLE_REQUESTS_PER_SECOND": "0"
+})
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+@pytest.fixture(autouse=True)
+def fresh_resources():
+    """Give every test its own process-wide resources and search cache"""
+    from assistant import ResourceRegistry
+    from utils.cache_utils import SearchCache
+    ResourceRegistry.clear()
+    SearchCache._shared = None
+    yield
+    ResourceRegistry.clear()
+    SearchCache._shared = None
+
+@pytest.fixture
+def fakes(monkeypatch):
+    """Register the benchmark's fake LLM and Google Search backends as the OpenAI provider"""
+    from assistant import ResourceRegistry
+    from benchmarks.fakes import FakeResearchLLM, FakeSearchWrapper
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    monkeypatch.setenv("GOOGLE_API_KEY", "test")
+    monkeypatch.setenv("GOOGLE_CSE_ID", "test")
+    monkeypatch.setenv("SEARCH_CLASSIFIER", "0")
+    llm = FakeResearchLLM(latency=0)
+    search = FakeSearchWrapper(latency=0)
+    ResourceRegistry.register(ResourceRegistry.llm_key("OpenAI"), llm)
+    ResourceRegistry.register(("google_wrapper",), search)
+    return llm, search
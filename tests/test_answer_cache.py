@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+from assistant.answer_cache import SemanticAnswerCache
+
+class TopicEmbedder:
+    """Embeds every query mentioning a topic word to the same vector, like a real model would for paraphrases"""
+
+    TOPICS = ["capital", "gdp", "roadmap", "supremacy"]
+
+    def embed(self, texts):
+        vectors = np.zeros((len(texts), len(self.TOPICS)), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for column, topic in enumerate(self.TOPICS):
+                if topic in text.lower():
+                    vectors[row, column] = 1.0
+        return vectors
+
+KEY = SemanticAnswerCache.make_key("OpenAI", "gpt-4o", True)
+
+def cache_with(query, answer="Cached answer https://example.org/a"):
+    cache = SemanticAnswerCache(TopicEmbedder())
+    cache.store(query, answer, KEY)
+    return cache
+
+def test_paraphrase_reuses_answer():
+    cache = cache_with("What is the capital of Australia?")
+    hit = cache.lookup("Which city is the capital of Australia", KEY)
+    assert hit["answer"].startswith("Cached answer")
+    assert hit["sources"] == ["https://example.org/a"]
+    assert cache.stats["hits"] == 1
+
+@pytest.mark.parametrize("stored, query", [
+    ("What was the GDP of Germany in 2023?", "What was the GDP of Germany in 2024?"),
+    ("What is IBM's quantum roadmap?", "What is IonQ's quantum roadmap?"),
+    ("Why is quantum supremacy achievable?", "Why is quantum supremacy not achievable?"),
+])
+def test_similar_question_with_different_facts_misses(stored, query):
+    cache = cache_with(stored)
+    assert cache.lookup(query, KEY) is None
+    assert cache.stats["misses"] == 1
+
+def test_compatible_entry_below_the_best_match_is_used():
+    cache = SemanticAnswerCache(TopicEmbedder())
+    cache.store("GDP of Germany in 2023", "2023 answer", KEY)
+    cache.store("GDP of Germany in 2024", "2024 answer", KEY)
+    assert cache.lookup("What was the GDP of Germany in 2024?", KEY)["answer"] == "2024 answer"
+
+def test_partitions_are_separate():
+    cache = cache_with("What is the capital of Australia?")
+    other = SemanticAnswerCache.make_key("OpenAI", "gpt-4o", False)
+    assert cache.lookup("What is the capital of Australia?", other) is None
+
+def test_hashing_embedder_disables_cache():
+    # conftest selects the hashing embedder, which measures word overlap, not meaning
+    cache = SemanticAnswerCache.from_env()
+    cache.store("What was the GDP of Germany in 2023?", "2023 answer", KEY)
+    assert cache.lookup("What was the GDP of Germany in 2023?", KEY) is None
+
+def test_explicit_ttl_enables_cache_with_hashing_embedder(monkeypatch):
+    monkeypatch.setenv("ANSWER_CACHE_TTL", "60")
+    cache = SemanticAnswerCache.from_env()
+    cache.store("What was the GDP of Germany in 2023?", "2023 answer", KEY)
+    assert cache.lookup("What was the GDP of Germany in 2023?", KEY)["answer"] == "2023 answer"
+
+def test_follow_up_detection():
+    assert SemanticAnswerCache.is_follow_up("What about its moons?", has_history=True)
+    assert not SemanticAnswerCache.is_follow_up("What about its moons?", has_history=False)
+    assert not SemanticAnswerCache.is_follow_up("How many moons does Jupiter have?", has_history=True)
@@ -0,0 +1,48 @@
+import time
+import asyncio
+import threading
+from assistant import SearchTools
+
+def test_searches_run_concurrently_up_to_the_limit():
+    active = []
+    peak = []
+    lock = threading.Lock()
+
+    def search(query):
+        with lock:
+            active.append(query)
+            peak.append(len(active))
+        time.sleep(0.05)
+        with lock:
+            active.remove(query)
+        return [query]
+
+    results = SearchTools.search_many([f"q{i}" for i in range(6)], search, max_concurrency=3)
+    assert results == [[f"q{i}"] for i in range(6)]
+    assert max(peak) == 3
+
+def test_a_failed_search_yields_its_error_message():
+    def search(query):
+        if query == "bad":
+            raise RuntimeError("quota exceeded")
+        return [query]
+
+    results = SearchTools.search_many(["good", "bad"], search)
+    assert results[0] == ["good"]
+    assert results[1] == "Search failed: quota exceeded"
+
+def test_split_queries_drops_duplicates():
+    assert SearchTools.split_queries('"a" | b\nb |  ') == ["a", "b"]
+
+def test_multi_search_tool_runs_every_query(fakes):
+    _, search = fakes
+    tool = next(tool for tool in SearchTools.get_search_tools(True) if tool.name == "Google Multi Search")
+    observation = tool.invoke("quantum error correction | topological qubits")
+    assert "Results for 'quantum error correction'" in observation
+    assert "Results for 'topological qubits'" in observation
+
+def test_run_coroutine_works_inside_a_running_loop():
+    async def outer():
+        return SearchTools.run_coroutine(asyncio.sleep(0, result="done"))
+
+    assert asyncio.run(outer()) == "done"
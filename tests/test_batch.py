@@ -0,0 +1,75 @@
+import json
+import pytest
+import batch
+from assistant import RequestScheduler
+
+def read_records(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+@pytest.fixture
+def questions(tmp_path):
+    path = tmp_path / "questions.jsonl"
+    path.write_text("\n".join([
+        json.dumps({"id": "q1", "query": "What is a qubit?"}),
+        json.dumps({"id": "q2", "query": "Explain quantum entanglement"}),
+        "# comment",
+        json.dumps({"query": "What is superposition?"}),
+        json.dumps({"id": "q1", "query": "duplicate id"}),
+    ]) + "\n")
+    return path
+
+@pytest.fixture
+def fake_answers(monkeypatch):
+    """Answer every question without a model; queries containing 'fail' fail"""
+    answered = []
+
+    def generate(query, *args, **kwargs):
+        answered.append(query)
+        return "An error occurred: backend down" if "fail" in query else f"Answer to {query}"
+
+    monkeypatch.setattr(batch.ResearchPipeline, "generate", generate)
+    # run() replaces the shared scheduler
+    monkeypatch.setattr(RequestScheduler, "_shared", None)
+    return answered
+
+def test_load_questions_skips_comments_and_repeated_ids(questions):
+    loaded = batch.load_questions(str(questions))
+    assert [question["id"] for question in loaded] == ["q1", "q2", batch.question_id("What is superposition?")]
+    assert batch.question_id("What  is superposition?") == batch.question_id("what is superposition?")
+
+def test_load_questions_from_csv_and_text(tmp_path):
+    csv_path = tmp_path / "questions.csv"
+    csv_path.write_text("id,query\na,What is a qubit?\n,What is a gate?\n")
+    assert [question["id"] for question in batch.load_questions(str(csv_path))][0] == "a"
+    text_path = tmp_path / "questions.txt"
+    text_path.write_text("What is a qubit?\n\nWhat is a gate?\n")
+    assert [question["query"] for question in batch.load_questions(str(text_path))] == ["What is a qubit?",
+                                                                                      "What is a gate?"]
+
+def test_resume_skips_answered_and_retries_failed(questions, tmp_path, fake_answers):
+    output = tmp_path / "answers.jsonl"
+    output.write_text("\n".join([
+        json.dumps({"id": "q1", "status": "ok"}),
+        json.dumps({"id": "q2", "status": "ok"}),
+        json.dumps({"id": "q2", "status": "error"}),
+        '{"id": "cut off by an interrupted run',
+    ]) + "\n")
+
+    counts = batch.run(batch.parse_args([str(questions), "--output", str(output), "--workers", "2"]))
+    assert counts["skipped"] == 1 and counts["answered"] == 2 and counts["failed"] == 0
+    assert sorted(fake_answers) == ["Explain quantum entanglement", "What is superposition?"]
+    assert batch.load_answered(str(output)) == {question["id"] for question in batch.load_questions(str(questions))}
+
+def test_failed_answers_are_recorded_as_errors(tmp_path, fake_answers):
+    questions = tmp_path / "questions.txt"
+    questions.write_text("please fail\n")
+    output = tmp_path / "answers.jsonl"
+    counts = batch.run(batch.parse_args([str(questions), "--output", str(output)]))
+    assert counts["failed"] == 1
+    assert read_records(output)[0]["status"] == "error"
+    assert batch.load_answered(str(output)) == set()
+
+def test_workers_get_a_slot_each_despite_a_lower_limit(questions, tmp_path, fake_answers, monkeypatch):
+    monkeypatch.setenv("MAX_CONCURRENT_QUERIES", "1")
+    batch.run(batch.parse_args([str(questions), "--output", str(tmp_path / "a.jsonl"), "--workers", "6"]))
+    assert RequestScheduler.shared().max_concurrent == 6
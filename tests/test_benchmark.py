@@ -0,0 +1,33 @@
+import pytest
+from benchmarks import run_benchmark
+
+@pytest.fixture
+def benchmark_env(monkeypatch):
+    """Restore the variables configure_environment sets once the test is done"""
+    for name in ("GOOGLE_API_KEY", "GOOGLE_CSE_ID", "SEARCH_CLASSIFIER", "MAX_CONCURRENT_QUERIES",
+                 "SEARCH_CACHE_TTL", "ANSWER_CACHE_TTL", "KNOWLEDGE_MATCH_SCORE"):
+        # setenv first so the variable is removed again even if it was not set before
+        monkeypatch.setenv(name, "")
+        monkeypatch.delenv(name)
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+
+@pytest.mark.parametrize("mode", ["react", "plan", "direct"])
+def test_benchmark_runs_offline(benchmark_env, mode):
+    args = run_benchmark.parse_args(["--mode", mode, "--concurrency", "2", "--llm-latency", "0",
+                                     "--search-latency", "0", "--answer-words", "20"])
+    report = run_benchmark.run(args)
+    assert report["queries"] == len(run_benchmark.load_queries(run_benchmark.DEFAULT_QUERIES))
+    assert report["errors"] == 0
+    assert report["search_calls_per_query"] == (0 if mode == "direct" else 2)
+    assert "Throughput" in run_benchmark.format_report(report)
+
+def test_cache_option_serves_repeated_queries_from_the_answer_cache(benchmark_env):
+    args = run_benchmark.parse_args(["--mode", "direct", "--repeat", "2", "--cache", "--concurrency", "1",
+                                     "--llm-latency", "0", "--search-latency", "0", "--answer-words", "20"])
+    report = run_benchmark.run(args)
+    assert report["answer_cache_hits"] == report["queries"] // 2
+
+def test_percentile():
+    assert run_benchmark.percentile([], 0.5) == 0.0
+    assert run_benchmark.percentile([3, 1, 2, 4], 0.5) == 2
+    assert run_benchmark.percentile([3, 1, 2, 4], 0.99) == 4
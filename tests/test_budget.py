@@ -0,0 +1,45 @@
+import pytest
+from assistant import ResearchAgent, ResourceRegistry, SearchTools
+from assistant.budget import QueryBudget
+from utils.tracing import QueryTrace
+
+@pytest.fixture
+def no_limits(monkeypatch):
+    for variable in ("AGENT_MAX_ITERATIONS", "AGENT_MAX_TOOL_CALLS", "AGENT_MAX_TOKENS", "AGENT_DEADLINE"):
+        monkeypatch.setenv(variable, "0")
+
+def test_first_limit_reached_is_the_stop_reason():
+    budget = QueryBudget(max_iterations=3, max_tool_calls=2, max_tokens=0, deadline=0)
+    assert budget.allows(1)
+    budget.tool_calls = 2
+    trace = QueryTrace("q")
+    with trace.activated():
+        assert not budget.allows(2)
+    assert budget.exceeded == "tool_calls"
+    assert trace.counters["budget_stops"] == 1 and trace.counters["budget_stop_tool_calls"] == 1
+
+def test_zero_disables_every_limit(no_limits):
+    budget = QueryBudget()
+    budget.tool_calls = budget.tokens = 10 ** 6
+    assert budget.allows(10 ** 6)
+
+def test_disabled_budget_lifts_langchains_iteration_limit(fakes, no_limits):
+    llm, search = fakes
+    # More steps than LangChain's default max_iterations of 15
+    llm.searches_per_query = 18
+    agent = ResourceRegistry.get_agent("OpenAI", SearchTools.get_search_tools(True))
+    answer = ResearchAgent.run_query(agent, "What is a qubit?")
+    assert search.calls == 18
+    assert "Agent stopped" not in answer and answer
+
+def test_budget_stop_answers_from_the_results_so_far(fakes, monkeypatch):
+    llm, search = fakes
+    llm.searches_per_query = 5
+    monkeypatch.setenv("AGENT_MAX_ITERATIONS", "2")
+    agent = ResourceRegistry.get_agent("OpenAI", SearchTools.get_search_tools(True))
+    trace = QueryTrace("q")
+    with trace.activated():
+        answer = ResearchAgent.run_query(agent, "What is a qubit?")
+    assert search.calls == 2
+    assert "Agent stopped" not in answer and answer
+    assert trace.counters["budget_stop_iterations"] == 1
@@ -0,0 +1,108 @@
+import time
+import pytest
+from assistant import SearchTools
+from assistant.knowledge_index import HashingEmbedder, VectorIndex
+from assistant.query_match import QueryMatch
+
+@pytest.mark.parametrize("query, other", [
+    ("What is IBM's quantum roadmap for 2025?", "what is IBM's quantum roadmap for 2025"),
+    ("Explain Shor's algorithm", "Describe Shor's algorithm"),
+    ("how do superconducting qubits work", "How do superconducting qubits work in practice?"),
+])
+def test_compatible_queries(query, other):
+    assert QueryMatch.compatible(query, other)
+
+@pytest.mark.parametrize("query, other", [
+    ("What is IBM's quantum roadmap for 2025?", "What is IonQ's quantum roadmap for 2025?"),
+    ("What was the GDP of Germany in 2023?", "What was the GDP of Germany in 2024?"),
+    ("Why is quantum supremacy achievable?", "Why is quantum supremacy not achievable?"),
+    ("Google quantum supremacy claim", "Rigetti quantum supremacy claim"),
+])
+def test_incompatible_queries(query, other):
+    assert not QueryMatch.compatible(query, other)
+
+def test_index_search_ranks_and_filters():
+    index = VectorIndex(HashingEmbedder())
+    index.add(["surface code error correction threshold", "interest rates and inflation"],
+              [{"kind": "page"}, {"kind": "results"}])
+    hits = index.search("error correction threshold", k=2, min_score=0.1)
+    assert [metadata["kind"] for _, _, metadata in hits] == ["page"]
+    assert index.search("error correction threshold", where={"kind": "results"}, min_score=0.1) == []
+
+ROADMAP = ("What is {}'s quantum computing roadmap for 2025 and beyond, including error corrected "
+           "logical qubits, modular processors and quantum advantage?")
+
+def search_counting(calls):
+    def search(query):
+        calls.append(query)
+        return [{"rank": 1, "title": query, "link": f"https://example.org/{len(calls)}", "snippet": ""}]
+    return search
+
+def test_similar_query_reuses_indexed_results():
+    calls = []
+    search = SearchTools.indexed_search(search_counting(calls))
+    first = search(ROADMAP.format("IBM"))
+    assert search(ROADMAP.format("IBM").replace("What is", "what's").rstrip("?")) == first
+    assert len(calls) == 1
+
+def test_entity_swap_calls_the_backend():
+    # Regression: "IonQ" was answered with the stored results for "IBM" (similarity 0.92)
+    calls = []
+    search = SearchTools.indexed_search(search_counting(calls))
+    ibm = search(ROADMAP.format("IBM"))
+    ionq = search(ROADMAP.format("IonQ"))
+    assert len(calls) == 2
+    assert ionq != ibm
+
+def test_unrelated_stored_passages_are_not_returned(fakes, monkeypatch):
+    index = SearchTools.get_knowledge_index()
+    index.add(["The Federal Reserve raised interest rates citing inflation."],
+              [{"kind": "page", "url": "https://example.org/fed", "query": "interest rates"}])
+    monkeypatch.setattr(SearchTools.get_page_fetcher(), "fetch_many", lambda urls: ["" for _ in urls])
+    result = SearchTools.read_top_results("surface code error correction threshold")
+    assert isinstance(result, str)
+
+def test_expired_results_call_the_backend(monkeypatch):
+    calls = []
+    search = SearchTools.indexed_search(search_counting(calls))
+    search(ROADMAP.format("IBM"))
+    SearchTools.get_knowledge_index().max_age = 60
+    real_time = time.time
+    monkeypatch.setattr(time, "time", lambda: real_time() + 120)
+    search(ROADMAP.format("IBM"))
+    search(ROADMAP.format("IBM"))
+    assert len(calls) == 2
+
+def test_disabled_search_cache_never_reuses_results(monkeypatch):
+    monkeypatch.setenv("SEARCH_CACHE_TTL", "0")
+    calls = []
+    search = SearchTools.indexed_search(search_counting(calls))
+    search(ROADMAP.format("IBM"))
+    search(ROADMAP.format("IBM"))
+    assert len(calls) == 2
+
+def test_entries_record_when_they_were_added():
+    index = VectorIndex(HashingEmbedder())
+    index.add(["surface code threshold"], [{"kind": "page"}])
+    (_, _, metadata), = index.search("surface code threshold")
+    assert metadata["kind"] == "page" and abs(metadata["created_at"] - time.time()) < 5
+
+def test_oldest_entries_are_evicted(tmp_path):
+    path = str(tmp_path / "index")
+    index = VectorIndex(HashingEmbedder(), path, max_entries=10)
+    index.add([f"passage number {i}" for i in range(11)])
+    assert len(index) == 9
+    assert index.search("passage number 0", min_score=0.99) == []
+    reloaded = VectorIndex(HashingEmbedder(), path, max_entries=10)
+    assert [entry["text"] for entry in reloaded._entries] == [f"passage number {i}" for i in range(2, 11)]
+    assert reloaded.search("passage number 10", k=1)[0][1] == "passage number 10"
+
+def test_expired_entries_are_dropped_on_load(tmp_path, monkeypatch):
+    path = str(tmp_path / "index")
+    VectorIndex(HashingEmbedder(), path).add(["old passage"])
+    real_time = time.time
+    monkeypatch.setattr(time, "time", lambda: real_time() + 120)
+    index = VectorIndex(HashingEmbedder(), path, max_age=60)
+    assert len(index) == 0
+    index.add(["old passage"])
+    assert len(VectorIndex(HashingEmbedder(), path, max_age=60)) == 1
@@ -0,0 +1,64 @@
+import time
+import contextvars
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage
+from assistant.llm_router import LLMRouter
+from assistant.scheduler import RequestScheduler
+
+request_id = contextvars.ContextVar("request_id", default=None)
+
+class FakeBackend:
+    def __init__(self, answer, delay=0.0, fail=False):
+        self.answer = answer
+        self.delay = delay
+        self.fail = fail
+        self.contexts = []
+
+    def invoke(self, messages, stop=None, **kwargs):
+        self.contexts.append(request_id.get())
+        time.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError(f"{self.answer} is down")
+        return AIMessage(content=self.answer)
+
+@pytest.fixture(autouse=True)
+def fresh_router(monkeypatch):
+    monkeypatch.setattr(LLMRouter, "_health", {})
+    monkeypatch.setattr(LLMRouter, "_executor", None)
+    monkeypatch.setattr(RequestScheduler, "_shared", None)
+
+def ask(router):
+    return router.invoke([HumanMessage(content="hi")]).content
+
+def test_unmeasured_backend_is_tried_before_a_slower_measured_one():
+    fast = FakeBackend("fast")
+    router = LLMRouter(backends=[("slow", FakeBackend("slow", delay=0.05)), ("fast", fast)])
+    assert ask(router) == "slow"
+    # Without hedging, "fast" is only ever measured if unmeasured backends go first
+    assert ask(router) == "fast"
+    assert ask(router) == "fast"
+    assert [name for name, _ in router.ranked()] == ["fast", "slow"]
+
+def test_failed_backend_falls_back_and_is_ranked_last():
+    router = LLMRouter(backends=[("broken", FakeBackend("broken", fail=True)), ("ok", FakeBackend("ok"))])
+    assert ask(router) == "ok"
+    assert [name for name, _ in router.ranked()] == ["ok", "broken"]
+    assert LLMRouter.backend_stats()["broken"]["error_rate"] == 1.0
+
+def test_hedged_call_returns_the_first_answer():
+    router = LLMRouter(backends=[("slow", FakeBackend("slow", delay=0.5)), ("fast", FakeBackend("fast"))],
+                       hedge_after=0.05)
+    started = time.perf_counter()
+    assert ask(router) == "fast"
+    assert time.perf_counter() - started < 0.4
+
+def test_calls_run_in_the_callers_context():
+    backend = FakeBackend("ok")
+    router = LLMRouter(backends=[("ok", backend)])
+    request_id.set("query-1")
+    ask(router)
+    assert backend.contexts == ["query-1"]
+
+def test_pool_is_sized_from_the_admission_limit(monkeypatch):
+    monkeypatch.setenv("MAX_CONCURRENT_QUERIES", "12")
+    assert LLMRouter.executor()._max_workers == 24
@@ -0,0 +1,75 @@
+from types import SimpleNamespace
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+from utils.memory_utils import TokenBudgetMemory
+
+class SummaryLLM:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.prompts = []
+
+    def invoke(self, messages):
+        self.prompts.append(messages[0].content)
+        if self.fail:
+            raise RuntimeError("model unavailable")
+        return SimpleNamespace(content=f"summary {len(self.prompts)}")
+
+def memory_with_turns(turns, token_budget=40, **kwargs):
+    memory = TokenBudgetMemory(token_budget=token_budget, **kwargs)
+    for i in range(turns):
+        memory.save_context({"input": f"question {i} " + "word " * 10}, {"output": f"answer {i} " + "word " * 10})
+    return memory
+
+def test_history_keeps_newest_messages_within_budget():
+    memory = memory_with_turns(6)
+    history = memory.get_history()
+    assert sum(memory.count_tokens(message.content) for message in history) <= memory.token_budget
+    assert history[-1].content.startswith("answer 5")
+    assert isinstance(history[-2], HumanMessage) and isinstance(history[-1], AIMessage)
+
+def test_short_conversation_is_not_compacted():
+    memory = memory_with_turns(1, token_budget=1000)
+    llm = SummaryLLM()
+    assert not memory.compact(llm)
+    assert llm.prompts == []
+
+def test_compact_folds_old_messages_into_summary():
+    memory = memory_with_turns(6)
+    llm = SummaryLLM()
+    assert memory.compact(llm)
+    assert "question 0" in llm.prompts[0]
+    assert "answer 5" not in llm.prompts[0]
+
+    history = memory.get_history()
+    assert isinstance(history[0], SystemMessage) and "summary 1" in history[0].content
+    # Summarized messages are dropped, only the newest ones are kept
+    assert memory.offset == memory.summarized_upto > 0
+    assert history[-1].content.startswith("answer 5")
+
+def test_compact_sends_only_new_messages():
+    memory = memory_with_turns(6)
+    llm = SummaryLLM()
+    memory.compact(llm)
+    for i in range(6, 12):
+        memory.save_context({"input": f"question {i} " + "word " * 10}, {"output": f"answer {i} " + "word " * 10})
+    memory.compact(llm)
+    assert "summary 1" in llm.prompts[1]
+    assert "question 0" not in llm.prompts[1]
+
+def test_failed_summary_keeps_messages():
+    memory = memory_with_turns(6)
+    messages = list(memory.messages)
+    assert not memory.compact(SummaryLLM(fail=True))
+    assert memory.messages == messages and memory.summary == ""
+
+def test_compaction_leaves_room_so_the_prompt_prefix_stays_stable():
+    memory = memory_with_turns(6, token_budget=100, compact_ratio=0.5)
+    llm = SummaryLLM()
+    assert memory.compact(llm)
+    assert sum(tokens for _, tokens in memory.messages) + memory.summary_tokens <= 50
+
+    # Until the budget is exceeded again, new turns only extend the history at the end
+    prefix = [message.content for message in memory.get_history()]
+    memory.save_context({"input": "next question"}, {"output": "next answer"})
+    assert not memory.compact(llm)
+    assert [message.content for message in memory.get_history()][:len(prefix)] == prefix
+    assert len(llm.prompts) == 1
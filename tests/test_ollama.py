@@ -0,0 +1,100 @@
+import pytest
+from utils.ollama_utils import OllamaMonitor
+
+class FakeResponse:
+    def __init__(self, payload=None, status=200):
+        self.payload = payload or {}
+        self.status = status
+
+    def raise_for_status(self):
+        if self.status >= 400:
+            raise RuntimeError(f"HTTP {self.status}")
+
+    def json(self):
+        return self.payload
+
+class FakeSession:
+    def __init__(self, models=None, down=False):
+        self.models = models or []
+        self.down = down
+        self.requests = []
+
+    def get(self, url, timeout=None):
+        self.requests.append(("GET", url, None))
+        if self.down:
+            raise ConnectionError("connection refused")
+        return FakeResponse({"models": [{"name": name} for name in self.models]})
+
+    def post(self, url, json=None, timeout=None):
+        self.requests.append(("POST", url, json))
+        if self.down:
+            raise ConnectionError("connection refused")
+        return FakeResponse()
+
+@pytest.fixture
+def monitor():
+    monitor = OllamaMonitor(base_url="http://ollama.test:11434/")
+    monitor._session = FakeSession(models=["mistral:latest", "llama3:8b"])
+    return monitor
+
+def test_status_is_unknown_before_the_first_check(monitor):
+    status = monitor.status()
+    assert status["running"] is None and status["models"] == []
+
+def test_check_caches_running_server_and_models(monitor):
+    monitor.check()
+    status = monitor.status()
+    assert status["running"] is True
+    assert status["models"] == ["llama3:8b", "mistral:latest"]
+    assert status["latency_ms"] is not None
+    assert monitor._session.requests == [("GET", "http://ollama.test:11434/api/tags", None)]
+
+def test_check_reports_unreachable_server(monitor):
+    monitor._session.down = True
+    monitor.check()
+    status = monitor.status()
+    assert status["running"] is False
+    assert "refused" in status["error"]
+
+def test_selected_model_is_loaded_once_and_kept_warm(monitor, monkeypatch):
+    monkeypatch.setenv("OLLAMA_KEEP_ALIVE", "1h")
+    monkeypatch.setenv("OLLAMA_NUM_CTX", "4096")
+    started = []
+
+    class RecordingThread:
+        def __init__(self, target, args, **kwargs):
+            self.args = args
+
+        def start(self):
+            started.append(self.args)
+
+    monkeypatch.setattr("utils.ollama_utils.threading.Thread", RecordingThread)
+
+    monitor.keep_warm("mistral:latest")
+    monitor.keep_warm("mistral:latest")
+    monitor._ping_warm_models()
+    # The ping is in flight, so the next health check does not send another one
+    monitor._ping_warm_models()
+    assert started == [("mistral:latest",)]
+    assert monitor.status()["warm"] == {"mistral:latest": "loading"}
+
+    monitor._ping_model("mistral:latest")
+    assert monitor._session.requests[-1] == ("POST", "http://ollama.test:11434/api/generate",
+                                             {"model": "mistral:latest", "keep_alive": "1h",
+                                              "options": {"num_ctx": 4096}})
+    assert monitor.status()["warm"] == {"mistral:latest": "ready"}
+    # Not due again until the keep-alive interval has passed
+    monitor._ping_warm_models()
+    assert len(started) == 1
+
+def test_failed_load_is_retried(monitor):
+    monitor._session.down = True
+    monitor.keep_warm("mistral:latest")
+    monitor._ping_model("mistral:latest")
+    assert monitor.status()["warm"] == {"mistral:latest": "error"}
+    assert monitor._warm["mistral:latest"]["last_ping"] == 0.0
+
+def test_selecting_another_model_replaces_the_warm_one(monitor):
+    monitor.keep_warm("mistral:latest")
+    monitor.keep_warm("llama3:8b")
+    assert list(monitor.status()["warm"]) == ["llama3:8b"]
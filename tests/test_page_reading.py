@@ -0,0 +1,67 @@
+from assistant import SearchTools
+from assistant.page_fetcher import PageFetcher
+
+def test_failure_messages_are_not_cached():
+    calls = []
+
+    def read(query):
+        calls.append(query)
+        if len(calls) == 1:
+            return "The result pages could not be read. Try Google Search instead."
+        return [{"title": "Qubits", "link": "https://example.org/q", "snippet": "A qubit is..."}]
+
+    cached = SearchTools.cached_search(read, namespace="test_pages")
+    assert isinstance(cached("what is a qubit"), str)
+    assert cached("what is a qubit")[0]["link"] == "https://example.org/q"
+    assert cached("what is a qubit")[0]["link"] == "https://example.org/q"
+    assert len(calls) == 2
+
+def test_top_results_are_read_and_ranked(fakes, monkeypatch):
+    pages = {}
+
+    def fetch_many(urls):
+        return [f"Quantum error correction protects qubits. Unrelated filler text about page {url}." for url in urls]
+
+    fetcher = SearchTools.get_page_fetcher()
+    monkeypatch.setattr(fetcher, "fetch_many", fetch_many)
+    passages = SearchTools.read_top_results("quantum error correction qubits")
+    assert isinstance(passages, list) and passages
+    assert [passage["rank"] for passage in passages] == list(range(1, len(passages) + 1))
+    assert all(passage["link"].startswith("https://example.org/") for passage in passages)
+
+class FakeResponse:
+    def __init__(self, body, content_type):
+        self.status_code = 200
+        self.headers = {"Content-Type": content_type}
+        # What requests assumes for text/* without a charset
+        self.encoding = "ISO-8859-1"
+        self.body = body
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def iter_content(self, chunk_size):
+        for start in range(0, len(self.body), chunk_size):
+            yield self.body[start:start + chunk_size]
+
+def fetch_page(monkeypatch, body, content_type):
+    fetcher = PageFetcher()
+    monkeypatch.setattr(fetcher.session, "get", lambda url, **kwargs: FakeResponse(body, content_type))
+    return fetcher.fetch("https://example.org/page")
+
+def test_pages_without_a_charset_are_read_as_utf8(monkeypatch):
+    body = "<html><body><p>The state |ψ⟩ — a superposition</p></body></html>".encode("utf-8")
+    assert fetch_page(monkeypatch, body, "text/html") == "The state |ψ⟩ — a superposition"
+
+def test_meta_charset_is_honoured(monkeypatch):
+    body = '<html><head><meta charset="iso-8859-1"></head><p>Schrödinger</p></html>'.encode("latin-1")
+    assert fetch_page(monkeypatch, body, "text/html") == "Schrödinger"
+
+def test_header_charset_wins_over_meta():
+    head = b'<meta http-equiv="Content-Type" content="text/html; charset=iso-8859-1">'
+    assert PageFetcher.detect_encoding("text/html; charset=UTF-8", head) == "utf-8"
+    assert PageFetcher.detect_encoding("text/html", head) == "iso8859-1"
+    assert PageFetcher.detect_encoding("text/html; charset=bogus", b"") == "utf-8"
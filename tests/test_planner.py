@@ -0,0 +1,20 @@
+from assistant import PlanExecuteAgent, ResearchAgent, ResourceRegistry, SearchTools
+
+def make_planner(max_queries=3):
+    return PlanExecuteAgent(llm=None, search_func=lambda query: [], max_queries=max_queries)
+
+def test_plan_parsing_strips_markers_and_duplicates():
+    planner = make_planner()
+    text = "1. qubit coherence\n- \"qubit coherence\"\n* ion trap fidelity\n\n2) superconducting qubits\nextra query"
+    assert planner.parse_plan(text, "question") == ["qubit coherence", "ion trap fidelity", "superconducting qubits"]
+
+def test_empty_plan_falls_back_to_the_question():
+    assert make_planner().parse_plan("\n  \n", "What is a qubit?") == ["What is a qubit?"]
+
+def test_planner_makes_two_llm_calls(fakes):
+    llm, search = fakes
+    planner = ResourceRegistry.get_planner("OpenAI", SearchTools.get_search_function())
+    answer = ResearchAgent.run_query(planner, "Compare ion traps and superconducting qubits")
+    assert answer and not answer.startswith("An error occurred")
+    assert llm.calls == 2
+    assert search.calls == llm.searches_per_query
@@ -0,0 +1,50 @@
+import pytest
+from benchmarks.fakes import FakeResearchLLM
+from assistant import LLMFactory, QueryClassifier, ResearchPipeline, ResourceRegistry
+from utils import MemoryManager
+
+@pytest.mark.parametrize("query", [
+    "hello!",
+    "What is a qubit?",
+    "Explain quantum entanglement",
+    "How does error correction work?",
+    "Calculate the eigenvalues of a rotation matrix",
+])
+def test_knowledge_questions_skip_search(query):
+    assert not QueryClassifier.needs_search(query)
+
+@pytest.mark.parametrize("query", [
+    "What is the latest quantum computing news?",
+    "What is Willow?",
+    "Who built the first quantum computer?",
+    "Quantum advantage results in 2024",
+    "Find papers on surface codes",
+    "Tell me about trapped ions",
+])
+def test_current_or_specific_questions_search(query):
+    assert QueryClassifier.needs_search(query)
+
+def test_classifier_answers_knowledge_questions_directly(fakes, monkeypatch):
+    llm, search = fakes
+    monkeypatch.setenv("SEARCH_CLASSIFIER", "1")
+    ResearchPipeline.generate("Explain quantum entanglement", "OpenAI", MemoryManager.initialize_memory())
+    assert search.calls == 0 and llm.calls == 1
+
+    ResearchPipeline.generate("What is the latest quantum computing news?", "OpenAI",
+                              MemoryManager.initialize_memory())
+    assert search.calls == llm.searches_per_query
+
+def test_role_models_are_parsed_from_the_environment(monkeypatch):
+    monkeypatch.setenv("SYNTHESIS_MODEL", "ollama:gemma3:4b")
+    assert LLMFactory.get_role_spec("reasoning") is None
+    assert LLMFactory.parse_model_spec(LLMFactory.get_role_spec("synthesis")) == ("Local (Ollama)", "gemma3:4b")
+    assert LLMFactory.parse_model_spec("unknown:model") == (None, "model")
+    assert LLMFactory.uses_ollama("OpenAI")
+
+def test_roles_use_their_configured_model_or_the_sessions(fakes, monkeypatch):
+    llm, _ = fakes
+    synthesis = FakeResearchLLM(latency=0)
+    ResourceRegistry.register(ResourceRegistry.llm_key("OpenAI", "gpt-4o"), synthesis)
+    monkeypatch.setenv("SYNTHESIS_MODEL", "openai:gpt-4o")
+    assert ResourceRegistry.get_role_llm("reasoning", "OpenAI") is llm
+    assert ResourceRegistry.get_role_llm("synthesis", "OpenAI") is synthesis
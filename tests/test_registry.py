@@ -0,0 +1,37 @@
+import threading
+from assistant import ResourceRegistry
+
+def test_resources_are_built_once_across_threads():
+    built = []
+
+    def factory():
+        built.append(1)
+        return object()
+
+    resources = []
+    threads = [threading.Thread(target=lambda: resources.append(ResourceRegistry.get_or_create(("thing",), factory)))
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(built) == 1
+    assert all(resource is resources[0] for resource in resources)
+
+def test_failed_builds_are_retried():
+    assert ResourceRegistry.get_or_create(("missing",), lambda: None) is None
+    assert ResourceRegistry.get_or_create(("missing",), lambda: "built") == "built"
+
+def test_llm_key_changes_with_the_api_key(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-one")
+    first = ResourceRegistry.llm_key("OpenAI")
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-two")
+    assert ResourceRegistry.llm_key("OpenAI") != first
+    assert "sk-two" not in str(ResourceRegistry.llm_key("OpenAI"))
+
+def test_agents_are_shared(fakes):
+    from assistant import SearchTools
+    tools = SearchTools.get_search_tools(True)
+    first = ResourceRegistry.get_agent("OpenAI", tools)
+    assert first is not None
+    assert ResourceRegistry.get_agent("OpenAI", tools) is first
@@ -0,0 +1,85 @@
+import time
+import threading
+import pytest
+from assistant.scheduler import AdmissionTimeout, RequestScheduler
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.005)
+
+def test_waiting_queries_are_admitted_round_robin_across_sessions():
+    scheduler = RequestScheduler(max_concurrent=1, timeout=5)
+    admitted = []
+    threads = []
+
+    def query(session, name):
+        with scheduler.admit(session):
+            admitted.append(name)
+
+    with scheduler.admit("holder"):
+        # One session floods the queue before another session's single query
+        for session, name in [("a", "a1"), ("a", "a2"), ("a", "a3"), ("b", "b1")]:
+            thread = threading.Thread(target=query, args=(session, name))
+            thread.start()
+            threads.append(thread)
+            wait_for(lambda: scheduler.waiting() == len(threads))
+    for thread in threads:
+        thread.join()
+
+    assert admitted == ["a1", "b1", "a2", "a3"]
+    assert scheduler.active == 0 and scheduler.waiting() == 0
+
+def test_queue_position_is_reported_and_timeout_frees_the_ticket():
+    scheduler = RequestScheduler(max_concurrent=1, timeout=0.1)
+    positions = []
+    with scheduler.admit("holder"):
+        with pytest.raises(AdmissionTimeout):
+            with scheduler.admit("other", on_wait=positions.append):
+                pass
+    assert positions == [1]
+    assert scheduler.waiting() == 0
+
+def test_token_bucket_limits_the_request_rate(monkeypatch):
+    monkeypatch.setenv("OPENAI_REQUESTS_PER_SECOND", "20")
+    monkeypatch.setenv("OPENAI_BURST", "1")
+    limiter = RequestScheduler.rate_limiter("openai")
+    assert RequestScheduler.rate_limiter("openai") is limiter
+
+    started = time.perf_counter()
+    for _ in range(4):
+        limiter.acquire()
+    assert time.perf_counter() - started >= 0.1
+
+def test_zero_rate_disables_the_limit(monkeypatch):
+    monkeypatch.setenv("GOOGLE_REQUESTS_PER_SECOND", "0")
+    assert RequestScheduler.rate_limiter("google") is None
+
+class RateLimited(Exception):
+    status_code = 429
+
+def test_rate_limited_calls_are_retried(monkeypatch):
+    monkeypatch.setattr(RequestScheduler, "BACKOFF_BASE", 0)
+    monkeypatch.setenv("BACKEND_MAX_RETRIES", "2")
+    calls = []
+
+    def flaky():
+        calls.append(1)
+        if len(calls) < 3:
+            raise RateLimited("too many requests")
+        return "ok"
+
+    assert RequestScheduler.limited("google", flaky)() == "ok"
+    assert len(calls) == 3
+
+def test_other_errors_are_not_retried():
+    calls = []
+
+    def broken():
+        calls.append(1)
+        raise ValueError("bad query")
+
+    with pytest.raises(ValueError):
+        RequestScheduler.limited("google", broken)()
+    assert len(calls) == 1
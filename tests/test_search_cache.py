@@ -0,0 +1,64 @@
+import time
+from utils.cache_utils import SearchCache
+
+def test_normalized_queries_share_an_entry():
+    cache = SearchCache(ttl=60)
+    cache.set("  What is a Qubit? ", ["result"])
+    assert cache.get("what is a qubit") == ["result"]
+    assert cache.get("what is a qubit", namespace="other") is None
+
+def test_entries_expire():
+    cache = SearchCache(ttl=0.05)
+    cache.set("query", "value")
+    time.sleep(0.1)
+    assert cache.get("query") is None
+
+def test_zero_ttl_disables_the_cache():
+    cache = SearchCache(ttl=0)
+    cache.set("query", "value")
+    assert cache.get("query") is None
+
+def test_memory_tier_evicts_least_recently_used():
+    cache = SearchCache(ttl=60, max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+
+def test_disk_tier_is_shared_between_instances(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    SearchCache(path=path, ttl=60).set("query", {"answer": 42})
+    other = SearchCache(path=path, ttl=60)
+    assert other.get("query") == {"answer": 42}
+    assert other.stats["disk_hits"] == 1
+
+def test_get_or_compute_computes_once():
+    cache = SearchCache(ttl=60)
+    calls = []
+    compute = lambda query: calls.append(query) or len(calls)
+    assert cache.get_or_compute("q", compute) == 1
+    assert cache.get_or_compute("q", compute) == 1
+    assert calls == ["q"]
+
+def _disk_rows(cache):
+    return cache._conn.execute("SELECT COUNT(*) FROM search_cache").fetchone()[0]
+
+def test_expired_rows_are_deleted_when_the_cache_opens(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    cache = SearchCache(path=path, ttl=0.05)
+    cache.set("old", "value")
+    time.sleep(0.1)
+    SearchCache(path=path, ttl=60).set("new", "value")
+    assert _disk_rows(cache) == 1
+
+def test_expired_rows_are_deleted_during_writes(tmp_path, monkeypatch):
+    monkeypatch.setattr(SearchCache, "PURGE_INTERVAL", 2)
+    cache = SearchCache(path=str(tmp_path / "cache.sqlite3"), ttl=0.05)
+    cache.set("a", 1)
+    time.sleep(0.1)
+    cache.ttl = 60
+    cache.set("b", 2)
+    assert _disk_rows(cache) == 1
+    assert cache.get("b") == 2
@@ -0,0 +1,63 @@
+import json
+import pytest
+from starlette.testclient import TestClient
+import server
+
+@pytest.fixture
+def client(fakes, monkeypatch):
+    monkeypatch.setattr(server, "sessions", server.SessionMemories())
+    return TestClient(server.app)
+
+def test_parse_chat_request_fills_defaults(monkeypatch):
+    monkeypatch.delenv("API_DEFAULT_PROVIDER", raising=False)
+    options, error = server.parse_chat_request({"query": " What is a qubit? "})
+    assert error is None
+    assert options["query"] == "What is a qubit?"
+    assert options["provider"] == "OpenAI" and options["agent_mode"] == "ReAct"
+    assert options["search"] and not options["stream"] and options["session_id"]
+
+@pytest.mark.parametrize("body, error", [
+    ({}, "'query' is required"),
+    ({"query": "q", "provider": "Other"}, "Unknown provider: Other"),
+    ({"query": "q", "agent_mode": "Tree"}, "Unknown agent_mode: Tree"),
+])
+def test_parse_chat_request_rejects_invalid_bodies(body, error):
+    assert server.parse_chat_request(body) == (None, error)
+
+def test_chat_answers_and_remembers_the_turn(client):
+    response = client.post("/v1/chat", json={"query": "Explain quantum entanglement", "session_id": "s1"})
+    assert response.status_code == 200
+    assert response.json()["answer"]
+    memory, _ = server.sessions.get("s1")
+    assert len(memory.messages) == 2
+
+def test_chat_streams_server_sent_events(client):
+    with client.stream("POST", "/v1/chat", json={"query": "What is a qubit?", "stream": True}) as response:
+        events = [json.loads(line[len("data: "):]) for line in response.iter_lines() if line.startswith("data: ")]
+    assert events[-1]["type"] == "final"
+    assert any(event["type"] == "action" for event in events)
+
+def test_failed_answers_are_not_remembered(client, monkeypatch):
+    monkeypatch.setattr(server.ResearchPipeline, "generate",
+                        lambda *args, **kwargs: "An error occurred: backend unavailable")
+    response = client.post("/v1/chat", json={"query": "What is a qubit?", "session_id": "s2"})
+    assert response.json()["answer"].startswith("An error occurred")
+    memory, _ = server.sessions.get("s2")
+    assert not memory.has_history()
+
+def test_bad_requests_are_rejected(client):
+    assert client.post("/v1/chat", content="not json").status_code == 400
+    assert client.post("/v1/chat", json={"query": ""}).status_code == 400
+
+def test_answers_run_in_the_bounded_pool(client):
+    client.post("/v1/chat", json={"query": "What is a qubit?"})
+    assert 0 < len(server.executor._threads) <= server.executor._max_workers
+
+def test_research_client_is_shared(monkeypatch):
+    from assistant import ResearchClient
+    monkeypatch.delenv("RESEARCH_API_URL", raising=False)
+    assert ResearchClient.from_env() is None
+    monkeypatch.setenv("RESEARCH_API_URL", "http://localhost:8000")
+    client = ResearchClient.from_env()
+    assert ResearchClient.from_env() is client
+    assert client.base_url == "http://localhost:8000"
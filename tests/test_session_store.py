@@ -0,0 +1,59 @@
+import pytest
+from types import SimpleNamespace
+from utils.memory_utils import TokenBudgetMemory
+from utils.session_store import InMemorySessionStore, SQLiteSessionStore, SessionStore
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "sqlite":
+        return SQLiteSessionStore(str(tmp_path / "sessions.sqlite3"))
+    return InMemorySessionStore()
+
+def test_base_class_is_abstract():
+    with pytest.raises(TypeError):
+        SessionStore()
+
+def test_unknown_url_is_rejected():
+    with pytest.raises(ValueError):
+        SessionStore.from_url("postgres://db/sessions")
+
+def test_messages_are_appended_and_loaded_in_order(store):
+    long_text = "entanglement " * 100
+    assert store.append("s", [("user", "q1", 1), ("assistant", long_text, 200)]) == 0
+    assert store.append("s", [("user", "q2", 1)]) == 2
+    assert store.count("s") == 3 and store.count("other") == 0
+    assert store.load("s") == [("user", "q1", 1), ("assistant", long_text, 200), ("user", "q2", 1)]
+    assert store.load("s", start=2) == [("user", "q2", 1)]
+    assert store.load("s", start=0, limit=1) == [("user", "q1", 1)]
+    assert store.load_before("s", 3, 2) == (1, store.load("s", start=1))
+
+def test_only_a_newer_summary_replaces_the_stored_one(store):
+    assert store.get_state("s") is None
+    store.set_state("s", {"summary": "newer", "summary_tokens": 2, "summarized_upto": 4})
+    store.set_state("s", {"summary": "older", "summary_tokens": 2, "summarized_upto": 2})
+    assert store.get_state("s") == {"summary": "newer", "summary_tokens": 2, "summarized_upto": 4}
+
+def test_delete_forgets_the_session(store):
+    store.append("s", [("user", "q", 1)])
+    assert store.delete("s")
+    assert store.load("s") == [] and store.get_state("s") is None
+    assert not store.delete("s")
+
+def test_inactive_sessions_expire(store):
+    store.append("s", [("user", "q", 1)])
+    store.ttl = -1
+    store.purge_expired()
+    assert store.count("s") == 0
+
+def test_memories_share_a_conversation_through_the_store(store):
+    first = TokenBudgetMemory(token_budget=15, store=store, session_id="s")
+    second = TokenBudgetMemory(token_budget=15, store=store, session_id="s")
+    first.save_context({"input": "question " + "word " * 10}, {"output": "answer " + "word " * 10})
+    second.sync()
+    assert [message.content for message, _ in second.messages] == [message.content for message, _ in first.messages]
+
+    # A summary written by one process drops the summarized messages in the other
+    assert first.compact(SimpleNamespace(invoke=lambda messages: SimpleNamespace(content="summary")))
+    second.sync()
+    assert second.summary == "summary"
+    assert second.offset == first.offset == first.summarized_upto
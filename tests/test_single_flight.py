@@ -0,0 +1,87 @@
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from utils import SingleFlight
+
+def test_concurrent_identical_calls_share_one_request():
+    flights = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def request():
+        calls.append(1)
+        release.wait(2)
+        return "result"
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        futures = [executor.submit(flights.do, "q", request) for _ in range(4)]
+        while flights.stats["coalesced"] < 3:
+            time.sleep(0.005)
+        release.set()
+        results = [future.result() for future in futures]
+
+    assert len(calls) == 1
+    assert sorted(shared for _, shared in results) == [False, True, True, True]
+    assert {result for result, _ in results} == {"result"}
+
+def test_sequential_calls_are_not_cached():
+    flights = SingleFlight()
+    assert flights.do("q", lambda: 1) == (1, False)
+    assert flights.do("q", lambda: 2) == (2, False)
+    assert flights.stats == {"calls": 2, "coalesced": 0}
+
+def test_errors_reach_every_caller_and_are_not_kept():
+    flights = SingleFlight()
+
+    def broken():
+        raise RuntimeError("backend down")
+
+    with pytest.raises(RuntimeError):
+        flights.do("q", broken)
+    assert flights.do("q", lambda: "recovered") == ("recovered", False)
+
+def test_call_and_stream_with_the_same_key_run_separately():
+    flights = SingleFlight()
+    release = threading.Event()
+
+    def request():
+        release.wait(2)
+        return "result"
+
+    def stream():
+        release.wait(2)
+        yield "a"
+        yield "b"
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        called = executor.submit(flights.do, "q", request)
+        streamed = executor.submit(lambda: list(flights.stream("q", stream)))
+        while flights.stats["calls"] + flights.stats["coalesced"] < 2:
+            time.sleep(0.005)
+        release.set()
+        assert flights.stats == {"calls": 2, "coalesced": 0}
+        assert called.result(timeout=2) == ("result", False)
+        assert streamed.result(timeout=2) == ["a", "b"]
+
+def test_streams_are_replayed_to_late_joiners():
+    flights = SingleFlight()
+    first_chunk = threading.Event()
+    release = threading.Event()
+
+    def produce():
+        yield "a"
+        first_chunk.set()
+        release.wait(2)
+        yield "b"
+
+    leader = flights.stream("q", produce)
+    assert next(leader) == "a"
+    first_chunk.wait(2)
+    follower = flights.stream("q", lambda: iter(["unused"]))
+    # Join while the request is still in flight
+    assert next(follower) == "a"
+    release.set()
+    assert list(follower) == ["b"]
+    assert list(leader) == ["b"]
+    assert flights.stats == {"calls": 1, "coalesced": 1}
@@ -0,0 +1,48 @@
+from assistant import ResearchPipeline
+from assistant.answer_cache import SemanticAnswerCache
+from assistant.sources import SourceTracker
+
+RESULTS = [
+    {"title": "Qubits", "link": "https://example.org/qubits", "snippet": "A qubit is the basic unit of quantum information."},
+    {"title": "Gates", "link": "https://example.org/gates", "snippet": "Quantum gates act on one or more qubits at once."},
+]
+
+def test_sources_get_stable_ids_and_repeats_are_dropped():
+    tracker = SourceTracker()
+    first = tracker.format_observation(RESULTS)
+    assert first.startswith("[1] Qubits (https://example.org/qubits)")
+    assert "[2] Gates" in first
+
+    mirror = {"title": "Mirror", "link": "https://mirror.org/q", "snippet": RESULTS[0]["snippet"]}
+    new = {"title": "Ions", "link": "https://example.org/ions", "snippet": "Trapped ions are held in electric fields."}
+    second = tracker.format_observation([RESULTS[1], mirror, new])
+    # Seen URLs and copied snippets are left out; new results continue the numbering
+    assert "Mirror" not in second
+    assert "[3] Ions" in second
+    assert second.endswith("Already seen: [2]")
+    assert tracker.format_observation(RESULTS) == "Already seen: [1], [2]"
+    assert tracker.format_observation([mirror]) == "No new results."
+
+def test_cite_lists_only_cited_sources():
+    tracker = SourceTracker()
+    tracker.format_observation(RESULTS)
+    answer = tracker.cite("Qubits hold quantum information [1].")
+    assert answer.endswith("**Sources:**\n- [1] Qubits - https://example.org/qubits")
+    assert "gates" not in answer
+    assert tracker.cite("No citations here.") == "No citations here."
+    assert tracker.cite("An error occurred: [1]") == "An error occurred: [1]"
+
+def test_cached_answer_lists_its_sources_once():
+    tracker = SourceTracker()
+    tracker.format_observation(RESULTS)
+    answer = tracker.cite("Qubits hold quantum information [1].")
+    cached = {"answer": answer, "sources": SemanticAnswerCache.extract_sources(answer), "query": "what is a qubit",
+              "created_at": 0}
+    formatted = ResearchPipeline.format_cached_answer(cached)
+    assert formatted.count("**Sources:**") == 1
+    assert formatted.count("https://example.org/qubits") == 1
+
+def test_cached_answer_without_a_source_list_gets_one():
+    cached = {"answer": "See https://example.org/a for details.", "sources": ["https://example.org/a"],
+              "query": "q", "created_at": 0}
+    assert "**Sources:** https://example.org/a" in ResearchPipeline.format_cached_answer(cached)
@@ -0,0 +1,25 @@
+import sys
+import subprocess
+import pytest
+from benchmarks import startup_profile
+
+LAZY_MODULES = ("langchain_openai", "langchain_google_community", "langchain_ollama", "langchain.agents")
+
+@pytest.mark.parametrize("entry", ["main", "server"])
+def test_provider_integrations_are_not_imported_at_startup(entry):
+    # A fresh interpreter, since this test process may already have imported them
+    result = subprocess.run(
+        [sys.executable, "-c", f"import sys, {entry}; print([m for m in {LAZY_MODULES!r} if m in sys.modules])"],
+        cwd=startup_profile.REPO_ROOT, capture_output=True, text=True, timeout=120
+    )
+    assert result.returncode == 0, result.stderr[-2000:]
+    assert result.stdout.strip().splitlines()[-1] == "[]"
+
+def test_summarize_totals_self_time_per_package():
+    modules = [("json.decoder", 100, 100), ("json", 50, 150), ("assistant.registry", 300, 300),
+               ("assistant", 20, 320), ("json", 5, 5)]
+    report = startup_profile.summarize(modules, top=2)
+    assert report["total_s"] == pytest.approx(475 / 1e6)
+    assert [module["module"] for module in report["modules"]] == ["assistant", "assistant.registry"]
+    assert report["packages"][0] == {"package": "assistant", "self_s": 320 / 1e6}
+    assert report["packages"][1] == {"package": "json", "self_s": 155 / 1e6}
@@ -0,0 +1,21 @@
+from assistant import ResearchAgent, ResourceRegistry, SearchTools
+
+def test_direct_answer_streams_tokens_then_final(fakes):
+    llm, _ = fakes
+    events = list(ResearchAgent.stream_query(llm, "What is a qubit?"))
+    tokens = "".join(event["content"] for event in events if event["type"] == "token")
+    assert events[-1]["type"] == "final"
+    assert tokens and events[-1]["content"] == tokens
+
+def test_agent_streams_actions_observations_and_answer(fakes):
+    llm, _ = fakes
+    agent = ResourceRegistry.get_agent("OpenAI", SearchTools.get_search_tools(True))
+    events = list(ResearchAgent.stream_query(agent, "What is a qubit?"))
+    kinds = [event["type"] for event in events]
+    assert kinds.count("action") == llm.searches_per_query
+    assert kinds.count("observation") == llm.searches_per_query
+    assert kinds[-1] == "final"
+    # Only the text after "Final Answer:" is streamed as tokens
+    tokens = "".join(event["content"] for event in events if event["type"] == "token")
+    assert tokens.strip() == events[-1]["content"].strip()
+    assert "Thought:" not in tokens
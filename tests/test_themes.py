@@ -0,0 +1,41 @@
+import pytest
+from components.themes import ThemeManager
+from utils import MemoryManager
+from utils.session_store import SessionStore
+
+def test_minify_css_removes_comments_and_whitespace():
+    css = """
+    /* header */
+    .a > .b ,  .c {
+        color : red ;
+        margin: 0 auto;
+    }
+    """
+    assert ThemeManager.minify_css(css) == ".a>.b,.c{color : red;margin: 0 auto}"
+
+def test_minify_css_keeps_quoted_strings():
+    css = """.icon { background: url("data:image/svg+xml;utf8,<svg  a='1'> /* x */ </svg>"); }"""
+    assert '"data:image/svg+xml;utf8,<svg  a=\'1\'> /* x */ </svg>"' in ThemeManager.minify_css(css)
+
+@pytest.mark.parametrize("theme", ThemeManager.THEMES)
+def test_stylesheet_is_built_once_per_theme(theme):
+    stylesheet = ThemeManager.build_stylesheet(theme)
+    assert stylesheet.startswith("<style>") and stylesheet.count("<style>") == 1
+    assert ThemeManager.get_theme_color(theme) in stylesheet
+    assert ThemeManager.build_stylesheet(theme) is stylesheet
+
+def test_transcript_pages_end_at_the_newest_message(monkeypatch):
+    monkeypatch.setenv("SESSION_STORE_URL", "memory://")
+    monkeypatch.setattr(SessionStore, "_shared", None)
+    monkeypatch.setattr(SessionStore, "_shared_loaded", False)
+    store = SessionStore.shared()
+    store.append("s", [("user" if i % 2 == 0 else "assistant", f"message {i}", 1) for i in range(5)])
+
+    start, messages = MemoryManager.load_transcript("s", limit=2)
+    assert start == 3
+    assert messages == [{"role": "assistant", "content": "message 3"}, {"role": "user", "content": "message 4"}]
+    assert MemoryManager.load_transcript("s", end=start, limit=10) == (0, [
+        {"role": "user", "content": "message 0"},
+        {"role": "assistant", "content": "message 1"},
+        {"role": "user", "content": "message 2"}
+    ])
@@ -0,0 +1,62 @@
+import json
+import time
+from utils.tracing import QueryTrace, Tracer
+
+def slow_events():
+    for word in ("quantum ", "answer"):
+        time.sleep(0.02)
+        yield {"type": "token", "content": word}
+
+def test_streamed_span_ends_when_the_stream_is_read():
+    trace = QueryTrace("q")
+    with trace.activated():
+        events = Tracer.span_stream("generate_response", slow_events)
+    assert trace.spans == []
+
+    assert [event["content"] for event in events] == ["quantum ", "answer"]
+    assert [span["name"] for span in trace.spans] == ["generate_response"]
+    assert trace.spans[0]["duration_s"] >= 0.04
+
+def test_span_stream_times_plain_answers_at_once():
+    trace = QueryTrace("q")
+    with trace.activated():
+        assert Tracer.span_stream("generate_response", lambda: "done") == "done"
+    assert len(trace.spans) == 1
+
+def test_traces_are_not_written_without_trace_path(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv("TRACE_PATH")
+    Tracer.export(QueryTrace("private question").finish())
+    assert list(tmp_path.iterdir()) == []
+
+def test_trace_file_is_rotated(tmp_path, monkeypatch):
+    path = tmp_path / "traces.jsonl"
+    monkeypatch.setenv("TRACE_PATH", str(path))
+    monkeypatch.setenv("TRACE_MAX_BYTES", "200")
+    for i in range(5):
+        Tracer.export(QueryTrace(f"question {i}").finish())
+
+    assert path.stat().st_size < 200 * 2
+    rotated = tmp_path / "traces.jsonl.1"
+    assert rotated.exists()
+    last = [json.loads(line)["query"] for line in path.read_text().splitlines()][-1]
+    assert last == "question 4"
+
+def test_prompt_cache_usage_of_openai_and_ollama():
+    from langchain_core.messages import AIMessage
+    from langchain_core.outputs import ChatGeneration, LLMResult
+    from utils.tracing import TracingCallbackHandler
+
+    openai = LLMResult(generations=[[ChatGeneration(message=AIMessage(content="a"))]], llm_output={
+        "token_usage": {"prompt_tokens": 1200, "completion_tokens": 10,
+                        "prompt_tokens_details": {"cached_tokens": 1024}}})
+    assert TracingCallbackHandler.prompt_cache_usage(openai) == (1024, 0)
+
+    ollama_message = AIMessage(content="a", response_metadata={"prompt_eval_duration": 35_000_000})
+    ollama = LLMResult(generations=[[ChatGeneration(message=ollama_message)]])
+    assert TracingCallbackHandler.prompt_cache_usage(ollama) == (0, 35)
+
+    usage_metadata = AIMessage(content="a", usage_metadata={"input_tokens": 10, "output_tokens": 1, "total_tokens": 11,
+                                                          "input_token_details": {"cache_read": 8}})
+    assert TracingCallbackHandler.prompt_cache_usage(
+        LLMResult(generations=[[ChatGeneration(message=usage_metadata)]])) == (8, 0)
@@ -1,4 +1,9 @@
-from .ollama_utils import OllamaManager, get_ollama_class
-from .memory_utils import MemoryManager
+from .ollama_utils import OllamaManager, OllamaMonitor, get_ollama_class
+from .memory_utils import MemoryManager, TokenBudgetMemory
+from .session_store import SessionStore, InMemorySessionStore, SQLiteSessionStore, RedisSessionStore
+from .cache_utils import SearchCache, SingleFlight
+from .tracing import QueryTrace, Tracer, TracingCallbackHandler
 
-__all__ = ['OllamaManager', 'get_ollama_class', 'MemoryManager']
\ No newline at end of file
+__all__ = ['OllamaManager', 'OllamaMonitor', 'get_ollama_class', 'MemoryManager', 'TokenBudgetMemory',
+           'SessionStore', 'InMemorySessionStore', 'SQLiteSessionStore', 'RedisSessionStore',
+           'SearchCache', 'SingleFlight', 'QueryTrace', 'Tracer', 'TracingCallbackHandler']
\ No newline at end of file
@@ -0,0 +1,349 @@
+import os
+import re
+import json
+import time
+import sqlite3
+import threading
+import contextvars
+from collections import OrderedDict
+from concurrent.futures import Future
+
+class SearchCache:
+    """Two-tier cache for search results: an in-memory LRU in front of a SQLite store
+
+    The SQLite tier lives on disk so results are shared between Streamlit sessions
+    and between processes running the app.
+    """
+
+    DEFAULT_PATH = os.path.join(".cache", "search_cache.sqlite3")
+    DEFAULT_TTL = 24 * 60 * 60
+    DEFAULT_MAX_ENTRIES = 512
+    # Expired rows are deleted when the cache opens and after every this many writes
+    PURGE_INTERVAL = 256
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, path=None, ttl=None, max_entries=None):
+        """Create a cache
+
+        Args:
+            path: SQLite file for the persistent tier, or None to keep results in memory only
+            ttl: Seconds a cached result stays valid (0 disables caching)
+            max_entries: Maximum number of entries held in the in-memory LRU
+        """
+        self.path = path
+        self.ttl = self.DEFAULT_TTL if ttl is None else ttl
+        self.max_entries = self.DEFAULT_MAX_ENTRIES if max_entries is None else max_entries
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+        self._writes = 0
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+
+        if path:
+            self._conn = self._open_database(path)
+            self.purge_expired()
+
+    @classmethod
+    def shared(cls):
+        """Return the process-wide cache configured from environment variables
+
+        Environment:
+            SEARCH_CACHE_PATH: SQLite file ("" keeps the cache in memory only)
+            SEARCH_CACHE_TTL: Time to live in seconds
+            SEARCH_CACHE_SIZE: In-memory LRU capacity
+        """
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls(
+                    path=os.getenv("SEARCH_CACHE_PATH", cls.DEFAULT_PATH),
+                    ttl=int(os.getenv("SEARCH_CACHE_TTL", cls.DEFAULT_TTL)),
+                    max_entries=int(os.getenv("SEARCH_CACHE_SIZE", cls.DEFAULT_MAX_ENTRIES))
+                )
+            return cls._shared
+
+    @staticmethod
+    def normalize_query(query):
+        """Normalize a query so trivially different spellings share a cache entry
+
+        Args:
+            query: Raw query string
+
+        Returns:
+            Lower-cased query with collapsed whitespace and without surrounding
+            quotes or trailing punctuation
+        """
+        normalized = " ".join(str(query).lower().split())
+        normalized = normalized.strip("\"'` ")
+        return re.sub(r"[\s?.!,;:]+$", "", normalized)
+
+    def get(self, query, namespace="search"):
+        """Look up a cached value
+
+        Args:
+            query: The query string
+            namespace: Separates results of different search functions
+
+        Returns:
+            The cached value or None on a miss
+        """
+        if not self.ttl:
+            return None
+
+        key = self._make_key(query, namespace)
+        now = time.time()
+
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._memory.move_to_end(key)
+                    self.stats["memory_hits"] += 1
+                    return entry[1]
+                del self._memory[key]
+
+            if self._conn is not None:
+                row = self._conn.execute(
+                    "SELECT value, expires_at FROM search_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None and row[1] > now:
+                    value = json.loads(row[0])
+                    self._remember(key, value, row[1])
+                    self.stats["disk_hits"] += 1
+                    return value
+
+            self.stats["misses"] += 1
+            return None
+
+    def set(self, query, value, namespace="search"):
+        """Store a value in both cache tiers
+
+        Args:
+            query: The query string
+            value: JSON-serializable result to cache
+            namespace: Separates results of different search functions
+        """
+        if not self.ttl:
+            return
+
+        key = self._make_key(query, namespace)
+        expires_at = time.time() + self.ttl
+
+        with self._lock:
+            self._remember(key, value, expires_at)
+            if self._conn is not None:
+                try:
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO search_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                        (key, json.dumps(value), expires_at)
+                    )
+                    self._conn.commit()
+                except sqlite3.Error:
+                    # The persistent tier is best effort; the memory tier still holds the value
+                    pass
+                self._writes += 1
+                purge = self._writes % self.PURGE_INTERVAL == 0
+            else:
+                purge = False
+
+        if purge:
+            self.purge_expired()
+
+    def get_or_compute(self, query, compute, namespace="search", cache_if=None):
+        """Return the cached value for a query, computing and storing it on a miss
+
+        Args:
+            query: The query string
+            compute: Callable taking the query and returning the value
+            namespace: Separates results of different search functions
+            cache_if: Optional predicate; computed values it rejects (such as error
+                messages) are returned without being stored
+
+        Returns:
+            The cached or freshly computed value
+        """
+        value = self.get(query, namespace)
+        if value is None:
+            value = compute(query)
+            if cache_if is None or cache_if(value):
+                self.set(query, value, namespace)
+        return value
+
+    def clear(self):
+        """Remove every entry from both tiers and reset the counters"""
+        with self._lock:
+            self._memory.clear()
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM search_cache")
+                self._conn.commit()
+            self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+
+    def purge_expired(self):
+        """Delete expired rows from the persistent tier
+
+        Called when the cache opens and every PURGE_INTERVAL writes.
+
+        Returns:
+            Number of rows deleted
+        """
+        if self._conn is None:
+            return 0
+        with self._lock:
+            try:
+                deleted = self._conn.execute(
+                    "DELETE FROM search_cache WHERE expires_at <= ?", (time.time(),)
+                ).rowcount
+                self._conn.commit()
+            except sqlite3.Error:
+                # Another process may hold the write lock; the next purge retries
+                return 0
+            return deleted
+
+    def hit_rate(self):
+        """Return the fraction of lookups served from either tier"""
+        hits = self.stats["memory_hits"] + self.stats["disk_hits"]
+        total = hits + self.stats["misses"]
+        return hits / total if total else 0.0
+
+    def _make_key(self, query, namespace):
+        return f"{namespace}:{self.normalize_query(query)}"
+
+    def _remember(self, key, value, expires_at):
+        self._memory[key] = (expires_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    @staticmethod
+    def _open_database(path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        conn = sqlite3.connect(path, timeout=5, check_same_thread=False)
+        # WAL lets several app processes read while one of them writes
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS search_cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        conn.commit()
+        return conn
+
+class SingleFlight:
+    """Coalesces concurrent identical requests into one call to the backend
+
+    The first caller for a key runs the request; callers arriving while it is in
+    flight wait for it and receive the same result (or exception). Nothing is kept
+    after the call completes, so this complements rather than replaces caching.
+    Calls through do and stream never share a flight, even with the same key.
+    """
+
+    _groups = {}
+    _groups_lock = threading.Lock()
+
+    def __init__(self):
+        self._flights = {}
+        self._lock = threading.Lock()
+        self.stats = {"calls": 0, "coalesced": 0}
+
+    @classmethod
+    def shared(cls, name):
+        """Return the process-wide group for a kind of request (e.g. "search", "llm")"""
+        with cls._groups_lock:
+            if name not in cls._groups:
+                cls._groups[name] = cls()
+            return cls._groups[name]
+
+    def do(self, key, func):
+        """Run func once for all concurrent callers with the same key
+
+        Args:
+            key: Hashable identifier of the request
+            func: Callable without arguments performing the request
+
+        Returns:
+            Tuple of (result, shared) where shared is True if the result came from
+            another caller's request
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = Future()
+                self.stats["calls"] += 1
+            else:
+                self.stats["coalesced"] += 1
+
+        if not leader:
+            return flight.result(), True
+
+        try:
+            flight.set_result(func())
+        except BaseException as e:
+            flight.set_exception(e)
+        finally:
+            with self._lock:
+                del self._flights[key]
+        return flight.result(), False
+
+    def stream(self, key, func):
+        """Share one streamed request between all concurrent callers with the same key
+
+        The stream is consumed in a background thread into a buffer that every caller
+        replays from the start, so a caller that stops reading does not stall the others.
+
+        Args:
+            key: Hashable identifier of the request
+            func: Callable without arguments returning an iterator of chunks
+
+        Yields:
+            The chunks of the shared stream
+        """
+        # Kept apart from the futures of do, which may use the same key
+        key = ("stream", key)
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is None:
+                flight = self._flights[key] = {"chunks": [], "done": False, "error": None,
+                                               "condition": threading.Condition()}
+                self.stats["calls"] += 1
+                # Run the producer in the caller's context so it keeps its trace
+                context = contextvars.copy_context()
+                threading.Thread(target=context.run, args=(self._produce, key, flight, func), daemon=True).start()
+            else:
+                self.stats["coalesced"] += 1
+
+        index = 0
+        condition = flight["condition"]
+        while True:
+            with condition:
+                while index >= len(flight["chunks"]) and not flight["done"]:
+                    condition.wait()
+                chunks = flight["chunks"][index:]
+                done = flight["done"]
+            for chunk in chunks:
+                yield chunk
+            index += len(chunks)
+            if done and index >= len(flight["chunks"]):
+                if flight["error"] is not None:
+                    raise flight["error"]
+                return
+
+    def _produce(self, key, flight, func):
+        condition = flight["condition"]
+        try:
+            for chunk in func():
+                with condition:
+                    flight["chunks"].append(chunk)
+                    condition.notify_all()
+        except Exception as e:
+            flight["error"] = e
+        finally:
+            # Later callers start a new request instead of replaying a finished one
+            with self._lock:
+                self._flights.pop(key, None)
+            with condition:
+                flight["done"] = True
+                condition.notify_all()
@@ -1,13 +1,267 @@
-from langchain.memory import ConversationBufferWindowMemory
+import os
+from functools import lru_cache
 from langchain_core.messages import SystemMessage, HumanMessage, AIMessage
+from .session_store import SessionStore
+
+class TokenBudgetMemory:
+    """Conversation memory that fits the history into a token budget
+    
+    Every message is stored once as a LangChain message together with its token
+    count. The history handed to the model is the longest run of recent messages
+    that fits the budget, preceded by a rolling summary of everything older. The
+    summary is updated incrementally: compact() only folds in messages that left
+    the window since the previous update, and summarized messages are dropped.
+    Each update folds enough messages to bring the history down to compact_ratio of
+    the budget, so between updates the history only grows at the end and the
+    prompt prefix stays the same from one turn to the next (see compact).
+    
+    With a SessionStore the memory is shared between processes: every message is
+    appended to the store and sync() fetches only what other processes added since,
+    so reading and writing a turn costs the same however long the conversation is.
+    """
+    
+    SUMMARY_PROMPT = """Progressively summarize the conversation, adding the new lines to the existing summary.
+Keep names, numbers, conclusions and open questions. Return only the updated summary in at most {max_words} words.
+
+Existing summary:
+{summary}
+
+New lines:
+{lines}"""
+    
+    DEFAULT_COMPACT_RATIO = 0.5
+    
+    def __init__(self, token_budget=2000, summary_budget=300, memory_key="chat_history", store=None, session_id=None,
+                 compact_ratio=None):
+        """Create an empty memory
+        
+        Args:
+            token_budget: Maximum tokens of history (summary included) returned by get_history
+            summary_budget: Approximate maximum tokens of the rolling summary
+            memory_key: Variable name used by load_memory_variables
+            store: Optional SessionStore persisting the conversation
+            session_id: Session the conversation is stored under (required with a store)
+            compact_ratio: Fraction of the budget the history is reduced to when it is
+                compacted (defaults to MEMORY_COMPACT_RATIO)
+        """
+        self.token_budget = token_budget
+        self.summary_budget = summary_budget
+        self.memory_key = memory_key
+        self.store = store
+        self.session_id = session_id
+        self.compact_ratio = compact_ratio or float(os.getenv("MEMORY_COMPACT_RATIO", self.DEFAULT_COMPACT_RATIO))
+        # Loaded messages; messages[0] is message number `offset` of the conversation
+        self.messages = []
+        self.offset = 0
+        self.summary = ""
+        self.summary_tokens = 0
+        self.summarized_upto = 0
+    
+    @staticmethod
+    def count_tokens(text):
+        """Count the tokens of a text (tiktoken when installed, otherwise an estimate)"""
+        encoder = _get_token_encoder()
+        if encoder is not None:
+            return len(encoder.encode(text, disallowed_special=()))
+        return len(text) // 4 + 1
+    
+    def add_user_message(self, content):
+        """Append a user message"""
+        self._append([("user", content)])
+    
+    def add_ai_message(self, content):
+        """Append an assistant message"""
+        self._append([("assistant", content)])
+    
+    def save_context(self, inputs, outputs):
+        """Store one exchange (LangChain memory interface)
+        
+        Both messages are appended together, so they stay adjacent in a store
+        written by several processes.
+        """
+        self._append([("user", next(iter(inputs.values()))), ("assistant", next(iter(outputs.values())))])
+    
+    def _append(self, entries):
+        entries = [(role, content, self.count_tokens(content)) for role, content in entries]
+        if self.store is None:
+            self.messages.extend((self._to_message(role, content), tokens) for role, content, tokens in entries)
+            return
+        self.store.append(self.session_id, entries)
+        # Fetch our messages back in stored order, along with any written concurrently
+        self.sync()
+    
+    @staticmethod
+    def _to_message(role, content):
+        return HumanMessage(content=content) if role == "user" else AIMessage(content=content)
+    
+    def sync(self):
+        """Catch up with messages and summary updates stored by other processes
+        
+        Only messages after the ones already loaded are fetched; messages covered
+        by a newer summary are dropped instead of loaded.
+        """
+        if self.store is None:
+            return
+        state = self.store.get_state(self.session_id)
+        if state and state["summarized_upto"] > self.summarized_upto:
+            self.summary = state["summary"]
+            self.summary_tokens = state["summary_tokens"]
+            self.summarized_upto = state["summarized_upto"]
+            self._drop_summarized()
+        
+        loaded = self.offset + len(self.messages)
+        self.messages.extend(
+            (self._to_message(role, content), tokens)
+            for role, content, tokens in self.store.load(self.session_id, start=loaded)
+        )
+    
+    def _drop_summarized(self):
+        drop = self.summarized_upto - self.offset
+        if drop > 0:
+            del self.messages[:drop]
+            self.offset = self.summarized_upto
+    
+    def has_history(self):
+        """Whether there is any earlier conversation (messages or a summary)"""
+        return bool(self.messages or self.summary)
+    
+    def load_memory_variables(self, inputs=None):
+        """Return the budgeted history (LangChain memory interface)"""
+        return {self.memory_key: self.get_history()}
+    
+    def clear(self):
+        """Forget all messages and the summary, including the stored conversation"""
+        if self.store is not None:
+            self.store.delete(self.session_id)
+        self.messages = []
+        self.offset = 0
+        self.summary = ""
+        self.summary_tokens = 0
+        self.summarized_upto = 0
+    
+    def window_start(self, token_budget=None):
+        """Index in self.messages of the oldest message that still fits the budget next to the summary"""
+        remaining = (token_budget or self.token_budget) - self.summary_tokens
+        start = len(self.messages)
+        while start > 0 and self.messages[start - 1][1] <= remaining:
+            start -= 1
+            remaining -= self.messages[start][1]
+        return start
+    
+    def get_history(self, token_budget=None):
+        """Assemble the history that fits the token budget
+        
+        Args:
+            token_budget: Overrides the memory's budget for this call
+            
+        Returns:
+            List of LangChain messages, starting with the summary when there is one
+        """
+        history = []
+        if self.summary:
+            history.append(SystemMessage(content=f"Summary of the earlier conversation: {self.summary}"))
+        history.extend(message for message, _ in self.messages[self.window_start(token_budget):])
+        return history
+    
+    def compact(self, llm):
+        """Fold messages that no longer fit the budget into the rolling summary
+        
+        Only messages that left the window since the last call are sent to the
+        model, together with the current summary. Once the history exceeds the
+        budget, messages are folded until the rest fits compact_ratio of it: a window
+        sliding by one exchange per turn would change the start of every prompt and
+        defeat the prompt caches of OpenAI and Ollama. Call this after an answer has
+        been shown so the extra LLM call stays off the response path.
+        
+        Args:
+            llm: Chat model used to update the summary
+            
+        Returns:
+            True if the summary was updated
+        """
+        if self.window_start() == 0:
+            return False
+        start = self.window_start(max(1, int(self.token_budget * self.compact_ratio)))
+        
+        lines = "\n".join(
+            f"{'User' if isinstance(message, HumanMessage) else 'Assistant'}: {message.content}"
+            for message, _ in self.messages[:start]
+        )
+        prompt = self.SUMMARY_PROMPT.format(
+            max_words=max(20, int(self.summary_budget * 0.75)),
+            summary=self.summary or "(none)",
+            lines=lines
+        )
+        try:
+            summary = llm.invoke([HumanMessage(content=prompt)]).content.strip()
+        except Exception:
+            # Keep the old summary; the same messages are retried on the next call
+            return False
+        
+        self.summary = summary
+        self.summary_tokens = self.count_tokens(summary)
+        self.summarized_upto = self.offset + start
+        self._drop_summarized()
+        if self.store is not None:
+            self.store.set_state(self.session_id, {"summary": self.summary, "summary_tokens": self.summary_tokens,
+                                                   "summarized_upto": self.summarized_upto})
+        return True
+
+@lru_cache(maxsize=1)
+def _get_token_encoder():
+    try:
+        import tiktoken
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        return None
 
 class MemoryManager:
     """Memory management utilities for conversation history"""
     
+    DEFAULT_TOKEN_BUDGET = 2000
+    
+    DEFAULT_TRANSCRIPT_PAGE = 50
+    
+    @staticmethod
+    def initialize_memory(session_id=None):
+        """Initialize a memory instance
+        
+        The history budget is read from MEMORY_TOKEN_BUDGET. With a session_id the
+        memory is kept in the shared SessionStore (SESSION_STORE_URL) and loaded
+        from it, so the conversation survives restarts and can be continued by any
+        app process.
+        
+        Args:
+            session_id: Optional session to store the conversation under
+        """
+        token_budget = int(os.getenv("MEMORY_TOKEN_BUDGET", MemoryManager.DEFAULT_TOKEN_BUDGET))
+        store = SessionStore.shared() if session_id else None
+        memory = TokenBudgetMemory(token_budget=token_budget, summary_budget=max(50, token_budget // 6),
+                                   store=store, session_id=session_id)
+        memory.sync()
+        return memory
+    
     @staticmethod
-    def initialize_memory():
-        """Initialize a new memory instance"""
-        return ConversationBufferWindowMemory(memory_key="chat_history", k=5, return_messages=True)
+    def load_transcript(session_id, end=None, limit=None):
+        """Load a page of stored chat messages for display, ending at the newest
+        
+        Args:
+            session_id: The session
+            end: Load messages before this position (defaults to the end of the conversation)
+            limit: Maximum number of messages to load (defaults to TRANSCRIPT_PAGE_SIZE)
+            
+        Returns:
+            Tuple of (position of the first loaded message, list of message dictionaries
+            as kept in st.session_state.messages)
+        """
+        store = SessionStore.shared()
+        if store is None:
+            return 0, []
+        limit = limit or int(os.getenv("TRANSCRIPT_PAGE_SIZE", MemoryManager.DEFAULT_TRANSCRIPT_PAGE))
+        if end is None:
+            end = store.count(session_id)
+        start, messages = store.load_before(session_id, end, limit)
+        return start, [{"role": role, "content": content} for role, content, _ in messages]
     
     @staticmethod
     def format_chat_history(messages, max_pairs=5):
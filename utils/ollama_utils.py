@@ -1,48 +1,252 @@
+import os
+import atexit
 import subprocess
+import threading
 import time
 import requests
 import platform
+from functools import lru_cache
+
+class OllamaMonitor:
+    """Process-wide background monitor for the local Ollama server
+
+    A daemon thread polls /api/tags and caches the server status, the installed
+    models and the probe latency, so the UI can read them without touching the
+    network. The monitor also owns the `ollama serve` process started from the app
+    and keeps the selected model loaded, so queries do not pay for a cold start.
+    """
+
+    DEFAULT_BASE_URL = "http://localhost:11434"
+    DEFAULT_INTERVAL = 5.0
+    DEFAULT_TIMEOUT = 2.0
+    DEFAULT_KEEPALIVE_INTERVAL = 240.0
+    # Loading a large model from disk can take minutes
+    WARM_TIMEOUT = 300.0
+    # Poll faster while a server we spawned is coming up
+    STARTING_INTERVAL = 0.5
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, base_url=None, interval=None, timeout=None):
+        """Create a monitor
+
+        Args:
+            base_url: Ollama server URL (defaults to OLLAMA_BASE_URL)
+            interval: Seconds between health checks (defaults to OLLAMA_HEALTH_INTERVAL)
+            timeout: Timeout of one health check in seconds
+        """
+        self.base_url = (base_url or OllamaManager.get_base_url()).rstrip("/")
+        self.interval = interval or float(os.getenv("OLLAMA_HEALTH_INTERVAL", self.DEFAULT_INTERVAL))
+        self.timeout = timeout or self.DEFAULT_TIMEOUT
+        self.keepalive_interval = float(os.getenv("OLLAMA_KEEPALIVE_INTERVAL", self.DEFAULT_KEEPALIVE_INTERVAL))
+        self.process = None
+        # Model kept warm -> {"state": "loading" | "ready" | "error", "last_ping": time}
+        self._warm = {}
+        self._status = {"running": None, "models": [], "latency_ms": None, "checked_at": None, "error": None}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._session = requests.Session()
+
+    @classmethod
+    def shared(cls):
+        """Return the process-wide monitor, starting its thread on first use"""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+                cls._shared.start()
+                atexit.register(cls._shared.stop_server)
+            return cls._shared
+
+    def start(self):
+        """Start the background polling thread"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="ollama-monitor", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            if self.check()["running"]:
+                self._ping_warm_models()
+            self._wake.wait(self.STARTING_INTERVAL if self.is_starting() else self.interval)
+            self._wake.clear()
+
+    def check(self):
+        """Probe the server once and update the cached status
+
+        Returns:
+            The new status dictionary
+        """
+        start = time.perf_counter()
+        try:
+            response = self._session.get(f"{self.base_url}/api/tags", timeout=self.timeout)
+            response.raise_for_status()
+            models = [model.get("name") for model in response.json().get("models", []) if model.get("name")]
+            status = {"running": True, "models": sorted(models), "error": None}
+        except Exception as e:
+            status = {"running": False, "models": [], "error": str(e)}
+        status["latency_ms"] = (time.perf_counter() - start) * 1000
+        status["checked_at"] = time.time()
+
+        with self._lock:
+            if self.process is not None and self.process.poll() is not None and not status["running"]:
+                status["error"] = f"ollama serve exited with code {self.process.returncode}"
+                self.process = None
+            self._status = status
+        return dict(status)
+
+    def status(self):
+        """Return the cached status without blocking
+
+        Returns:
+            Dictionary with "running" (None until the first check completes), "models",
+            "latency_ms", "checked_at" and "error"
+        """
+        with self._lock:
+            status = dict(self._status)
+            status["warm"] = {model: entry["state"] for model, entry in self._warm.items()}
+        status["starting"] = self.is_starting()
+        return status
+
+    def refresh(self):
+        """Ask the monitor thread to check the server now"""
+        self._wake.set()
+
+    def is_starting(self):
+        """Whether a server spawned by this monitor is running but not answering yet"""
+        with self._lock:
+            return (self.process is not None and self.process.poll() is None
+                    and not self._status["running"])
+
+    def start_server(self):
+        """Spawn `ollama serve` without waiting for it to come up
+
+        Returns:
+            True if the server is running or was started, False if it could not be spawned
+        """
+        with self._lock:
+            if self._status["running"] or (self.process is not None and self.process.poll() is None):
+                return True
+            try:
+                self.process = subprocess.Popen(
+                    ["ollama", "serve"],
+                    stdout=subprocess.DEVNULL,
+                    stderr=subprocess.DEVNULL,
+                    shell=platform.system() == "Windows"
+                )
+            except Exception:
+                return False
+        self.refresh()
+        return True
+
+    def keep_warm(self, model):
+        """Preload a model and keep it resident until another model is selected
+
+        Cheap to call on every rerun: the model is only loaded once, then pinged
+        every OLLAMA_KEEPALIVE_INTERVAL seconds from the monitor thread.
+
+        Args:
+            model: Name of an installed Ollama model
+        """
+        with self._lock:
+            if model in self._warm:
+                return
+            # Previously selected models are left to unload after their keep_alive expires
+            self._warm = {model: {"state": "loading", "last_ping": 0.0}}
+        self.refresh()
+
+    def _ping_warm_models(self):
+        """Load or refresh the models being kept warm, each in its own thread"""
+        now = time.time()
+        with self._lock:
+            due = [model for model, entry in self._warm.items()
+                   if entry["last_ping"] is not None and now - entry["last_ping"] >= self.keepalive_interval]
+            for model in due:
+                # Mark the ping as in flight so the next check does not send another one
+                self._warm[model]["last_ping"] = None
+        for model in due:
+            threading.Thread(target=self._ping_model, args=(model,), name="ollama-warm", daemon=True).start()
+
+    def _ping_model(self, model):
+        """Send an empty generate request, which loads the model and extends its keep_alive"""
+        options = OllamaManager.get_runtime_options()
+        payload = {"model": model, "keep_alive": options.pop("keep_alive")}
+        if options:
+            payload["options"] = options
+        try:
+            response = self._session.post(f"{self.base_url}/api/generate", json=payload, timeout=self.WARM_TIMEOUT)
+            response.raise_for_status()
+            state = "ready"
+        except Exception:
+            state = "error"
+
+        with self._lock:
+            if model in self._warm:
+                # Retry failed loads on the next health check
+                self._warm[model] = {"state": state, "last_ping": time.time() if state == "ready" else 0.0}
+
+    def stop_server(self):
+        """Stop the `ollama serve` process started by this monitor, if any"""
+        with self._lock:
+            process, self.process = self.process, None
+        if process is not None and process.poll() is None:
+            process.terminate()
+            try:
+                process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                process.kill()
 
 class OllamaManager:
     """Utility class to manage Ollama server operations"""
-    
+
+    DEFAULT_KEEP_ALIVE = "30m"
+
+    @staticmethod
+    def get_base_url():
+        """Return the configured Ollama server URL"""
+        return os.getenv("OLLAMA_BASE_URL", OllamaMonitor.DEFAULT_BASE_URL)
+
+    @staticmethod
+    def get_runtime_options():
+        """Return the Ollama runtime options configured through environment variables
+
+        OLLAMA_KEEP_ALIVE sets how long a model stays loaded after a request;
+        OLLAMA_NUM_CTX, OLLAMA_NUM_THREAD and OLLAMA_NUM_GPU are passed to the
+        server only when set.
+        """
+        options = {"keep_alive": os.getenv("OLLAMA_KEEP_ALIVE", OllamaManager.DEFAULT_KEEP_ALIVE)}
+        for option in ("num_ctx", "num_thread", "num_gpu"):
+            value = os.getenv(f"OLLAMA_{option.upper()}")
+            if value:
+                options[option] = int(value)
+        return options
+
     @staticmethod
     def is_ollama_running():
-        """Check if Ollama server is running"""
-        try:
-            response = requests.get("http://localhost:11434/api/tags", timeout=2)
-            return response.status_code == 200
-        except:
-            return False
-    
+        """Check if Ollama server is running (from the background monitor's cached status)"""
+        return OllamaMonitor.shared().status()["running"] is True
+
+    @staticmethod
+    def get_status():
+        """Return the cached Ollama server status (see OllamaMonitor.status)"""
+        return OllamaMonitor.shared().status()
+
     @staticmethod
     def start_ollama_server():
-        """Start Ollama server"""
-        try:
-            system = platform.system()
-            
-            if system == "Windows":
-                process = subprocess.Popen(["ollama", "serve"], 
-                              stdout=subprocess.PIPE, 
-                              stderr=subprocess.PIPE,
-                              shell=True)
-            else:  # macOS or Linux
-                process = subprocess.Popen(["ollama", "serve"], 
-                              stdout=subprocess.PIPE, 
-                              stderr=subprocess.PIPE)
-            
-            # Wait for server to start
-            for i in range(10):
-                if OllamaManager.is_ollama_running():
-                    return True
-                time.sleep(1)
-            return OllamaManager.is_ollama_running()
-        except Exception:
-            return False
+        """Start Ollama server in the background
+
+        Returns immediately; the monitor reports the server as running once it answers.
+        """
+        return OllamaMonitor.shared().start_server()
 
 # Define Ollama class dynamic import
+@lru_cache(maxsize=1)
 def get_ollama_class():
-    """Dynamically import and return the appropriate Ollama class"""
+    """Dynamically import and return the appropriate Ollama class
+    
+    The import is slow, so it happens on first use and the result is memoized.
+    """
     try:
         from langchain_ollama.chat_models import ChatOllama
         return ChatOllama, True
@@ -51,4 +255,4 @@ def get_ollama_class():
             from langchain_ollama import Chat as ChatOllama
             return ChatOllama, True
         except ImportError:
-            return None, False
\ No newline at end of file
+            return None, False
@@ -0,0 +1,403 @@
+import os
+import time
+import zlib
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+
+class SessionStore(ABC):
+    """Shared storage for conversation memory, so any app process can serve a session
+
+    Messages are stored once per session in append order together with their token
+    counts; the rolling summary and the number of messages it covers are stored as
+    the session state. Readers only ever fetch messages after a known position, so
+    the cost of a turn does not grow with the length of the conversation.
+
+    The backend is chosen with SESSION_STORE_URL:
+        sqlite:///path/to/file.sqlite3   SQLite in WAL mode (the default)
+        redis://host:6379/0              Any server speaking the Redis protocol
+        memory://                        In-process stand-in for tests and single processes
+    """
+
+    DEFAULT_URL = "sqlite:///" + os.path.join(".cache", "sessions.sqlite3")
+    DEFAULT_TTL = 30 * 24 * 60 * 60
+    # Message texts longer than this many bytes are stored zlib-compressed
+    COMPRESS_ABOVE = 512
+
+    _shared = None
+    _shared_loaded = False
+    _shared_lock = threading.Lock()
+
+    def __init__(self, ttl=None):
+        """Create a store
+
+        Args:
+            ttl: Seconds after its last message a session is forgotten (0 keeps sessions forever)
+        """
+        self.ttl = self.DEFAULT_TTL if ttl is None else ttl
+
+    @classmethod
+    def shared(cls):
+        """Return the process-wide store configured from environment variables
+
+        Environment:
+            SESSION_STORE_URL: Backend URL ("" disables persistence)
+            SESSION_TTL: Seconds of inactivity after which a session is forgotten
+
+        Returns:
+            The store, or None when persistence is disabled
+        """
+        with cls._shared_lock:
+            if not cls._shared_loaded:
+                url = os.getenv("SESSION_STORE_URL", cls.DEFAULT_URL)
+                if url:
+                    cls._shared = cls.from_url(url, ttl=int(os.getenv("SESSION_TTL", cls.DEFAULT_TTL)))
+                    cls._shared.purge_expired()
+                cls._shared_loaded = True
+            return cls._shared
+
+    @staticmethod
+    def from_url(url, ttl=None):
+        """Create the store for a backend URL
+
+        Args:
+            url: sqlite:///<path>, redis://..., rediss://... or memory://
+            ttl: Seconds of inactivity after which a session is forgotten
+
+        Raises:
+            ValueError: For an unknown URL scheme
+        """
+        if url.startswith("sqlite:///"):
+            return SQLiteSessionStore(url[len("sqlite:///"):], ttl=ttl)
+        if url.startswith(("redis://", "rediss://", "unix://")):
+            return RedisSessionStore(url, ttl=ttl)
+        if url.startswith("memory://"):
+            return InMemorySessionStore(ttl=ttl)
+        raise ValueError(f"Unsupported SESSION_STORE_URL: {url}")
+
+    @abstractmethod
+    def append(self, session_id, messages):
+        """Append messages to a session atomically
+
+        Messages appended together stay adjacent even when several processes write
+        to the same session at once.
+
+        Args:
+            session_id: The session
+            messages: List of (role, content, tokens) tuples
+
+        Returns:
+            Position of the first appended message
+        """
+
+    @abstractmethod
+    def load(self, session_id, start=0, limit=None):
+        """Return the messages of a session from a position on
+
+        Args:
+            session_id: The session
+            start: Position of the first message to return
+            limit: Maximum number of messages to return
+
+        Returns:
+            List of (role, content, tokens) tuples in order
+        """
+
+    def load_before(self, session_id, end, limit):
+        """Return up to limit messages before a position, for loading older turns lazily
+
+        Returns:
+            Tuple of (position of the first returned message, list of (role, content, tokens))
+        """
+        start = max(0, end - limit)
+        return start, self.load(session_id, start, end - start)
+
+    @abstractmethod
+    def count(self, session_id):
+        """Return the number of messages stored for a session"""
+
+    @abstractmethod
+    def get_state(self, session_id):
+        """Return the session's summary state, or None for a new session
+
+        Returns:
+            Dictionary with summary, summary_tokens and summarized_upto
+        """
+
+    @abstractmethod
+    def set_state(self, session_id, state):
+        """Store the summary state unless a newer one (covering more messages) is stored"""
+
+    @abstractmethod
+    def delete(self, session_id):
+        """Forget a session; returns whether it existed"""
+
+    def purge_expired(self):
+        """Forget sessions that have been inactive for longer than the TTL"""
+
+    @classmethod
+    def pack(cls, content):
+        """Encode a message text, compressing long ones"""
+        data = content.encode("utf-8")
+        if len(data) > cls.COMPRESS_ABOVE:
+            return b"z" + zlib.compress(data)
+        return b"t" + data
+
+    @staticmethod
+    def unpack(data):
+        """Decode a message text encoded with pack"""
+        data = bytes(data)
+        if data[:1] == b"z":
+            return zlib.decompress(data[1:]).decode("utf-8")
+        return data[1:].decode("utf-8")
+
+class InMemorySessionStore(SessionStore):
+    """Session store kept in this process; behaves like the shared backends"""
+
+    def __init__(self, ttl=None):
+        super().__init__(ttl)
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def append(self, session_id, messages):
+        with self._lock:
+            session = self._sessions.setdefault(session_id, {"messages": [], "state": None})
+            start = len(session["messages"])
+            session["messages"].extend((role, self.pack(content), tokens) for role, content, tokens in messages)
+            session["updated_at"] = time.time()
+            return start
+
+    def load(self, session_id, start=0, limit=None):
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return []
+            end = None if limit is None else start + limit
+            return [(role, self.unpack(data), tokens) for role, data, tokens in session["messages"][start:end]]
+
+    def count(self, session_id):
+        with self._lock:
+            session = self._sessions.get(session_id)
+            return len(session["messages"]) if session else 0
+
+    def get_state(self, session_id):
+        with self._lock:
+            session = self._sessions.get(session_id)
+            return dict(session["state"]) if session and session["state"] else None
+
+    def set_state(self, session_id, state):
+        with self._lock:
+            session = self._sessions.setdefault(session_id, {"messages": [], "state": None})
+            current = session["state"]
+            if current is None or current["summarized_upto"] < state["summarized_upto"]:
+                session["state"] = dict(state)
+            session["updated_at"] = time.time()
+
+    def delete(self, session_id):
+        with self._lock:
+            return self._sessions.pop(session_id, None) is not None
+
+    def purge_expired(self):
+        if not self.ttl:
+            return
+        cutoff = time.time() - self.ttl
+        with self._lock:
+            for session_id in [key for key, session in self._sessions.items() if session["updated_at"] < cutoff]:
+                del self._sessions[session_id]
+
+class SQLiteSessionStore(SessionStore):
+    """Session store in a SQLite file shared by the app processes on one machine
+
+    The database runs in WAL mode so readers never wait for a writer, and every
+    thread uses its own connection. Appends run in an immediate transaction, which
+    serializes concurrent writers and keeps each session's positions contiguous.
+    """
+
+    def __init__(self, path, ttl=None):
+        super().__init__(ttl)
+        self.path = path
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._connection()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS session_messages ("
+            "session_id TEXT NOT NULL, seq INTEGER NOT NULL, role TEXT NOT NULL, tokens INTEGER NOT NULL, "
+            "content BLOB NOT NULL, PRIMARY KEY (session_id, seq)) WITHOUT ROWID"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS session_state ("
+            "session_id TEXT PRIMARY KEY, summary TEXT NOT NULL DEFAULT '', summary_tokens INTEGER NOT NULL DEFAULT 0, "
+            "summarized_upto INTEGER NOT NULL DEFAULT 0, updated_at REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS session_state_updated ON session_state (updated_at)")
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # Autocommit mode; transactions are opened explicitly where needed
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def append(self, session_id, messages):
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            start = conn.execute(
+                "SELECT COALESCE(MAX(seq) + 1, 0) FROM session_messages WHERE session_id = ?", (session_id,)
+            ).fetchone()[0]
+            conn.executemany(
+                "INSERT INTO session_messages (session_id, seq, role, tokens, content) VALUES (?, ?, ?, ?, ?)",
+                [(session_id, start + offset, role, tokens, self.pack(content))
+                 for offset, (role, content, tokens) in enumerate(messages)]
+            )
+            conn.execute(
+                "INSERT INTO session_state (session_id, updated_at) VALUES (?, ?) "
+                "ON CONFLICT (session_id) DO UPDATE SET updated_at = excluded.updated_at",
+                (session_id, time.time())
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return start
+
+    def load(self, session_id, start=0, limit=None):
+        rows = self._connection().execute(
+            "SELECT role, content, tokens FROM session_messages WHERE session_id = ? AND seq >= ? "
+            "ORDER BY seq LIMIT ?",
+            (session_id, start, -1 if limit is None else limit)
+        ).fetchall()
+        return [(role, self.unpack(content), tokens) for role, content, tokens in rows]
+
+    def count(self, session_id):
+        return self._connection().execute(
+            "SELECT COALESCE(MAX(seq) + 1, 0) FROM session_messages WHERE session_id = ?", (session_id,)
+        ).fetchone()[0]
+
+    def get_state(self, session_id):
+        row = self._connection().execute(
+            "SELECT summary, summary_tokens, summarized_upto FROM session_state WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        return {"summary": row[0], "summary_tokens": row[1], "summarized_upto": row[2]}
+
+    def set_state(self, session_id, state):
+        self._connection().execute(
+            "INSERT INTO session_state (session_id, summary, summary_tokens, summarized_upto, updated_at) "
+            "VALUES (?, ?, ?, ?, ?) ON CONFLICT (session_id) DO UPDATE SET summary = excluded.summary, "
+            "summary_tokens = excluded.summary_tokens, summarized_upto = excluded.summarized_upto, "
+            "updated_at = excluded.updated_at WHERE session_state.summarized_upto < excluded.summarized_upto",
+            (session_id, state["summary"], state["summary_tokens"], state["summarized_upto"], time.time())
+        )
+
+    def delete(self, session_id):
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            deleted = conn.execute("DELETE FROM session_state WHERE session_id = ?", (session_id,)).rowcount
+            deleted += conn.execute("DELETE FROM session_messages WHERE session_id = ?", (session_id,)).rowcount
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return deleted > 0
+
+    def purge_expired(self):
+        if not self.ttl:
+            return
+        conn = self._connection()
+        cutoff = time.time() - self.ttl
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "DELETE FROM session_messages WHERE session_id IN "
+                "(SELECT session_id FROM session_state WHERE updated_at < ?)", (cutoff,)
+            )
+            conn.execute("DELETE FROM session_state WHERE updated_at < ?", (cutoff,))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+class RedisSessionStore(SessionStore):
+    """Session store on a server speaking the Redis protocol (Redis, Valkey, KeyDB, ...)
+
+    Each session is a list of encoded messages, so a message's position is its list
+    index, plus a hash with the summary state. Both keys expire after the TTL.
+    Requires the redis package.
+    """
+
+    KEY_PREFIX = "research:session:"
+    # Only replace the stored summary with one that covers more messages
+    SET_STATE_SCRIPT = """
+local current = tonumber(redis.call('HGET', KEYS[1], 'summarized_upto') or '-1')
+if current < tonumber(ARGV[3]) then
+    redis.call('HSET', KEYS[1], 'summary', ARGV[1], 'summary_tokens', ARGV[2], 'summarized_upto', ARGV[3])
+end
+if tonumber(ARGV[4]) > 0 then
+    redis.call('EXPIRE', KEYS[1], ARGV[4])
+end
+"""
+
+    def __init__(self, url, ttl=None):
+        super().__init__(ttl)
+        try:
+            import redis
+        except ImportError:
+            raise ImportError("The redis package is required for redis:// session stores: pip install redis")
+        self._redis = redis.Redis.from_url(url)
+        self._set_state = self._redis.register_script(self.SET_STATE_SCRIPT)
+
+    def _keys(self, session_id):
+        return f"{self.KEY_PREFIX}{session_id}:messages", f"{self.KEY_PREFIX}{session_id}:state"
+
+    @staticmethod
+    def _encode(role, content, tokens):
+        return f"{role} {tokens} ".encode("utf-8") + SessionStore.pack(content)
+
+    @staticmethod
+    def _decode(entry):
+        role, tokens, data = bytes(entry).split(b" ", 2)
+        return role.decode("utf-8"), SessionStore.unpack(data), int(tokens)
+
+    def append(self, session_id, messages):
+        messages_key, state_key = self._keys(session_id)
+        pipe = self._redis.pipeline(transaction=True)
+        pipe.rpush(messages_key, *[self._encode(role, content, tokens) for role, content, tokens in messages])
+        if self.ttl:
+            pipe.expire(messages_key, self.ttl)
+            pipe.expire(state_key, self.ttl)
+        length = pipe.execute()[0]
+        return length - len(messages)
+
+    def load(self, session_id, start=0, limit=None):
+        end = -1 if limit is None else start + limit - 1
+        if limit == 0:
+            return []
+        return [self._decode(entry) for entry in self._redis.lrange(self._keys(session_id)[0], start, end)]
+
+    def count(self, session_id):
+        return self._redis.llen(self._keys(session_id)[0])
+
+    def get_state(self, session_id):
+        state = self._redis.hgetall(self._keys(session_id)[1])
+        if not state:
+            return None
+        return {
+            "summary": state[b"summary"].decode("utf-8"),
+            "summary_tokens": int(state[b"summary_tokens"]),
+            "summarized_upto": int(state[b"summarized_upto"])
+        }
+
+    def set_state(self, session_id, state):
+        self._set_state(keys=[self._keys(session_id)[1]],
+                        args=[state["summary"], state["summary_tokens"], state["summarized_upto"], self.ttl or 0])
+
+    def delete(self, session_id):
+        return self._redis.delete(*self._keys(session_id)) > 0
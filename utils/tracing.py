@@ -0,0 +1,346 @@
+import os
+import json
+import time
+import threading
+import contextvars
+from contextlib import contextmanager, nullcontext
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from langchain_core.callbacks import BaseCallbackHandler
+
+_current_trace = contextvars.ContextVar("current_trace", default=None)
+
+class QueryTrace:
+    """Timing spans and counters recorded while answering one query"""
+
+    def __init__(self, query=None, attributes=None):
+        """Start a trace
+
+        Args:
+            query: The user's query
+            attributes: Extra attributes stored with the trace (provider, mode, ...)
+        """
+        self.query = query
+        self.attributes = dict(attributes or {})
+        self.started_at = time.time()
+        self.spans = []
+        self.counters = {"llm_calls": 0, "tool_calls": 0, "iterations": 0,
+                         "prompt_tokens": 0, "completion_tokens": 0, "cached_prompt_tokens": 0, "prefill_ms": 0}
+        self.total_s = None
+        self._start = time.perf_counter()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def current():
+        """Return the trace active in this context, or None"""
+        return _current_trace.get()
+
+    @contextmanager
+    def activated(self):
+        """Make this the current trace for code running inside the block"""
+        token = _current_trace.set(self)
+        try:
+            yield self
+        finally:
+            _current_trace.reset(token)
+
+    @contextmanager
+    def span(self, name, **attributes):
+        """Time the enclosed block as a span"""
+        start = time.perf_counter()
+        try:
+            yield attributes
+        finally:
+            self.add_span(name, start, time.perf_counter() - start, **attributes)
+
+    def add_span(self, name, start, duration, **attributes):
+        """Record a finished span
+
+        Args:
+            name: Stage name, e.g. "llm", "tool:Google Search"
+            start: perf_counter value when the span started
+            duration: Duration in seconds
+            attributes: Extra attributes (token counts, cache hit, ...)
+        """
+        with self._lock:
+            self.spans.append({
+                "name": name,
+                "offset_s": round(start - self._start, 6),
+                "duration_s": round(duration, 6),
+                **attributes
+            })
+
+    def elapsed(self):
+        """Seconds since the trace started"""
+        return time.perf_counter() - self._start
+
+    def increment(self, counter, value=1):
+        """Increase one of the trace counters"""
+        with self._lock:
+            self.counters[counter] = self.counters.get(counter, 0) + value
+
+    def finish(self, **attributes):
+        """Mark the trace as complete and return it"""
+        self.attributes.update(attributes)
+        self.total_s = self.elapsed()
+        return self
+
+    def summary(self):
+        """Aggregate the spans per stage
+
+        Returns:
+            Dictionary with the total time, per-stage count and time, and the counters
+        """
+        stages = {}
+        with self._lock:
+            for span in self.spans:
+                stage = stages.setdefault(span["name"], {"count": 0, "total_s": 0.0})
+                stage["count"] += 1
+                stage["total_s"] += span["duration_s"]
+            counters = dict(self.counters)
+        total_s = self.total_s if self.total_s is not None else self.elapsed()
+        return {"total_s": total_s, "stages": stages, **counters, **self.attributes}
+
+    def to_dict(self):
+        """Full trace as a JSON-serializable dictionary"""
+        with self._lock:
+            spans = list(self.spans)
+        return {"started_at": self.started_at, "query": self.query, "spans": spans, **self.summary()}
+
+class TracingCallbackHandler(BaseCallbackHandler):
+    """LangChain callback handler that records LLM and tool spans into a QueryTrace"""
+
+    def __init__(self, trace):
+        self.trace = trace
+        self._starts = {}
+
+    def on_llm_start(self, serialized, prompts, run_id=None, **kwargs):
+        self._starts[run_id] = time.perf_counter()
+
+    def on_chat_model_start(self, serialized, messages, run_id=None, **kwargs):
+        self._starts[run_id] = time.perf_counter()
+
+    def on_llm_end(self, response, run_id=None, **kwargs):
+        start = self._starts.pop(run_id, None)
+        prompt_tokens, completion_tokens = self.token_usage(response)
+        self.trace.increment("llm_calls")
+        self.trace.increment("prompt_tokens", prompt_tokens)
+        self.trace.increment("completion_tokens", completion_tokens)
+        cached_tokens, prefill_ms = self.prompt_cache_usage(response)
+        self.trace.increment("cached_prompt_tokens", cached_tokens)
+        self.trace.increment("prefill_ms", prefill_ms)
+        if start is not None:
+            self.trace.add_span("llm", start, time.perf_counter() - start,
+                                prompt_tokens=prompt_tokens, completion_tokens=completion_tokens,
+                                cached_prompt_tokens=cached_tokens, prefill_ms=prefill_ms)
+
+    def on_llm_error(self, error, run_id=None, **kwargs):
+        start = self._starts.pop(run_id, None)
+        if start is not None:
+            self.trace.add_span("llm", start, time.perf_counter() - start, error=str(error))
+
+    def on_tool_start(self, serialized, input_str, run_id=None, **kwargs):
+        self._starts[run_id] = time.perf_counter()
+
+    def on_tool_end(self, output, run_id=None, name=None, **kwargs):
+        start = self._starts.pop(run_id, None)
+        self.trace.increment("tool_calls")
+        if start is not None:
+            self.trace.add_span(f"tool:{name or 'unknown'}", start, time.perf_counter() - start)
+
+    def on_tool_error(self, error, run_id=None, name=None, **kwargs):
+        start = self._starts.pop(run_id, None)
+        if start is not None:
+            self.trace.add_span(f"tool:{name or 'unknown'}", start, time.perf_counter() - start, error=str(error))
+
+    def on_agent_action(self, action, **kwargs):
+        self.trace.increment("iterations")
+
+    @staticmethod
+    def token_usage(response):
+        """Extract (prompt, completion) token counts from an LLMResult"""
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        if usage:
+            return usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0)
+
+        prompt_tokens = completion_tokens = 0
+        for generations in response.generations:
+            for generation in generations:
+                metadata = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                prompt_tokens += metadata.get("input_tokens", 0)
+                completion_tokens += metadata.get("output_tokens", 0)
+        return prompt_tokens, completion_tokens
+
+    @staticmethod
+    def prompt_cache_usage(response):
+        """Extract (cached prompt tokens, prompt evaluation milliseconds) from an LLMResult
+
+        OpenAI reports the prompt tokens served from its prompt cache; Ollama reports
+        how long evaluating the prompt took, which drops when its KV cache already
+        holds the prompt's prefix.
+        """
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        cached_tokens = (usage.get("prompt_tokens_details") or {}).get("cached_tokens") or 0
+        prefill_ns = 0
+        for generations in response.generations:
+            for generation in generations:
+                message = getattr(generation, "message", None)
+                if not usage:
+                    metadata = getattr(message, "usage_metadata", None) or {}
+                    cached_tokens += (metadata.get("input_token_details") or {}).get("cache_read") or 0
+                info = getattr(message, "response_metadata", None) or generation.generation_info or {}
+                prefill_ns += info.get("prompt_eval_duration") or 0
+        return cached_tokens, prefill_ns // 1_000_000
+
+class Tracer:
+    """Process-wide trace exporter: Prometheus text metrics plus an optional JSON lines file
+
+    Traces contain the users' full queries, so they are only written to disk when
+    TRACE_PATH is set, and the file is rotated once it reaches TRACE_MAX_BYTES.
+    """
+
+    DEFAULT_MAX_BYTES = 10 * 1024 * 1024
+
+    _lock = threading.Lock()
+    _stages = {}
+    _counters = {}
+    _queries = 0
+    _query_seconds = 0.0
+    _server = None
+
+    @staticmethod
+    def span(name, **attributes):
+        """Time a block in the current trace (a no-op when no trace is active)"""
+        trace = QueryTrace.current()
+        return trace.span(name, **attributes) if trace is not None else nullcontext(attributes)
+
+    @staticmethod
+    def span_stream(name, create, **attributes):
+        """Time a call that may return an event generator, until the events are read
+
+        A streamed answer is generated while its events are consumed, so timing only
+        the call that returns the generator would record almost nothing.
+
+        Args:
+            name: Span name
+            create: Callable returning a string, None or an event generator
+            attributes: Extra span attributes
+
+        Returns:
+            The callable's result; a generator is wrapped so the span ends when it is
+            exhausted or closed
+        """
+        trace = QueryTrace.current()
+        if trace is None:
+            return create()
+
+        start = time.perf_counter()
+        result = create()
+        if result is None or isinstance(result, str):
+            trace.add_span(name, start, time.perf_counter() - start, **attributes)
+            return result
+
+        def timed():
+            try:
+                yield from result
+            finally:
+                trace.add_span(name, start, time.perf_counter() - start, **attributes)
+        return timed()
+
+    @staticmethod
+    def callbacks():
+        """LangChain callbacks recording into the current trace (empty when no trace is active)"""
+        trace = QueryTrace.current()
+        return [TracingCallbackHandler(trace)] if trace is not None else []
+
+    @classmethod
+    def export(cls, trace):
+        """Record a finished trace in the metrics and append it to TRACE_PATH when set
+
+        Args:
+            trace: A finished QueryTrace
+        """
+        summary = trace.summary()
+        with cls._lock:
+            cls._queries += 1
+            cls._query_seconds += summary["total_s"]
+            for name, stage in summary["stages"].items():
+                aggregate = cls._stages.setdefault(name, {"count": 0, "total_s": 0.0})
+                aggregate["count"] += stage["count"]
+                aggregate["total_s"] += stage["total_s"]
+            for counter, value in trace.counters.items():
+                cls._counters[counter] = cls._counters.get(counter, 0) + value
+
+        path = os.getenv("TRACE_PATH")
+        if path:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            max_bytes = int(os.getenv("TRACE_MAX_BYTES", cls.DEFAULT_MAX_BYTES))
+            with cls._lock:
+                # Keep one previous file, so traces never take more than twice the limit
+                if max_bytes and os.path.exists(path) and os.path.getsize(path) >= max_bytes:
+                    os.replace(path, path + ".1")
+                with open(path, "a") as f:
+                    f.write(json.dumps(trace.to_dict(), default=str) + "\n")
+
+    @classmethod
+    def prometheus_text(cls):
+        """Render the aggregated metrics in the Prometheus text exposition format"""
+        with cls._lock:
+            lines = [
+                "# HELP research_queries_total Queries answered",
+                "# TYPE research_queries_total counter",
+                f"research_queries_total {cls._queries}",
+                "# HELP research_query_seconds_total Time spent answering queries",
+                "# TYPE research_query_seconds_total counter",
+                f"research_query_seconds_total {cls._query_seconds:.6f}",
+                "# HELP research_stage_seconds Time spent per pipeline stage",
+                "# TYPE research_stage_seconds summary"
+            ]
+            for name, stage in sorted(cls._stages.items()):
+                label = name.replace("\\", "\\\\").replace('"', '\\"')
+                lines.append(f'research_stage_seconds_sum{{stage="{label}"}} {stage["total_s"]:.6f}')
+                lines.append(f'research_stage_seconds_count{{stage="{label}"}} {stage["count"]}')
+            lines.append("# HELP research_events_total LLM calls, tool calls, agent iterations, tokens and prompt cache use")
+            lines.append("# TYPE research_events_total counter")
+            for counter, value in sorted(cls._counters.items()):
+                lines.append(f'research_events_total{{event="{counter}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+    @classmethod
+    def start_metrics_server(cls, port=None):
+        """Serve /metrics on METRICS_PORT in a background thread (once per process)
+
+        Returns:
+            True if the server is running
+        """
+        port = port or os.getenv("METRICS_PORT")
+        if not port:
+            return False
+
+        with cls._lock:
+            if cls._server is not None:
+                return True
+
+            class MetricsHandler(BaseHTTPRequestHandler):
+                def do_GET(self):
+                    if self.path.rstrip("/") != "/metrics":
+                        self.send_error(404)
+                        return
+                    body = Tracer.prometheus_text().encode()
+                    self.send_response(200)
+                    self.send_header("Content-Type", "text/plain; version=0.0.4")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+
+                def log_message(self, format, *args):
+                    pass
+
+            try:
+                cls._server = ThreadingHTTPServer(("127.0.0.1", int(port)), MetricsHandler)
+            except OSError:
+                # Another process of the app already serves the metrics
+                return False
+            threading.Thread(target=cls._server.serve_forever, daemon=True).start()
+            return True